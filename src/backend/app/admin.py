@@ -2,7 +2,10 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
-from .models import Professor, Aluno, Turma, Matricula, Presenca
+from django.db.models import Count
+from .models import Professor, Aluno, Turma, Matricula, Presenca, FilaPresenca, PerfilRequisicao
+from .authentication import invalidar_usuario, revogar_tokens_usuario
+from .perfilamento import remover_arquivos
 
 # ========== ADMIN CUSTOMIZADO PARA USER ==========
 
@@ -52,12 +55,21 @@ class CustomUserAdmin(UserAdmin):
     
     def make_staff(self, request, queryset):
         queryset.update(is_staff=True)
+        self._invalidar_autenticacao(queryset)
     make_staff.short_description = "Tornar selecionados como staff (acesso admin)"
     
     def make_not_staff(self, request, queryset):
         queryset.update(is_staff=False)
+        self._invalidar_autenticacao(queryset)
     make_not_staff.short_description = "Remover status staff dos selecionados"
 
+    def _invalidar_autenticacao(self, queryset):
+        # update() não dispara signals: limpa o cache de token manualmente
+        # e revoga os tokens assinados, que carregam o papel antigo
+        for user_id in queryset.values_list('pk', flat=True):
+            invalidar_usuario(user_id)
+            revogar_tokens_usuario(user_id)
+
 # Registrar o User customizado
 admin.site.register(User, CustomUserAdmin)
 
@@ -70,6 +82,15 @@ class ProfessorAdmin(admin.ModelAdmin):
     search_fields = ('nome', 'email', 'departamento')
     ordering = ('nome',)
     readonly_fields = ('data_cadastro',)
+    
+    def get_queryset(self, request):
+        # Conta as turmas na própria consulta da listagem (evita um COUNT por linha)
+        return super().get_queryset(request).annotate(quantidade_turmas=Count('turmas'))
+    
+    def quantidade_turmas(self, obj):
+        return obj.quantidade_turmas
+    quantidade_turmas.short_description = 'Turmas'
+    quantidade_turmas.admin_order_field = 'quantidade_turmas'
 
 @admin.register(Aluno)
 class AlunoAdmin(admin.ModelAdmin):
@@ -111,4 +132,35 @@ class PresencaAdmin(admin.ModelAdmin):
     
     def turma_nome(self, obj):
         return obj.matricula.turma.nome
-    turma_nome.short_description = 'Turma'
\ No newline at end of file
+    turma_nome.short_description = 'Turma'
+
+
+@admin.register(FilaPresenca)
+class FilaPresencaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'operacao', 'estado', 'presenca', 'usuario', 'criado_em', 'processado_em')
+    list_filter = ('estado', 'operacao')
+    ordering = ('-id',)
+    readonly_fields = [campo.name for campo in FilaPresenca._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PerfilRequisicao)
+class PerfilRequisicaoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'view', 'metodo', 'status', 'duracao_ms', 'consultas', 'tempo_db_ms', 'usuario', 'criado_em')
+    list_filter = ('view', 'status')
+    search_fields = ('view', 'caminho')
+    ordering = ('-id',)
+    readonly_fields = [campo.name for campo in PerfilRequisicao._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def delete_model(self, request, obj):
+        remover_arquivos([obj])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        remover_arquivos(queryset)
+        super().delete_queryset(request, queryset)
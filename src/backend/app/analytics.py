@@ -0,0 +1,218 @@
+# app/analytics.py
+"""
+Expressões e agregações calculadas diretamente no banco de dados.
+Usadas pelos relatórios analíticos para evitar carregar linhas no Python.
+"""
+from datetime import date
+
+from django.db.models import (
+    Case, Count, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce, ExtractYear
+from django.utils.text import slugify
+
+
+# Faixas etárias usadas nas análises de equidade: (rótulo, idade mínima, idade máxima)
+FAIXAS_ETARIAS = [
+    ('Até 17', None, 17),
+    ('18-24', 18, 24),
+    ('25-29', 25, 29),
+    ('30-39', 30, 39),
+    ('40+', 40, None),
+]
+
+AGRUPAMENTOS_EQUIDADE = {
+    'faixa_etaria': 'faixa_etaria',
+    'genero': 'matricula__aluno__genero',
+    'curso': 'matricula__aluno__curso',
+}
+
+
+# ========== IDADE ==========
+
+def data_limite_idade(anos, hoje=None):
+    """
+    Maior data de nascimento para quem já completou `anos` na data `hoje`.
+    Nascidos em 29/02 completam anos em 01/03 nos anos não bissextos,
+    igual ao cálculo de Aluno.idade.
+    """
+    hoje = hoje or date.today()
+    try:
+        return hoje.replace(year=hoje.year - anos)
+    except ValueError:
+        # Hoje é 29/02 e o ano alvo não é bissexto
+        return hoje.replace(year=hoje.year - anos, day=28)
+
+
+def expressao_idade(campo='data_nascimento', hoje=None):
+    """Idade em anos completos calculada pelo banco a partir de `campo`"""
+    hoje = hoje or date.today()
+    ainda_nao_fez_aniversario = Case(
+        When(
+            Q(**{f'{campo}__month__gt': hoje.month}) |
+            Q(**{f'{campo}__month': hoje.month, f'{campo}__day__gt': hoje.day}),
+            then=Value(1)
+        ),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return Value(hoje.year) - ExtractYear(campo) - ainda_nao_fez_aniversario
+
+
+def filtro_idade(campo='data_nascimento', idade_min=None, idade_max=None, hoje=None):
+    """
+    Converte um intervalo de idades em intervalo de datas de nascimento,
+    permitindo que o banco use índices em vez de calcular a idade por linha.
+    """
+    filtro = Q()
+    if idade_min is not None:
+        filtro &= Q(**{f'{campo}__lte': data_limite_idade(idade_min, hoje)})
+    if idade_max is not None:
+        filtro &= Q(**{f'{campo}__gt': data_limite_idade(idade_max + 1, hoje)})
+    return filtro
+
+
+def expressao_faixa_etaria(campo='data_nascimento', hoje=None):
+    """Rótulo da faixa etária (FAIXAS_ETARIAS) calculado pelo banco"""
+    condicoes = [
+        When(filtro_idade(campo, idade_max=maxima, hoje=hoje), then=Value(rotulo))
+        for rotulo, _, maxima in FAIXAS_ETARIAS
+        if maxima is not None
+    ]
+    return Case(*condicoes, default=Value(FAIXAS_ETARIAS[-1][0]))
+
+
+# ========== CARGA DOCENTE ==========
+
+def _total_por_professor(queryset, campo_professor, agregado):
+    """Subconsulta correlacionada: `agregado` sobre as linhas de `queryset` do professor externo"""
+    subconsulta = (
+        queryset
+        .filter(**{campo_professor: OuterRef('pk')})
+        .order_by()
+        .values(campo_professor)
+        .annotate(total=agregado)
+        .values('total')
+    )
+    return Coalesce(Subquery(subconsulta, output_field=IntegerField()), 0)
+
+
+def expressao_carga_docente():
+    """
+    Anotações de carga docente para querysets de Professor.
+    Cada total é uma subconsulta por professor (sem JOIN/GROUP BY na consulta externa).
+    Aulas registradas = datas distintas com presença, contadas por turma e somadas por professor.
+    """
+    from .models import Matricula, Presenca, Turma
+
+    datas_por_turma = (
+        Presenca.objects
+        .filter(matricula__turma=OuterRef('pk'))
+        .order_by()
+        .values('matricula__turma')
+        .annotate(total=Count('data', distinct=True))
+        .values('total')
+    )
+    turmas_com_aulas = Turma.objects.annotate(
+        aulas=Subquery(datas_por_turma, output_field=IntegerField())
+    )
+
+    anotacoes = {
+        'quantidade_turmas': _total_por_professor(Turma.objects.all(), 'professor', Count('pk')),
+        'total_alunos': _total_por_professor(Matricula.objects.all(), 'turma__professor', Count('pk')),
+        'total_aulas': _total_por_professor(turmas_com_aulas, 'professor', Sum('aulas')),
+    }
+    for valor, _ in Turma.STATUS_CHOICES:
+        anotacoes[campo_turmas_por_status(valor)] = _total_por_professor(
+            Turma.objects.filter(status=valor), 'professor', Count('pk')
+        )
+    return anotacoes
+
+
+def campo_turmas_por_status(status):
+    """Nome da anotação com a contagem de turmas em `status` (ex.: turmas_concluida)"""
+    return f"turmas_{slugify(status).replace('-', '_')}"
+
+
+# ========== RELATÓRIOS ==========
+
+def relatorio_equidade(presencas, agrupar_por):
+    """
+    Agrupa presenças por faixa etária, gênero e/ou curso em uma única consulta.
+    `presencas` é um queryset de Presenca já filtrado pelo chamador.
+    """
+    campos = [AGRUPAMENTOS_EQUIDADE[nome] for nome in agrupar_por]
+    linhas = (
+        presencas
+        .annotate(faixa_etaria=expressao_faixa_etaria('matricula__aluno__data_nascimento'))
+        .order_by()
+        .values(*campos)
+        .annotate(
+            total_registros=Count('id'),
+            presentes=Count('id', filter=Q(status='Presente')),
+            ausentes=Count('id', filter=Q(status='Ausente')),
+            justificados=Count('id', filter=Q(status='Justificado')),
+            total_alunos=Count('matricula__aluno', distinct=True),
+        )
+        .order_by(*campos)
+    )
+
+    resultado = []
+    for linha in linhas:
+        grupo = {nome: linha[AGRUPAMENTOS_EQUIDADE[nome]] for nome in agrupar_por}
+        total = linha['total_registros']
+        resultado.append({
+            **grupo,
+            'total_alunos': linha['total_alunos'],
+            'total_registros': total,
+            'presentes': linha['presentes'],
+            'ausentes': linha['ausentes'],
+            'justificados': linha['justificados'],
+            'taxa_presenca': round(linha['presentes'] / total * 100, 2) if total else 0,
+        })
+    return resultado
+
+
+def relatorio_carga_docente(professores):
+    """
+    Carga docente por professor e por departamento.
+    `professores` deve estar anotado com ProfessorQuerySet.com_carga().
+    """
+    from .models import Turma
+
+    campos_status = {valor: campo_turmas_por_status(valor) for valor, _ in Turma.STATUS_CHOICES}
+    por_professor = []
+    por_departamento = {}
+
+    for professor in professores:
+        turmas_por_status = {valor: getattr(professor, campo) for valor, campo in campos_status.items()}
+        por_professor.append({
+            'id': professor.id,
+            'nome': professor.nome,
+            'departamento': professor.departamento,
+            'ativo': professor.ativo,
+            'quantidade_turmas': professor.quantidade_turmas,
+            'turmas_por_status': turmas_por_status,
+            'total_alunos': professor.total_alunos,
+            'total_aulas': professor.total_aulas,
+        })
+
+        departamento = por_departamento.setdefault(professor.departamento, {
+            'departamento': professor.departamento,
+            'total_professores': 0,
+            'quantidade_turmas': 0,
+            'turmas_por_status': {valor: 0 for valor in campos_status},
+            'total_alunos': 0,
+            'total_aulas': 0,
+        })
+        departamento['total_professores'] += 1
+        departamento['quantidade_turmas'] += professor.quantidade_turmas
+        departamento['total_alunos'] += professor.total_alunos
+        departamento['total_aulas'] += professor.total_aulas
+        for valor, quantidade in turmas_por_status.items():
+            departamento['turmas_por_status'][valor] += quantidade
+
+    return {
+        'professores': por_professor,
+        'departamentos': sorted(por_departamento.values(), key=lambda d: d['departamento']),
+    }
@@ -7,4 +7,6 @@ class AppConfig(AppConfig):
     
     def ready(self):
         # Importa os signals
-        import app.signals
\ No newline at end of file
+        import app.signals
+        from app import instrumentacao
+        instrumentacao.instalar()
\ No newline at end of file
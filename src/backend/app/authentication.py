@@ -0,0 +1,256 @@
+# app/authentication.py
+"""
+Autenticação da API.
+
+- Token (padrão): token → usuário (com os perfis de professor/aluno já
+  carregados) resolvido em cache, sem consultar o banco a cada requisição.
+  O cache é invalidado pelos signals de Token (logout, troca de senha),
+  User (desativação, mudança de permissões) e Professor/Aluno (papel).
+- JWT (AUTH_TOKEN_MODO='jwt'): access/refresh assinados com o id e o papel
+  do usuário; o access é verificado sem consultar o banco. Revogações
+  (logout, troca de senha, desativação, mudança de staff/superusuário ou
+  de papel) ficam numa lista em cache.
+
+Com vários workers use um cache compartilhado (CACHES) para que a
+revogação valha imediatamente em todos os processos.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import metricas
+
+
+def _chave_token(key):
+    return f'auth:token:{key}'
+
+
+def _chave_usuario(user_id):
+    return f'auth:usuario:{user_id}'
+
+
+def _buscar_token():
+    return Token.objects.select_related('user', 'user__professor', 'user__aluno')
+
+
+def _guardar(token):
+    ttl = settings.AUTH_TOKEN_CACHE_SEGUNDOS
+    cache.set_many({
+        _chave_token(token.key): token,
+        _chave_usuario(token.user_id): token.key,
+    }, ttl)
+
+
+def invalidar_token(key):
+    cache.delete(_chave_token(key))
+
+
+def invalidar_usuario(user_id):
+    """Remove do cache o token do usuário (cada usuário tem no máximo um Token)"""
+    key = cache.get(_chave_usuario(user_id))
+    cache.delete_many([_chave_usuario(user_id)] + ([_chave_token(key)] if key else []))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication do DRF com resolução token → usuário em cache (TTL)"""
+
+    def authenticate_credentials(self, key):
+        token = cache.get(_chave_token(key))
+        metricas.contar_cache('token', token is not None)
+        if token is None:
+            try:
+                token = _buscar_token().get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            _guardar(token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
+
+async def aautenticar_token(key):
+    """Versão assíncrona para as views ASGI; retorna o usuário ou None"""
+    token = await cache.aget(_chave_token(key))
+    metricas.contar_cache('token', token is not None)
+    if token is None:
+        try:
+            token = await _buscar_token().aget(key=key)
+        except Token.DoesNotExist:
+            return None
+        await cache.aset_many({
+            _chave_token(token.key): token,
+            _chave_usuario(token.user_id): token.key,
+        }, settings.AUTH_TOKEN_CACHE_SEGUNDOS)
+    return token.user if token.user.is_active else None
+
+
+# ========== TOKENS ASSINADOS (JWT) ==========
+
+def jwt_ativo():
+    return settings.AUTH_TOKEN_MODO == 'jwt'
+
+
+def papel_do_usuario(user):
+    if user.is_staff:
+        return 'staff'
+    if hasattr(user, 'professor'):
+        return 'professor'
+    if hasattr(user, 'aluno'):
+        return 'aluno'
+    return None
+
+
+class RefreshTokenComPapel(RefreshToken):
+    """Refresh token cujo access derivado carrega id, papel e perfis do usuário"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        # iat tem resolução de segundos; o corte de revogação compara com este instante
+        token['emitido_em'] = time.time()
+        token['username'] = user.username
+        token['papel'] = papel_do_usuario(user)
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        if hasattr(user, 'professor'):
+            token['professor_id'] = user.professor.id
+        if hasattr(user, 'aluno'):
+            token['aluno_id'] = user.aluno.id
+        return token
+
+
+def emitir_tokens(user):
+    refresh = RefreshTokenComPapel.for_user(user)
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'token_type': 'Bearer',
+    }
+
+
+def _chave_revogado(jti):
+    return f'auth:jwt:revogado:{jti}'
+
+
+def _chave_corte(user_id):
+    return f'auth:jwt:corte:{user_id}'
+
+
+def revogar_jwt(token):
+    """Coloca um token específico (pelo jti) na lista de revogação até expirar"""
+    restante = int(token['exp'] - time.time())
+    if restante > 0:
+        cache.set(_chave_revogado(token[jwt_settings.JTI_CLAIM]), True, restante)
+
+
+def revogar_tokens_usuario(user_id):
+    """Invalida todos os tokens do usuário emitidos antes de agora"""
+    validade = int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds())
+    cache.set(_chave_corte(user_id), time.time(), validade)
+
+
+def verificar_revogacao(token):
+    user_id = int(token[jwt_settings.USER_ID_CLAIM])
+    chaves = [_chave_revogado(token[jwt_settings.JTI_CLAIM]), _chave_corte(user_id)]
+    valores = cache.get_many(chaves)
+    if valores.get(chaves[0]):
+        raise InvalidToken(_('Token revogado.'))
+    corte = valores.get(chaves[1])
+    if corte is not None and token.get('emitido_em', token['iat']) < corte:
+        raise InvalidToken(_('Token revogado.'))
+
+
+class UsuarioToken(TokenUser):
+    """
+    Usuário reconstruído apenas a partir do token. `professor` e `aluno` são
+    instâncias com apenas o id carregado: filtros e comparações não consultam
+    o banco; outros campos são carregados sob demanda.
+    """
+
+    @cached_property
+    def id(self):
+        return int(self.token[jwt_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def papel(self):
+        return self.token.get('papel')
+
+    def _perfil(self, modelo, claim):
+        perfil_id = self.token.get(claim)
+        if perfil_id is None:
+            raise AttributeError(claim)
+        return modelo.from_db(None, ['id'], [perfil_id])
+
+    @cached_property
+    def professor(self):
+        from .models import Professor
+        return self._perfil(Professor, 'professor_id')
+
+    @cached_property
+    def aluno(self):
+        from .models import Aluno
+        return self._perfil(Aluno, 'aluno_id')
+
+    def __getattr__(self, attr):
+        # TokenUser devolve claims para atributos desconhecidos; sem o perfil no
+        # token, hasattr(user, 'professor'/'aluno') precisa ser False
+        if attr in ('professor', 'aluno'):
+            raise AttributeError(attr)
+        return super().__getattr__(attr)
+
+
+class JWTStatelessAuthentication(JWTStatelessUserAuthentication):
+    """Access token verificado pela assinatura + lista de revogação em cache (sem banco)"""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        verificar_revogacao(token)
+        return token
+
+
+class JWTContaAuthentication(JWTAuthentication):
+    """
+    Variante que carrega o User do banco, para as rotas de conta
+    (perfil, troca de senha, logout) que precisam do objeto completo.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        verificar_revogacao(token)
+        return token
+
+
+def usuario_do_jwt(raw_token):
+    """Usado pelas views assíncronas; retorna o usuário do token ou None"""
+    try:
+        token = JWTStatelessAuthentication().get_validated_token(raw_token.encode())
+    except InvalidToken:
+        return None
+    return UsuarioToken(token)
+
+
+# Classes usadas pelas views (o modo JWT é opcional)
+AUTENTICACAO_PADRAO = (
+    [JWTStatelessAuthentication] if jwt_ativo() else []
+) + [CachedTokenAuthentication, SessionAuthentication]
+
+AUTENTICACAO_CONTA = (
+    [JWTContaAuthentication] if jwt_ativo() else []
+) + [CachedTokenAuthentication, SessionAuthentication]
@@ -0,0 +1,315 @@
+# app/banco_analitico.py
+"""
+Banco analítico embutido para o BI (arquivo SQLite separado).
+
+As ferramentas de BI consultam este arquivo, nunca o banco da aplicação:
+- presenca: uma linha por presença já com os atributos de aluno, turma e
+  professor (sem joins na hora da consulta), indexada por data, turma,
+  aluno e professor;
+- presenca_diaria: totais por dia e turma;
+- dim_aluno, dim_turma, dim_professor e matricula: cópias usadas para
+  desnormalizar.
+
+A atualização é incremental (comando atualizar_banco_analitico): lê do
+banco da aplicação só as presenças e matrículas com atualizado_em acima da
+marca d'água da última execução, aplica as exclusões registradas em
+RegistroExclusao e recalcula apenas os dias afetados. A marca guarda também
+o último id da outbox de captura (app/captura.py): escritas de transações
+que ainda estavam abertas têm id maior e antecipam o instante de releitura
+(captura.inicio_seguro); BANCO_ANALITICO_MARGEM_SEGUNDOS cobre só a
+diferença entre o atualizado_em preenchido pelo Python e o gatilho. As dimensões são
+pequenas: são relidas inteiras e só as linhas cujos atributos mudaram são
+redesnormalizadas. Tudo é gravado em uma transação; leitores (WAL) veem
+sempre o estado anterior ou o novo, completo.
+"""
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .captura import inicio_seguro, ultimo_id
+from .models import Aluno, Turma, Professor, Matricula, Presenca, RegistroExclusao
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS _marcas (nome TEXT PRIMARY KEY, valor TEXT NOT NULL);
+
+CREATE TABLE IF NOT EXISTS dim_aluno (
+    aluno_id INTEGER PRIMARY KEY, nome TEXT, matricula TEXT, curso TEXT, genero TEXT,
+    data_nascimento TEXT, data_cadastro TEXT
+);
+CREATE TABLE IF NOT EXISTS dim_professor (
+    professor_id INTEGER PRIMARY KEY, nome TEXT, departamento TEXT, ativo INTEGER
+);
+CREATE TABLE IF NOT EXISTS dim_turma (
+    turma_id INTEGER PRIMARY KEY, nome TEXT, status TEXT, professor_id INTEGER,
+    data_inicio TEXT, data_fim TEXT
+);
+CREATE TABLE IF NOT EXISTS matricula (
+    matricula_id INTEGER PRIMARY KEY, aluno_id INTEGER, turma_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS presenca (
+    presenca_id INTEGER PRIMARY KEY, data TEXT NOT NULL, status TEXT NOT NULL, presente INTEGER NOT NULL,
+    observacao TEXT, data_registro TEXT, atualizado_em TEXT, matricula_id INTEGER,
+    aluno_id INTEGER, aluno_nome TEXT, aluno_matricula TEXT, aluno_curso TEXT, aluno_genero TEXT,
+    turma_id INTEGER, turma_nome TEXT, turma_status TEXT,
+    professor_id INTEGER, professor_nome TEXT, professor_departamento TEXT
+);
+CREATE INDEX IF NOT EXISTS presenca_data ON presenca (data);
+CREATE INDEX IF NOT EXISTS presenca_turma_data ON presenca (turma_id, data);
+CREATE INDEX IF NOT EXISTS presenca_aluno_data ON presenca (aluno_id, data);
+CREATE INDEX IF NOT EXISTS presenca_professor_data ON presenca (professor_id, data);
+CREATE INDEX IF NOT EXISTS presenca_matricula ON presenca (matricula_id);
+
+CREATE TABLE IF NOT EXISTS presenca_diaria (
+    data TEXT NOT NULL, turma_id INTEGER NOT NULL, turma_nome TEXT,
+    professor_id INTEGER, professor_nome TEXT,
+    total INTEGER, presentes INTEGER, ausentes INTEGER, justificados INTEGER, percentual_presenca REAL,
+    PRIMARY KEY (data, turma_id)
+);
+CREATE INDEX IF NOT EXISTS presenca_diaria_professor ON presenca_diaria (professor_id, data);
+"""
+
+# Tabela → (consulta no banco da aplicação, chave)
+DIMENSOES = {
+    'dim_aluno': (
+        lambda: Aluno.objects.values_list(
+            'id', 'nome', 'matricula', 'curso', 'genero', 'data_nascimento', 'data_cadastro'
+        ),
+        'aluno_id',
+    ),
+    'dim_professor': (lambda: Professor.objects.values_list('id', 'nome', 'departamento', 'ativo'), 'professor_id'),
+    'dim_turma': (
+        lambda: Turma.objects.values_list('id', 'nome', 'status', 'professor_id', 'data_inicio', 'data_fim'),
+        'turma_id',
+    ),
+}
+
+TAMANHO_BLOCO = 2000
+
+
+def _texto(valor):
+    """Datas e instantes como texto ISO (ordenável, legível por qualquer ferramenta)"""
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=' ')
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def _inserir(conexao, tabela, linhas):
+    """INSERT em blocos a partir de um iterator do ORM; retorna quantas linhas"""
+    total, bloco = 0, []
+    for linha in linhas:
+        bloco.append(tuple(_texto(valor) for valor in linha))
+        if len(bloco) >= TAMANHO_BLOCO:
+            total += _gravar_bloco(conexao, tabela, bloco)
+            bloco = []
+    if bloco:
+        total += _gravar_bloco(conexao, tabela, bloco)
+    return total
+
+
+def _gravar_bloco(conexao, tabela, bloco):
+    marcadores = ', '.join('?' * len(bloco[0]))
+    conexao.executemany(f'INSERT OR REPLACE INTO {tabela} VALUES ({marcadores})', bloco)
+    return len(bloco)
+
+
+def _temporaria(conexao, nome, colunas):
+    conexao.execute(f'DROP TABLE IF EXISTS temp.{nome}')
+    conexao.execute(f'CREATE TEMP TABLE {nome} ({colunas})')
+
+
+def conectar(arquivo=None):
+    """Conexão somente leitura com o banco analítico (para scripts e ferramentas de BI)"""
+    arquivo = arquivo or settings.BANCO_ANALITICO_NAME
+    return sqlite3.connect(f'file:{arquivo}?mode=ro', uri=True)
+
+
+def marca_atual(conexao):
+    linha = conexao.execute("SELECT valor FROM _marcas WHERE nome = 'atualizado_em'").fetchone()
+    return datetime.fromisoformat(linha[0]) if linha else None
+
+
+def _inicio(conexao, marca):
+    """Instante desde o qual reler (sem a margem); None = reconstruir tudo"""
+    linha = conexao.execute("SELECT valor FROM _marcas WHERE nome = 'mudanca'").fetchone()
+    if linha is None:
+        return None  # marca gravada antes do id da outbox
+    return inicio_seguro(int(linha[0]), marca, [Matricula, Presenca])
+
+
+# ========== ATUALIZAÇÃO ==========
+
+def _dimensoes(conexao):
+    """Recopia as dimensões; as chaves novas, alteradas ou removidas ficam em temp.mudou_<tabela>"""
+    for tabela, (consulta, chave) in DIMENSOES.items():
+        conexao.execute(f'DROP TABLE IF EXISTS temp.nova_{tabela}')
+        conexao.execute(f'CREATE TEMP TABLE nova_{tabela} AS SELECT * FROM {tabela} WHERE 0')
+        _inserir(conexao, f'temp.nova_{tabela}', consulta().order_by().iterator(chunk_size=TAMANHO_BLOCO))
+
+        _temporaria(conexao, f'mudou_{tabela}', 'chave INTEGER PRIMARY KEY')
+        conexao.execute(
+            f'INSERT OR IGNORE INTO temp.mudou_{tabela} '
+            f'SELECT {chave} FROM (SELECT * FROM temp.nova_{tabela} EXCEPT SELECT * FROM {tabela}) '
+            f'UNION SELECT {chave} FROM (SELECT * FROM {tabela} EXCEPT SELECT * FROM temp.nova_{tabela})'
+        )
+        conexao.execute(f'DELETE FROM {tabela}')
+        conexao.execute(f'INSERT INTO {tabela} SELECT * FROM temp.nova_{tabela}')
+        conexao.execute(f'DROP TABLE temp.nova_{tabela}')
+
+
+def _exclusoes(modelo, desde):
+    if desde is None:
+        return []
+    return RegistroExclusao.objects.filter(modelo=modelo, excluido_em__gt=desde).values_list('objeto_id')
+
+
+def _atualizar(conexao, desde):
+    relatorio = {}
+    _temporaria(conexao, 'alteradas', 'presenca_id INTEGER PRIMARY KEY')
+    _temporaria(conexao, 'dias', 'data TEXT PRIMARY KEY')
+    if desde is None:
+        for tabela in ('presenca', 'presenca_diaria', 'matricula'):
+            conexao.execute(f'DELETE FROM {tabela}')
+
+    _dimensoes(conexao)
+
+    # Matrículas alteradas: se o aluno ou a turma mudou, as presenças são redesnormalizadas
+    matriculas = Matricula.objects.order_by()
+    if desde is not None:
+        matriculas = matriculas.filter(atualizado_em__gt=desde)
+    _temporaria(conexao, 'nova_matricula', 'matricula_id INTEGER PRIMARY KEY, aluno_id INTEGER, turma_id INTEGER')
+    _inserir(conexao, 'temp.nova_matricula', matriculas.values_list('id', 'aluno_id', 'turma_id').iterator(
+        chunk_size=TAMANHO_BLOCO
+    ))
+    conexao.execute(
+        'INSERT OR IGNORE INTO temp.alteradas SELECT p.presenca_id FROM presenca p '
+        'JOIN temp.nova_matricula m USING (matricula_id) '
+        'WHERE p.aluno_id IS NOT m.aluno_id OR p.turma_id IS NOT m.turma_id'
+    )
+    conexao.execute('INSERT OR REPLACE INTO matricula SELECT * FROM temp.nova_matricula')
+    conexao.executemany('DELETE FROM matricula WHERE matricula_id = ?', _exclusoes('matricula', desde))
+
+    # Presenças alteradas: a data antiga e a nova entram no recálculo diário
+    presencas = Presenca.objects.order_by()
+    if desde is not None:
+        presencas = presencas.filter(atualizado_em__gt=desde)
+    _temporaria(
+        conexao, 'nova_presenca',
+        'presenca_id INTEGER PRIMARY KEY, data TEXT, status TEXT, observacao TEXT, '
+        'data_registro TEXT, atualizado_em TEXT, matricula_id INTEGER'
+    )
+    relatorio['presencas'] = _inserir(conexao, 'temp.nova_presenca', presencas.values_list(
+        'id', 'data', 'status', 'observacao', 'data_registro', 'atualizado_em', 'matricula_id'
+    ).iterator(chunk_size=TAMANHO_BLOCO))
+    conexao.execute(
+        'INSERT OR IGNORE INTO temp.dias SELECT p.data FROM presenca p JOIN temp.nova_presenca USING (presenca_id)'
+    )
+    conexao.execute(
+        'INSERT OR REPLACE INTO presenca (presenca_id, data, status, presente, observacao, data_registro, '
+        "atualizado_em, matricula_id) SELECT presenca_id, data, status, status = 'Presente', observacao, "
+        'data_registro, atualizado_em, matricula_id FROM temp.nova_presenca'
+    )
+    conexao.execute('INSERT OR IGNORE INTO temp.alteradas SELECT presenca_id FROM temp.nova_presenca')
+
+    # Presenças excluídas (inclusive em cascata, via RegistroExclusao)
+    _temporaria(conexao, 'removidas', 'presenca_id INTEGER PRIMARY KEY')
+    conexao.executemany('INSERT OR IGNORE INTO temp.removidas VALUES (?)', _exclusoes('presenca', desde))
+    conexao.execute(
+        'INSERT OR IGNORE INTO temp.dias SELECT data FROM presenca '
+        'WHERE presenca_id IN (SELECT presenca_id FROM temp.removidas)'
+    )
+    relatorio['removidas'] = conexao.execute(
+        'DELETE FROM presenca WHERE presenca_id IN (SELECT presenca_id FROM temp.removidas)'
+    ).rowcount
+
+    # Aluno, turma ou professor com atributos alterados
+    conexao.execute(
+        'INSERT OR IGNORE INTO temp.alteradas SELECT presenca_id FROM presenca '
+        'WHERE aluno_id IN (SELECT chave FROM temp.mudou_dim_aluno) '
+        'OR turma_id IN (SELECT chave FROM temp.mudou_dim_turma) '
+        'OR professor_id IN (SELECT chave FROM temp.mudou_dim_professor)'
+    )
+    relatorio['desnormalizadas'] = conexao.execute("""
+        UPDATE presenca SET
+            aluno_id = n.aluno_id, aluno_nome = n.aluno_nome, aluno_matricula = n.aluno_matricula,
+            aluno_curso = n.aluno_curso, aluno_genero = n.aluno_genero,
+            turma_id = n.turma_id, turma_nome = n.turma_nome, turma_status = n.turma_status,
+            professor_id = n.professor_id, professor_nome = n.professor_nome,
+            professor_departamento = n.professor_departamento
+        FROM (
+            SELECT p.presenca_id, m.aluno_id, a.nome AS aluno_nome, a.matricula AS aluno_matricula,
+                   a.curso AS aluno_curso, a.genero AS aluno_genero, m.turma_id, t.nome AS turma_nome,
+                   t.status AS turma_status, t.professor_id, pr.nome AS professor_nome,
+                   pr.departamento AS professor_departamento
+            FROM temp.alteradas x
+                JOIN presenca p ON p.presenca_id = x.presenca_id
+                LEFT JOIN matricula m ON m.matricula_id = p.matricula_id
+                LEFT JOIN dim_aluno a ON a.aluno_id = m.aluno_id
+                LEFT JOIN dim_turma t ON t.turma_id = m.turma_id
+                LEFT JOIN dim_professor pr ON pr.professor_id = t.professor_id
+        ) AS n
+        WHERE n.presenca_id = presenca.presenca_id
+    """).rowcount
+    conexao.execute(
+        'INSERT OR IGNORE INTO temp.dias SELECT DISTINCT data FROM presenca '
+        'WHERE presenca_id IN (SELECT presenca_id FROM temp.alteradas)'
+    )
+
+    # Totais diários só dos dias afetados
+    conexao.execute('DELETE FROM presenca_diaria WHERE data IN (SELECT data FROM temp.dias)')
+    conexao.execute("""
+        INSERT INTO presenca_diaria
+        SELECT data, turma_id, MAX(turma_nome), MAX(professor_id), MAX(professor_nome), COUNT(*),
+               SUM(status = 'Presente'), SUM(status = 'Ausente'), SUM(status = 'Justificado'),
+               ROUND(100.0 * SUM(presente) / COUNT(*), 2)
+        FROM presenca
+        WHERE data IN (SELECT data FROM temp.dias) AND turma_id IS NOT NULL
+        GROUP BY data, turma_id
+    """)
+    relatorio['dias'] = conexao.execute('SELECT COUNT(*) FROM temp.dias').fetchone()[0]
+    return relatorio
+
+
+def atualizar(arquivo=None, completo=False):
+    """
+    Atualiza o banco analítico a partir do banco da aplicação; com `completo`
+    (ou sem marca d'água válida) reconstrói tudo. Retorna um relatório.
+    """
+    arquivo = arquivo or settings.BANCO_ANALITICO_NAME
+    inicio = time.perf_counter()
+    agora, apos = timezone.now(), ultimo_id()
+
+    with closing(sqlite3.connect(str(arquivo), isolation_level=None)) as conexao:
+        conexao.execute('PRAGMA journal_mode=WAL')
+        conexao.executescript(ESQUEMA)
+
+        marca = None if completo else marca_atual(conexao)
+        # Exclusões mais antigas que a retenção já podem ter sido compactadas
+        if marca is not None and marca < agora - timedelta(days=settings.SYNC_RETENCAO_DIAS):
+            marca = None
+        if marca is not None:
+            marca = _inicio(conexao, marca)
+        desde = marca - timedelta(seconds=settings.BANCO_ANALITICO_MARGEM_SEGUNDOS) if marca else None
+
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            relatorio = _atualizar(conexao, desde)
+            conexao.executemany(
+                'INSERT OR REPLACE INTO _marcas VALUES (?, ?)',
+                [('atualizado_em', agora.isoformat()), ('mudanca', str(apos))]
+            )
+            conexao.execute('COMMIT')
+        except BaseException:
+            conexao.execute('ROLLBACK')
+            raise
+        conexao.execute('PRAGMA optimize')
+
+    relatorio['completo'] = desde is None
+    relatorio['segundos'] = round(time.perf_counter() - inicio, 3)
+    return relatorio
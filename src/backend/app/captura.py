@@ -0,0 +1,161 @@
+# app/captura.py
+"""
+Captura de mudanças (CDC) para o BI: outbox RegistroMudanca.
+
+- Gatilhos do SQLite (AFTER INSERT/UPDATE/DELETE) em Presenca, Matricula,
+  Turma, Aluno e Professor gravam cada mudança na outbox dentro da mesma
+  transação da escrita. Vale também para bulk_create, update(), exclusões
+  em cascata e SQL direto. Atualizações que só mudam atualizado_em (ou nada)
+  não geram registro.
+- Os gatilhos são recriados depois de cada migrate (o SQLite recria a
+  tabela em várias alterações de schema e os gatilhos se perderiam).
+- Consumo por cursor (id crescente, nunca reutilizado): /api/mudancas/ e o
+  comando exportar_mudancas (NDJSON). Cada consumidor confirma sua posição;
+  os registros já confirmados por todos são compactados (apagados).
+
+A entrega é "pelo menos uma vez": o consumidor deve ignorar ids repetidos.
+"""
+import logging
+
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import RegistroMudanca, ConsumidorMudancas
+
+logger = logging.getLogger(__name__)
+
+MODELOS_CAPTURADOS = ['Presenca', 'Matricula', 'Turma', 'Aluno', 'Professor']
+# Colunas que, sozinhas, não caracterizam mudança para o BI
+COLUNAS_IGNORADAS = {'atualizado_em'}
+OPERACOES = {'INSERT': 'criado', 'UPDATE': 'atualizado', 'DELETE': 'excluido'}
+
+
+# ========== GATILHOS ==========
+
+def _nome_gatilho(tabela, evento):
+    return f'captura_{tabela}_{evento.lower()}'
+
+
+def sql_gatilhos(modelo, tabela_saida):
+    """DROP/CREATE TRIGGER que gravam as mudanças de `modelo` em `tabela_saida`"""
+    tabela = modelo._meta.db_table
+    colunas = [campo.column for campo in modelo._meta.concrete_fields]
+    pk = modelo._meta.pk.column
+
+    comandos = []
+    for evento, operacao in OPERACOES.items():
+        linha = 'OLD' if evento == 'DELETE' else 'NEW'
+        dados = ', '.join(f"'{coluna}', {linha}.\"{coluna}\"" for coluna in colunas)
+        condicao = ''
+        if evento == 'UPDATE':
+            mudou = ' OR '.join(
+                f'OLD."{coluna}" IS NOT NEW."{coluna}"' for coluna in colunas if coluna not in COLUNAS_IGNORADAS
+            )
+            condicao = f' WHEN {mudou}'
+
+        nome = _nome_gatilho(tabela, evento)
+        comandos.append(f'DROP TRIGGER IF EXISTS "{nome}"')
+        comandos.append(
+            f'CREATE TRIGGER "{nome}" AFTER {evento} ON "{tabela}" FOR EACH ROW{condicao} BEGIN '
+            f'INSERT INTO "{tabela_saida}" ("tabela", "objeto_id", "operacao", "dados", "registrado_em") '
+            f"VALUES ('{tabela}', {linha}.\"{pk}\", '{operacao}', json_object({dados}), "
+            f"strftime('%Y-%m-%d %H:%M:%f', 'now')); END"
+        )
+    return comandos
+
+
+def instalar_gatilhos(apps, schema_editor=None, using='default'):
+    """Cria (ou recria) os gatilhos com as colunas atuais dos modelos; usado por migração e post_migrate"""
+    connection = schema_editor.connection if schema_editor else connections[using]
+    if connection.vendor != 'sqlite':
+        logger.warning('Captura de mudanças por gatilhos só está implementada para SQLite')
+        return
+
+    saida = apps.get_model('app', 'RegistroMudanca')._meta.db_table
+    with connection.cursor() as cursor:
+        for nome in MODELOS_CAPTURADOS:
+            for comando in sql_gatilhos(apps.get_model('app', nome), saida):
+                cursor.execute(comando)
+
+
+def remover_gatilhos(apps, schema_editor=None, using='default'):
+    connection = schema_editor.connection if schema_editor else connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for nome in MODELOS_CAPTURADOS:
+            tabela = apps.get_model('app', nome)._meta.db_table
+            for evento in OPERACOES:
+                cursor.execute(f'DROP TRIGGER IF EXISTS "{_nome_gatilho(tabela, evento)}"')
+
+
+# ========== CONSUMO ==========
+
+def ler_mudancas(apos, limite):
+    """Mudanças com id > apos, em ordem; retorna (lista, novo cursor)"""
+    mudancas = list(
+        RegistroMudanca.objects.filter(id__gt=apos).order_by('id')
+        .values('id', 'tabela', 'objeto_id', 'operacao', 'dados', 'registrado_em')[:limite]
+    )
+    return mudancas, (mudancas[-1]['id'] if mudancas else apos)
+
+
+def posicao(consumidor):
+    return ConsumidorMudancas.objects.filter(nome=consumidor).values_list('posicao', flat=True).first() or 0
+
+
+def ultimo_id():
+    """Maior id já gravado no outbox (os compactados contam pelas posições dos consumidores)"""
+    gravado = RegistroMudanca.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+    confirmado = ConsumidorMudancas.objects.aggregate(ultimo=Max('posicao'))['ultimo'] or 0
+    return max(gravado, confirmado)
+
+
+def inicio_seguro(apos, marca, modelos):
+    """
+    Instante desde o qual reler por atualizado_em para não perder nada do que
+    foi gravado depois do registro `apos` da outbox, tomado junto com `marca`.
+
+    O relógio não serve sozinho: uma transação longa grava atualizado_em
+    antigo e só fica visível depois. Os ids da outbox seguem a ordem de commit
+    (no SQLite as escritas são serializadas), então tudo o que ficou visível
+    depois da marca tem id > `apos`; o menor registrado_em desses registros
+    (dos `modelos` indicados) antecipa o instante. Retorna None quando
+    registros posteriores a `apos` já foram compactados: é preciso reler tudo.
+    Sem os gatilhos (outros bancos) vale só `marca`.
+    """
+    tabelas = [modelo._meta.db_table for modelo in modelos]
+    posteriores = RegistroMudanca.objects.filter(id__gt=apos).aggregate(
+        primeiro=Min('id'), registrado=Min('registrado_em', filter=Q(tabela__in=tabelas))
+    )
+    if posteriores['primeiro'] is None:
+        return None if ultimo_id() > apos else marca
+    if posteriores['primeiro'] != apos + 1:
+        return None
+    if posteriores['registrado'] is not None:
+        return min(marca, posteriores['registrado'])
+    return marca
+
+
+def confirmar(consumidor, ate):
+    """
+    Registra que `consumidor` já processou tudo até o id `ate` (nunca retrocede).
+    `ate` é limitado ao último id existente: confirmar ids futuros faria o
+    consumidor pular mudanças e a compactação apagá-las sem leitura.
+    """
+    ate = min(ate, ultimo_id())
+    registro, criado = ConsumidorMudancas.objects.get_or_create(nome=consumidor, defaults={'posicao': ate})
+    if not criado and ate > registro.posicao:
+        ConsumidorMudancas.objects.filter(pk=registro.pk, posicao__lt=ate).update(
+            posicao=ate, atualizado_em=timezone.now()
+        )
+
+
+def compactar():
+    """Apaga os registros já confirmados por todos os consumidores; retorna quantos"""
+    minimo = ConsumidorMudancas.objects.aggregate(posicao=Min('posicao'))['posicao']
+    if not minimo:
+        return 0
+    apagados, _ = RegistroMudanca.objects.filter(id__lte=minimo).delete()
+    return apagados
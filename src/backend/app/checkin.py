@@ -0,0 +1,207 @@
+# app/checkin.py
+"""
+Check-in dos alunos pelo código que o professor exibe em sala.
+
+- O código é assinado (django.core.signing) com a turma, a data da aula e
+  validade curta: é verificado sem consultar o banco.
+- A relação aluno → matrícula da turma fica em cache, carregada quando o
+  professor gera o código.
+- Check-ins repetidos são descartados em memória; os aceitos são gravados em
+  lotes (bulk_create + recálculo da presença acumulada em um UPDATE) por uma
+  thread do processo, a cada CHECKIN_INTERVALO_FLUSH segundos ou quando o
+  lote enche.
+
+Check-ins aceitos ficam em memória até o próximo lote (no máximo
+CHECKIN_INTERVALO_FLUSH segundos) e se perdem se o processo cair antes
+dele; por isso a resposta diz "recebido", não "registrado". Só um check-in
+repetido depois da gravação responde "ja_registrado". Presenças já lançadas
+pelo professor para o dia não são sobrescritas.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import metricas
+from .eventos import publicar_presenca
+from .models import Matricula, Presenca
+from .transacoes import com_retentativa
+
+logger = logging.getLogger(__name__)
+
+SALT = 'app.checkin'
+OBSERVACAO = 'Check-in pelo aluno'
+
+# Resultados de ColetorCheckin.registrar()
+RECEBIDO = 'recebido'  # aceito, aguardando o próximo lote (ainda em memória)
+JA_RECEBIDO = 'ja_recebido'  # repetido, o primeiro ainda aguarda o lote
+JA_REGISTRADO = 'ja_registrado'  # repetido, já gravado no banco
+
+
+class CodigoInvalido(Exception):
+    pass
+
+
+# ========== CÓDIGO ASSINADO ==========
+
+def gerar_codigo(turma_id, data=None):
+    """Código da aula de hoje (ou `data`) para a turma; pré-carrega a lista de matrículas"""
+    data = data or timezone.localdate()
+    carregar_roster(turma_id)
+    codigo = signing.dumps({'t': turma_id, 'd': data.isoformat()}, salt=SALT, compress=True)
+    return codigo, data
+
+
+def ler_codigo(codigo):
+    """Retorna (turma_id, data) de um código válido, sem consultar o banco"""
+    try:
+        dados = signing.loads(codigo, salt=SALT, max_age=settings.CHECKIN_VALIDADE_SEGUNDOS)
+    except signing.SignatureExpired:
+        raise CodigoInvalido('Código expirado. Leia o código atual exibido pelo professor.')
+    except signing.BadSignature:
+        raise CodigoInvalido('Código inválido.')
+    return dados['t'], date.fromisoformat(dados['d'])
+
+
+# ========== MATRÍCULAS DA TURMA EM CACHE ==========
+
+def _chave_roster(turma_id):
+    return f'checkin:roster:{turma_id}'
+
+
+def carregar_roster(turma_id):
+    roster = dict(Matricula.objects.filter(turma_id=turma_id).values_list('aluno_id', 'id'))
+    # Sobrevive a algumas renovações do código exibido em sala
+    cache.set(_chave_roster(turma_id), roster, settings.CHECKIN_VALIDADE_SEGUNDOS * 10)
+    return roster
+
+
+def matricula_do_aluno(turma_id, aluno_id):
+    roster = cache.get(_chave_roster(turma_id))
+    metricas.contar_cache('roster_checkin', roster is not None)
+    if roster is None or aluno_id not in roster:
+        # Cache expirado ou matrícula feita depois que o código foi gerado
+        roster = carregar_roster(turma_id)
+    return roster.get(aluno_id)
+
+
+# ========== COLETOR EM LOTES ==========
+
+class ColetorCheckin:
+    """Deduplica check-ins em memória e os grava em lotes numa thread própria"""
+
+    def __init__(self, intervalo=None, tamanho_lote=None):
+        self.intervalo = intervalo or settings.CHECKIN_INTERVALO_FLUSH
+        self.tamanho_lote = tamanho_lote or settings.CHECKIN_TAMANHO_LOTE
+        self._pendentes = {}      # (matricula_id, data) -> momento do aceite
+        self._gravados = set()    # (matricula_id, data) já gravados
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        # Estatísticas para monitoramento/benchmark
+        self.esperas = deque(maxlen=100_000)  # aceite → gravação (segundos)
+        self.lotes = 0
+        self.gravados = 0
+
+    def registrar(self, matricula_id, data):
+        """Aceita o check-in; retorna RECEBIDO, JA_RECEBIDO ou JA_REGISTRADO"""
+        chave = (matricula_id, data)
+        with self._lock:
+            if chave in self._gravados:
+                return JA_REGISTRADO
+            if chave in self._pendentes:
+                return JA_RECEBIDO
+            self._pendentes[chave] = time.monotonic()
+            cheio = len(self._pendentes) >= self.tamanho_lote
+        self._iniciar()
+        if cheio:
+            self._acordar.set()
+        return RECEBIDO
+
+    def pendentes(self):
+        with self._lock:
+            return len(self._pendentes)
+
+    def descarregar(self):
+        """Grava tudo o que está pendente; retorna quantos check-ins foram gravados"""
+        with self._lock:
+            lote, self._pendentes = self._pendentes, {}
+        if not lote:
+            return 0
+
+        try:
+            com_retentativa(self._gravar)(list(lote))
+        except Exception:
+            # Devolve ao buffer para a próxima rodada
+            with self._lock:
+                for chave, aceito_em in lote.items():
+                    self._pendentes.setdefault(chave, aceito_em)
+            raise
+
+        agora = time.monotonic()
+        ontem = timezone.localdate() - timedelta(days=1)
+        with self._lock:
+            self._gravados = {chave for chave in self._gravados if chave[1] >= ontem}
+            self._gravados.update(lote)
+            self.esperas.extend(agora - aceito_em for aceito_em in lote.values())
+            self.lotes += 1
+            self.gravados += len(lote)
+        return len(lote)
+
+    def _gravar(self, chaves):
+        Presenca.objects.bulk_create(
+            [
+                Presenca(matricula_id=matricula_id, data=data, status='Presente', observacao=OBSERVACAO)
+                for matricula_id, data in chaves
+            ],
+            batch_size=500, ignore_conflicts=True
+        )
+        matricula_ids = {matricula_id for matricula_id, _ in chaves}
+        Matricula.objects.filter(id__in=matricula_ids).recalcular_presenca()
+
+        presencas = Presenca.objects.filter(
+            matricula_id__in=matricula_ids, data__in={data for _, data in chaves},
+            observacao=OBSERVACAO
+        ).select_related('matricula')
+        recebidos = set(chaves)
+        novas = [p for p in presencas if (p.matricula_id, p.data) in recebidos]
+        transaction.on_commit(lambda: [publicar_presenca(p, p.matricula) for p in novas])
+
+    def _iniciar(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name='checkin-lotes', daemon=True)
+                self._thread.start()
+                atexit.register(self.descarregar)
+
+    def _executar(self):
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            try:
+                self.descarregar()
+            except Exception:
+                logger.exception('Falha ao gravar lote de check-ins; nova tentativa no próximo ciclo')
+
+
+_coletor = None
+_coletor_lock = threading.Lock()
+
+
+def get_coletor():
+    """Coletor do processo (criado sob demanda)"""
+    global _coletor
+    with _coletor_lock:
+        if _coletor is None:
+            _coletor = ColetorCheckin()
+        return _coletor
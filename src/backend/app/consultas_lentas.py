@@ -0,0 +1,165 @@
+# app/consultas_lentas.py
+"""
+Log de consultas lentas com o plano de execução.
+
+Toda consulta acima de CONSULTA_LENTA_MS (medida pelo execute_wrapper de
+app/instrumentacao.py, dentro ou fora de requisições) gera uma linha JSON
+no logger 'app.consultas_lentas' com a view de origem, a impressão digital
+do SQL (literais, parâmetros e listas IN normalizados) e a saída de
+EXPLAIN QUERY PLAN. O plano é obtido uma vez por impressão digital, em um
+cursor à parte na mesma conexão (não executa a consulta de novo).
+
+As ocorrências são agregadas por impressão digital no processo e
+listadas em /api/consultas-lentas/ (staff). Com
+METRICAS_DIRETORIO_MULTIPROCESSO o relatório soma todos os workers.
+Os valores dos parâmetros nunca são registrados.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metricas
+
+logger = logging.getLogger(__name__)
+
+COMANDOS_EXPLICAVEIS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+# Controle de transação: a demora é espera por lock/fsync, não consulta lenta
+COMANDOS_TRANSACAO = ('BEGIN', 'COMMIT', 'END', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+ORDENACOES = {'total': 'total_ms', 'max': 'max_ms', 'ocorrencias': 'ocorrencias'}
+
+_NORMALIZACOES = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),                 # literais de texto
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),              # números
+    (re.compile(r'%s'), '?'),                             # parâmetros
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),  # IN (?, ?, ...) de qualquer tamanho
+    (re.compile(r'\s+'), ' '),
+]
+
+_lock = threading.Lock()
+_agregado = {}
+_ultima_gravacao = 0.0
+
+
+def impressao_digital(sql):
+    """(SQL normalizado, hash curto) — consultas iguais a menos de valores têm a mesma impressão"""
+    normalizado = sql
+    for padrao, troca in _NORMALIZACOES:
+        normalizado = padrao.sub(troca, normalizado)
+    normalizado = normalizado.strip()
+    return normalizado, hashlib.sha1(normalizado.encode()).hexdigest()[:16]
+
+
+def _plano(connection, sql, params):
+    """Linhas do EXPLAIN QUERY PLAN indentadas pela árvore; [] se não der para explicar"""
+    if connection.vendor != 'sqlite' or not sql.lstrip().upper().startswith(COMANDOS_EXPLICAVEIS):
+        return []
+    from django.db.backends.sqlite3.base import SQLiteCursorWrapper
+
+    # Cursor próprio: o cursor da consulta ainda tem o resultado a ser lido
+    cursor = connection.connection.cursor(factory=SQLiteCursorWrapper)
+    try:
+        linhas = cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    finally:
+        cursor.close()
+    profundidade, plano = {0: -1}, []
+    for no, pai, _, detalhe in linhas:
+        profundidade[no] = profundidade.get(pai, -1) + 1
+        plano.append('  ' * profundidade[no] + detalhe)
+    return plano
+
+
+def controle_de_transacao(sql):
+    return sql.lstrip()[:10].upper().startswith(COMANDOS_TRANSACAO)
+
+
+def registrar(sql, params, many, duracao, connection, view):
+    """Chamado pelo medidor de SQL para cada consulta acima do limite"""
+    try:
+        normalizado, impressao = impressao_digital(sql)
+        ms = duracao * 1000
+        with _lock:
+            item = _agregado.get(impressao)
+            novo = item is None
+            if novo:
+                item = _agregado[impressao] = {
+                    'impressao': impressao, 'sql': normalizado, 'plano': None,
+                    'ocorrencias': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': {}, 'ultima_em': None,
+                }
+            item['ocorrencias'] += 1
+            item['total_ms'] += ms
+            item['max_ms'] = max(item['max_ms'], ms)
+            chave_view = view or '(fora de requisição)'
+            item['views'][chave_view] = item['views'].get(chave_view, 0) + 1
+            item['ultima_em'] = timezone.now().isoformat()
+        if novo and not many:
+            item['plano'] = _plano(connection, sql, params)
+
+        logger.warning(json.dumps({
+            'view': view,
+            'ms': round(ms, 2),
+            'impressao': impressao,
+            'sql': normalizado[:2000],
+            'plano': item['plano'] or [],
+        }, ensure_ascii=False))
+        _gravar_processo()
+    except Exception:
+        # A instrumentação nunca derruba a consulta original
+        logger.exception('Falha ao registrar consulta lenta')
+
+
+# ========== RELATÓRIO ==========
+
+def _estado():
+    with _lock:
+        return [dict(item, views=dict(item['views'])) for item in _agregado.values()]
+
+
+def _gravar_processo(forcar=False):
+    global _ultima_gravacao
+    if not settings.METRICAS_DIRETORIO_MULTIPROCESSO:
+        return
+    agora = time.monotonic()
+    if not forcar and agora - _ultima_gravacao < settings.METRICAS_INTERVALO_GRAVACAO:
+        return
+    if not _ultima_gravacao:
+        atexit.register(_gravar_processo, forcar=True)
+    _ultima_gravacao = agora
+    metricas.gravar_estado('consultas-lentas', _estado())
+
+
+def relatorio(ordenar='total', limite=50):
+    """Impressões digitais agregadas (deste processo ou de todos), das mais custosas para as menos"""
+    if settings.METRICAS_DIRETORIO_MULTIPROCESSO:
+        _gravar_processo(forcar=True)
+        estados = metricas.ler_estados('consultas-lentas')
+    else:
+        estados = [_estado()]
+
+    somados = {}
+    for estado in estados:
+        for item in estado:
+            total = somados.get(item['impressao'])
+            if total is None:
+                somados[item['impressao']] = dict(item, views=dict(item['views']))
+                continue
+            total['ocorrencias'] += item['ocorrencias']
+            total['total_ms'] += item['total_ms']
+            total['max_ms'] = max(total['max_ms'], item['max_ms'])
+            total['plano'] = total['plano'] or item['plano']
+            total['ultima_em'] = max(total['ultima_em'], item['ultima_em'])
+            for view, n in item['views'].items():
+                total['views'][view] = total['views'].get(view, 0) + n
+
+    itens = sorted(somados.values(), key=lambda item: -item[ORDENACOES[ordenar]])[:limite]
+    for item in itens:
+        item['media_ms'] = round(item['total_ms'] / item['ocorrencias'], 2)
+        item['total_ms'] = round(item['total_ms'], 2)
+        item['max_ms'] = round(item['max_ms'], 2)
+    return itens
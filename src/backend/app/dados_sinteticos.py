@@ -0,0 +1,282 @@
+# app/dados_sinteticos.py
+"""
+Dados sintéticos determinísticos: comando gerar_dados (demonstração e
+volumes de produção) e scripts/bench_suite.py.
+
+A mesma semente com os mesmos parâmetros gera sempre os mesmos professores,
+alunos, turmas, matrículas e presenças (nomes, vínculos e status; só os
+carimbos de cadastro/atualização mudam). As presenças de cada turma usam um
+gerador aleatório próprio, derivado da semente e do índice da turma, então
+o resultado não depende do número de processos.
+
+- Campi: professores, turmas e alunos são distribuídos entre os campi e
+  cada aluno só se matricula em turmas do seu campus.
+- Faltas: cada aluno tem a sua taxa de falta, sorteada pela distribuição
+  escolhida (DISTRIBUICOES_FALTA) com a média pedida; parte das faltas vira
+  'Justificado'.
+
+A carga não passa pelos signals nem pelo Presenca.save():
+- usuários e grupos como na importação de roster (senha inutilizável);
+- perfis, turmas e matrículas com bulk_create;
+- presenças com executemany direto na tabela, em blocos com commit; com
+  processos > 1, as turmas são divididas em fatias geradas em paralelo
+  (app/geracao_presencas.py, sem Django, para funcionar também com spawn),
+  cada uma num SQLite temporário, copiado para a tabela com INSERT ... SELECT
+  na ordem das fatias (mesmos ids da geração serial);
+- os gatilhos de captura de mudanças (app/captura.py) continuam ativos: a
+  carga entra no outbox como qualquer escrita (sem buracos nos ids, que os
+  consumidores leriam como compactação) e sai dele pela compactação depois
+  de confirmada. Com sem_captura os gatilhos ficam desligados durante a carga;
+- presenca_acumulada é recalculada uma vez, no fim.
+"""
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.db import connection, transaction
+
+from . import captura
+from .geracao_presencas import INICIO, COLUNAS_PRESENCA, gerar_fatia, linhas_turmas
+from .models import Professor, Aluno, Turma, Matricula, Presenca
+from .provisionamento import criar_usuarios, gerar_senhas
+
+# Presenças = alunos x turmas_por_aluno x semanas x aulas_por_semana
+ESCALAS = {
+    'demo': {'alunos': 50, 'professores': 6, 'turmas': 6, 'turmas_por_aluno': 2, 'semanas': 16},
+    'minima': {'alunos': 200, 'professores': 5, 'turmas': 10, 'turmas_por_aluno': 3, 'semanas': 8},
+    'pequena': {'alunos': 1_000, 'professores': 20, 'turmas': 50, 'turmas_por_aluno': 4, 'semanas': 16},
+    'media': {'alunos': 10_000, 'professores': 150, 'turmas': 400, 'turmas_por_aluno': 5, 'semanas': 20},
+    'grande': {'alunos': 100_000, 'professores': 1_200, 'turmas': 4_000, 'turmas_por_aluno': 5, 'semanas': 20},
+}
+TAMANHO_BLOCO = 50_000
+FATIAS_POR_PROCESSO = 4
+
+NOMES_M = ['Lucas', 'Mateus', 'Gabriel', 'Pedro', 'Rafael', 'Felipe', 'Bruno', 'Daniel', 'Andre', 'Carlos',
+           'Joao', 'Marcos', 'Thiago', 'Leonardo', 'Vinicius', 'Eduardo', 'Caio', 'Igor', 'Renan', 'Diego']
+NOMES_F = ['Ana', 'Julia', 'Maria', 'Camila', 'Fernanda', 'Isabella', 'Laura', 'Beatriz', 'Carolina', 'Amanda',
+           'Patricia', 'Renata', 'Sabrina', 'Vanessa', 'Leticia', 'Aline', 'Bianca', 'Natalia', 'Juliana', 'Luana']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima',
+              'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Gomes', 'Mendes', 'Araujo', 'Rocha', 'Barbosa',
+              'Teixeira', 'Nogueira', 'Farias', 'Moura', 'Batista', 'Freitas']
+CURSOS = ['Tecnologia em Sistemas para Internet', 'Tecnologia em Redes de Computadores',
+          'Licenciatura em Matematica', 'Tecnologia em Gestao Publica',
+          'Tecnologia em Analise e Desenvolvimento de Sistemas', 'Bacharelado em Ciencia da Computacao']
+DEPARTAMENTOS = ['Tecnologia da Informacao', 'Matematica Aplicada', 'Estatistica', 'Engenharia de Software',
+                 'Banco de Dados', 'Gestao']
+DISCIPLINAS = ['Programacao Python', 'Banco de Dados', 'Estruturas de Dados', 'Redes de Computadores',
+               'Calculo', 'Estatistica', 'Engenharia de Software', 'Desenvolvimento Web', 'Sistemas Operacionais']
+CAMPI = ['Estrutural', 'Brasilia', 'Taguatinga', 'Gama', 'Planaltina', 'Samambaia', 'Riacho Fundo',
+         'Ceilandia', 'Sao Sebastiao', 'Recanto das Emas']
+
+
+# ========== DISTRIBUIÇÕES ==========
+
+def _falta_beta(rng, media):
+    """Maioria assídua com uma cauda de alunos faltosos"""
+    return rng.betavariate(1.2, 1.2 * (1 - media) / media)
+
+
+def _falta_uniforme(rng, media):
+    """Todos os alunos com a mesma taxa"""
+    return media
+
+
+def _falta_bimodal(rng, media):
+    """85% assíduos (um terço da média) e 15% faltosos crônicos"""
+    if rng.random() < 0.85:
+        return media / 3
+    return min(0.95, media * (1 - 0.85 / 3) / 0.15)
+
+
+DISTRIBUICOES_FALTA = {'beta': _falta_beta, 'uniforme': _falta_uniforme, 'bimodal': _falta_bimodal}
+
+
+def _nome(rng):
+    genero = rng.choice('MF')
+    primeiro = rng.choice(NOMES_M if genero == 'M' else NOMES_F)
+    return f'{primeiro} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}', genero
+
+
+def nome_campus(indice):
+    return CAMPI[indice] if indice < len(CAMPI) else f'Campus {indice + 1}'
+
+
+# ========== CADASTROS ==========
+
+def _cadastros(semente, alunos, professores, turmas, turmas_por_aluno, semanas, inicio, campi, faltas, taxa_falta):
+    """Usuários, perfis, turmas e matrículas; devolve {turma_id: [(matricula_id, taxa_falta)]}"""
+    rng = random.Random(semente)
+    sortear_taxa = DISTRIBUICOES_FALTA[faltas]
+
+    dados_professores = []
+    for i in range(professores):
+        nome, _ = _nome(rng)
+        dados_professores.append({
+            'nome': f'Prof. {nome}', 'email': f'professor.{semente}.{i}@sintetico.edu',
+            'departamento': rng.choice(DEPARTAMENTOS),
+        })
+    usuarios = criar_usuarios(dados_professores, 'Professor', gerar_senhas('inutilizavel', professores))
+    professor_objs = Professor.objects.bulk_create(
+        [Professor(usuario=usuario, **dados) for dados, usuario in zip(dados_professores, usuarios)],
+        batch_size=500
+    )
+
+    dados_alunos, taxas = [], []
+    for i in range(alunos):
+        nome, genero = _nome(rng)
+        dados_alunos.append({
+            'nome': nome, 'matricula': f'S{semente}-{i:07d}', 'email': f'aluno.{semente}.{i}@sintetico.edu',
+            'curso': rng.choice(CURSOS), 'genero': genero,
+            'data_nascimento': date(1995, 1, 1) + timedelta(days=rng.randrange(365 * 12)),
+        })
+        taxas.append(sortear_taxa(rng, taxa_falta))
+    usuarios = criar_usuarios(dados_alunos, 'Aluno', gerar_senhas('inutilizavel', alunos))
+    aluno_objs = Aluno.objects.bulk_create(
+        [Aluno(usuario=usuario, **dados) for dados, usuario in zip(dados_alunos, usuarios)], batch_size=500
+    )
+
+    # Professor, turma e aluno de índice i ficam no campus i % campi
+    professores_campus = [professor_objs[c::campi] for c in range(campi)]
+    turmas_campus = [range(c, turmas, campi) for c in range(campi)]
+    fim = inicio + timedelta(weeks=semanas)
+    turma_objs = Turma.objects.bulk_create([
+        Turma(
+            nome=f'{rng.choice(DISCIPLINAS)} - T{i:04d}', descricao=f'Campus {nome_campus(i % campi)}',
+            professor=professores_campus[i % campi][(i // campi) % len(professores_campus[i % campi])],
+            data_inicio=inicio, data_fim=fim, status='Ativa',
+        )
+        for i in range(turmas)
+    ], batch_size=500)
+
+    pares = [
+        (turma_objs[indice], aluno, taxa)
+        for i, (aluno, taxa) in enumerate(zip(aluno_objs, taxas))
+        for indice in sorted(rng.sample(turmas_campus[i % campi], turmas_por_aluno))
+    ]
+    matricula_objs = Matricula.objects.bulk_create(
+        [Matricula(turma=turma, aluno=aluno) for turma, aluno, _ in pares], batch_size=500
+    )
+
+    por_turma = {turma.id: [] for turma in turma_objs}
+    for matricula, (turma, _, taxa) in zip(matricula_objs, pares):
+        por_turma[turma.id].append((matricula.id, taxa))
+    return por_turma
+
+
+# ========== PRESENÇAS ==========
+
+def _inserir_presencas(linhas):
+    tabela = Presenca._meta.db_table
+    colunas = ', '.join(f'"{coluna}"' for coluna in COLUNAS_PRESENCA)
+    sql = f'INSERT INTO "{tabela}" ({colunas}) VALUES ({", ".join(["%s"] * len(COLUNAS_PRESENCA))})'
+    total, bloco = 0, []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= TAMANHO_BLOCO:
+            total += _gravar_bloco(sql, bloco)
+            bloco = []
+    if bloco:
+        total += _gravar_bloco(sql, bloco)
+    return total
+
+
+def _gravar_bloco(sql, bloco):
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, bloco)
+    return len(bloco)
+
+
+def _copiar_fatia(arquivo):
+    tabela = Presenca._meta.db_table
+    colunas = ', '.join(f'"{coluna}"' for coluna in COLUNAS_PRESENCA)
+    with connection.cursor() as cursor:
+        cursor.execute('ATTACH DATABASE %s AS fatia', [arquivo])
+        try:
+            with transaction.atomic():
+                cursor.execute(
+                    f'INSERT INTO "{tabela}" ({colunas}) SELECT {colunas} FROM fatia.presenca ORDER BY rowid'
+                )
+                total = cursor.rowcount
+        finally:
+            cursor.execute('DETACH DATABASE fatia')
+    Path(arquivo).unlink()
+    return total
+
+
+def _inserir_em_paralelo(turmas, parametros, processos):
+    """Fatias contíguas geradas por `processos` workers e copiadas na ordem, à medida que ficam prontas"""
+    tamanho = max(1, -(-len(turmas) // (processos * FATIAS_POR_PROCESSO)))
+    fatias = [turmas[i:i + tamanho] for i in range(0, len(turmas), tamanho)]
+    diretorio = tempfile.mkdtemp(prefix='dados_sinteticos_')
+    total = 0
+    try:
+        with ProcessPoolExecutor(processos) as pool:
+            arquivos = [str(Path(diretorio) / f'fatia-{n:04d}.sqlite3') for n in range(len(fatias))]
+            for arquivo in pool.map(gerar_fatia, arquivos, fatias, [parametros] * len(fatias)):
+                total += _copiar_fatia(arquivo)
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return total
+
+
+def gerar(alunos, professores, turmas, turmas_por_aluno, semanas, aulas_por_semana=1, semente=42,
+          inicio=INICIO, campi=1, faltas='beta', taxa_falta=0.1, justificadas=0.15, processos=1,
+          sem_captura=False, progresso=print):
+    """
+    Gera a massa de dados no banco padrão; devolve as contagens e o período das aulas.
+    sem_captura=True desliga os gatilhos de captura durante a carga (mais rápido): nem a
+    carga nem as escritas da aplicação nesse intervalo chegam ao outbox, só para bancos
+    sem outros usuários (benchmark, ambiente local).
+    """
+    if not 1 <= campi <= min(professores, turmas):
+        raise ValueError('campi deve estar entre 1 e o número de professores e de turmas')
+    if turmas_por_aluno > turmas // campi:
+        raise ValueError('turmas_por_aluno não pode ser maior que o número de turmas de cada campus')
+    if not 1 <= aulas_por_semana <= 5:
+        raise ValueError('aulas_por_semana deve estar entre 1 e 5')
+    if faltas not in DISTRIBUICOES_FALTA:
+        raise ValueError(f"faltas deve ser uma de: {', '.join(DISTRIBUICOES_FALTA)}")
+    if not 0 < taxa_falta < 1 or not 0 <= justificadas <= 1:
+        raise ValueError('taxa_falta deve estar entre 0 e 1 (exclusive) e justificadas entre 0 e 1')
+
+    inicio_carga = time.perf_counter()
+    if sem_captura:
+        captura.remover_gatilhos(apps)
+    try:
+        with transaction.atomic():
+            por_turma = _cadastros(
+                semente, alunos, professores, turmas, turmas_por_aluno, semanas, inicio, campi, faltas, taxa_falta
+            )
+        progresso(f'Cadastros: {professores} professores, {alunos} alunos, {turmas} turmas, '
+                  f'campi: {campi} ({time.perf_counter() - inicio_carga:.1f}s)')
+
+        parametros = {'semente': semente, 'aulas': (semanas, aulas_por_semana, inicio, justificadas)}
+        fila = list(enumerate(por_turma.values()))
+        if processos > 1:
+            presencas = _inserir_em_paralelo(fila, parametros, processos)
+        else:
+            presencas = _inserir_presencas(linhas_turmas(fila, parametros))
+        progresso(f'Presenças: {presencas} ({time.perf_counter() - inicio_carga:.1f}s)')
+
+        ids = [matricula_id for matriculas in por_turma.values() for matricula_id, _ in matriculas]
+        with transaction.atomic():
+            Matricula.objects.filter(pk__range=(min(ids), max(ids))).recalcular_presenca()
+        progresso(f'Presença acumulada recalculada ({time.perf_counter() - inicio_carga:.1f}s)')
+    finally:
+        if sem_captura:
+            captura.instalar_gatilhos(apps)
+
+    return {
+        'professores': professores,
+        'alunos': alunos,
+        'turmas': turmas,
+        'matriculas': len(ids),
+        'presencas': presencas,
+        'primeira_aula': inicio.isoformat(),
+        'ultima_aula': (inicio + timedelta(weeks=semanas - 1, days=4)).isoformat(),
+    }
@@ -0,0 +1,233 @@
+# app/eventos.py
+"""
+Broker de eventos de presença para o feed ao vivo das turmas (SSE).
+
+- 'memoria': distribui para os assinantes do próprio processo.
+- 'arquivo': cada publicação é anexada a um arquivo NDJSON local que todos os
+  processos acompanham (uma thread por processo), para quando há vários workers.
+  O arquivo é dividido em segmentos EVENTOS_ARQUIVO.0, .1, ... de até
+  EVENTOS_ARQUIVO_MAX_BYTES; ao abrir um segmento novo o publicador apaga os
+  anteriores ao último, então o disco usado fica limitado a ~2 segmentos.
+
+Uma publicação chega a todos os assinantes sem que eles consultem o banco.
+"""
+import asyncio
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import metricas
+
+
+class Assinatura:
+    """Fila de eventos de um assinante, consumida no event loop dele"""
+
+    def __init__(self, broker, canal, tamanho_fila):
+        self.broker = broker
+        self.canal = canal
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+
+    def entregar(self, evento):
+        # Assinante lento perde os eventos mais antigos em vez de travar o broker
+        if self.fila.full():
+            self.fila.get_nowait()
+        self.fila.put_nowait(evento)
+
+    async def proximo(self, timeout=None):
+        return await asyncio.wait_for(self.fila.get(), timeout)
+
+    def cancelar(self):
+        self.broker.cancelar(self)
+
+
+class BrokerMemoria:
+    """Fan-out em memória, seguro para publicar a partir de threads síncronas"""
+
+    def __init__(self, tamanho_fila=None):
+        self.tamanho_fila = tamanho_fila or settings.EVENTOS_TAMANHO_FILA
+        self._assinantes = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def assinar(self, canal):
+        assinatura = Assinatura(self, canal, self.tamanho_fila)
+        with self._lock:
+            self._assinantes[canal].add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinantes[assinatura.canal].discard(assinatura)
+            if not self._assinantes[assinatura.canal]:
+                del self._assinantes[assinatura.canal]
+
+    def total_assinantes(self, canal=None):
+        with self._lock:
+            if canal is not None:
+                return len(self._assinantes.get(canal, ()))
+            return sum(len(assinantes) for assinantes in self._assinantes.values())
+
+    def publicar(self, canal, evento):
+        self._distribuir(canal, evento)
+
+    def _distribuir(self, canal, evento):
+        with self._lock:
+            assinantes = list(self._assinantes.get(canal, ()))
+        for assinatura in assinantes:
+            try:
+                assinatura.loop.call_soon_threadsafe(assinatura.entregar, evento)
+            except RuntimeError:
+                # Loop do assinante já foi encerrado
+                self.cancelar(assinatura)
+
+
+class BrokerArquivo(BrokerMemoria):
+    """
+    Fan-out entre processos da mesma máquina via arquivo NDJSON anexado, em
+    segmentos numerados. Cada processo mantém uma única thread lendo a partir
+    do fim do segmento mais novo.
+
+    A rotação não precisa de coordenação: o segmento seguinte é criado com
+    open(..., 'x'), que só um processo consegue, e quem ainda escrevia no
+    anterior passa ao novo na publicação seguinte. O leitor só troca de
+    segmento `espera_rotacao` segundos depois de ver o novo, relendo o
+    anterior até lá para não perder essas últimas linhas.
+    """
+
+    def __init__(self, caminho=None, intervalo=None, tamanho_fila=None, tamanho_maximo=None, espera_rotacao=1.0):
+        super().__init__(tamanho_fila)
+        self.caminho = str(caminho or settings.EVENTOS_ARQUIVO)
+        self.intervalo = intervalo or settings.EVENTOS_INTERVALO_LEITURA
+        self.tamanho_maximo = tamanho_maximo or settings.EVENTOS_ARQUIVO_MAX_BYTES
+        self.espera_rotacao = espera_rotacao
+        self._leitor = None
+        self._escrita = None  # segmento em que este processo anexa
+        self._escrita_lock = threading.Lock()
+
+    def segmento(self, numero):
+        return f'{self.caminho}.{numero}'
+
+    def _ultimo_segmento(self):
+        sufixos = (nome[len(self.caminho) + 1:] for nome in glob.glob(f'{glob.escape(self.caminho)}.*'))
+        return max((int(sufixo) for sufixo in sufixos if sufixo.isdigit()), default=0)
+
+    def _remover_anteriores(self, numero):
+        """Apaga os segmentos anteriores a `numero` - 1 (o anterior fica para leitores atrasados)"""
+        for nome in glob.glob(f'{glob.escape(self.caminho)}.*'):
+            sufixo = nome[len(self.caminho) + 1:]
+            if sufixo.isdigit() and int(sufixo) < numero - 1:
+                try:
+                    os.remove(nome)
+                except OSError:
+                    pass  # aberto por um leitor (Windows): sai na próxima rotação
+
+    def publicar(self, canal, evento):
+        linha = json.dumps({'canal': canal, 'evento': evento}, default=str) + '\n'
+        with self._escrita_lock:
+            if self._escrita is None:
+                self._escrita = self._ultimo_segmento()
+            # Outro processo pode já ter aberto segmentos novos
+            while os.path.exists(self.segmento(self._escrita + 1)):
+                self._escrita += 1
+            try:
+                cheio = os.path.getsize(self.segmento(self._escrita)) >= self.tamanho_maximo
+            except FileNotFoundError:
+                cheio = False
+            if cheio:
+                self._escrita += 1
+                try:
+                    open(self.segmento(self._escrita), 'x').close()
+                    self._remover_anteriores(self._escrita)
+                except FileExistsError:
+                    pass  # outro processo rotacionou ao mesmo tempo
+            # Uma única escrita em modo append: linhas de processos diferentes não se misturam
+            with open(self.segmento(self._escrita), 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linha)
+
+    def assinar(self, canal):
+        self._iniciar_leitor()
+        return super().assinar(canal)
+
+    def _iniciar_leitor(self):
+        with self._lock:
+            if self._leitor is None:
+                self._leitor = threading.Thread(
+                    target=self._acompanhar, name='eventos-presenca', daemon=True
+                )
+                self._leitor.start()
+
+    def _acompanhar(self):
+        numero = self._ultimo_segmento()
+        caminho = self.segmento(numero)
+        posicao = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        pendente, proximo_visto_em = '', None
+        while True:
+            time.sleep(self.intervalo)
+            caminho = self.segmento(numero)
+            existe = os.path.exists(caminho)
+            if existe:
+                if os.path.getsize(caminho) < posicao:
+                    posicao, pendente = 0, ''  # arquivo truncado
+                with open(caminho, 'r', encoding='utf-8') as arquivo:
+                    arquivo.seek(posicao)
+                    pendente += arquivo.read()
+                    posicao = arquivo.tell()
+                *linhas, pendente = pendente.split('\n')
+                self._distribuir_linhas(linhas)
+
+            if not os.path.exists(self.segmento(numero + 1)):
+                continue
+            if proximo_visto_em is None:
+                proximo_visto_em = time.monotonic()
+            if not existe or time.monotonic() - proximo_visto_em >= self.espera_rotacao:
+                numero, posicao, pendente, proximo_visto_em = numero + 1, 0, '', None
+
+    def _distribuir_linhas(self, linhas):
+        for linha in linhas:
+            if not linha.strip():
+                continue
+            try:
+                mensagem = json.loads(linha)
+            except ValueError:
+                continue
+            self._distribuir(mensagem['canal'], mensagem['evento'])
+
+
+BACKENDS = {
+    'memoria': BrokerMemoria,
+    'arquivo': BrokerArquivo,
+}
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Broker do processo, criado conforme settings.EVENTOS_BACKEND"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = BACKENDS[settings.EVENTOS_BACKEND]()
+        return _broker
+
+
+def canal_turma(turma_id):
+    return f'turma:{turma_id}'
+
+
+def publicar_presenca(presenca, matricula):
+    """Publica a alteração de presença para quem acompanha a turma ao vivo"""
+    metricas.contar_presencas()
+    get_broker().publicar(canal_turma(matricula.turma_id), {
+        'presenca': presenca.id,
+        'matricula': matricula.id,
+        'aluno': matricula.aluno_id,
+        'data': presenca.data,
+        'status': presenca.status,
+        'presenca_acumulada': f'{float(matricula.presenca_acumulada):.2f}',
+    })
@@ -0,0 +1,243 @@
+# app/exportacao.py
+"""
+Exportação colunar (Parquet / Arrow) em esquema estrela para o BI.
+
+- fato_presenca: uma linha por presença, com as chaves das dimensões.
+- dim_aluno, dim_turma, dim_professor e dim_data.
+
+As tabelas são lidas em blocos (iterator) e cada bloco vira um row group,
+então a memória não cresce com o tamanho da base. O fato é particionado por
+mês (fato_presenca/mes=AAAA-MM/); no modo incremental só são reescritos os
+meses cujo total de linhas ou última alteração mudou desde a exportação
+anterior (registrada em _manifesto.json).
+
+Requer pyarrow (opcional: pip install pyarrow).
+"""
+import io
+import json
+import os
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Presenca, Aluno, Turma, Professor
+
+MANIFESTO = '_manifesto.json'
+
+
+class ExportacaoIndisponivel(Exception):
+    pass
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportacaoIndisponivel('Exportação colunar requer o pacote pyarrow (pip install pyarrow).')
+    return pyarrow
+
+
+# ========== TABELAS DO ESQUEMA ESTRELA ==========
+
+def _id_data(valor):
+    return valor.year * 10000 + valor.month * 100 + valor.day
+
+
+def _esquemas(pa):
+    carimbo = pa.timestamp('us', tz='UTC')
+    return {
+        'fato_presenca': pa.schema([
+            ('presenca_id', pa.int64()), ('data_id', pa.int32()), ('aluno_id', pa.int64()),
+            ('turma_id', pa.int64()), ('professor_id', pa.int64()), ('matricula_id', pa.int64()),
+            ('status', pa.string()), ('presente', pa.bool_()), ('observacao', pa.string()),
+            ('data_registro', carimbo),
+        ]),
+        'dim_aluno': pa.schema([
+            ('aluno_id', pa.int64()), ('nome', pa.string()), ('matricula', pa.string()),
+            ('curso', pa.string()), ('genero', pa.string()), ('data_nascimento', pa.date32()),
+            ('data_cadastro', carimbo),
+        ]),
+        'dim_turma': pa.schema([
+            ('turma_id', pa.int64()), ('nome', pa.string()), ('professor_id', pa.int64()),
+            ('status', pa.string()), ('data_inicio', pa.date32()), ('data_fim', pa.date32()),
+        ]),
+        'dim_professor': pa.schema([
+            ('professor_id', pa.int64()), ('nome', pa.string()),
+            ('departamento', pa.string()), ('ativo', pa.bool_()),
+        ]),
+        'dim_data': pa.schema([
+            ('data_id', pa.int32()), ('data', pa.date32()), ('ano', pa.int16()), ('trimestre', pa.int8()),
+            ('mes', pa.int8()), ('dia', pa.int8()), ('dia_semana', pa.int8()),
+        ]),
+    }
+
+
+def _linhas_fato(mes=None):
+    presencas = Presenca.objects.order_by()
+    if mes is not None:
+        presencas = presencas.filter(data__gte=mes, data__lt=_proximo_mes(mes))
+    campos = (
+        'id', 'data', 'matricula__aluno_id', 'matricula__turma_id', 'matricula__turma__professor_id',
+        'matricula_id', 'status', 'observacao', 'data_registro',
+    )
+    for (pk, data, aluno_id, turma_id, professor_id, matricula_id,
+         situacao, observacao, registro) in presencas.values_list(*campos).iterator(chunk_size=2000):
+        yield (pk, _id_data(data), aluno_id, turma_id, professor_id, matricula_id,
+               situacao, situacao == 'Presente', observacao, registro)
+
+
+def _linhas_data():
+    limites = Presenca.objects.aggregate(inicio=Min('data'), fim=Max('data'))
+    if limites['inicio'] is None:
+        return
+    dia = limites['inicio']
+    while dia <= limites['fim']:
+        yield (_id_data(dia), dia, dia.year, (dia.month - 1) // 3 + 1, dia.month, dia.day, dia.isoweekday())
+        dia += timedelta(days=1)
+
+
+def _consulta(modelo, *campos):
+    return lambda: modelo.objects.order_by('pk').values_list(*campos).iterator(chunk_size=2000)
+
+
+FONTES = {
+    'fato_presenca': _linhas_fato,
+    'dim_aluno': _consulta(Aluno, 'id', 'nome', 'matricula', 'curso', 'genero', 'data_nascimento', 'data_cadastro'),
+    'dim_turma': _consulta(Turma, 'id', 'nome', 'professor_id', 'status', 'data_inicio', 'data_fim'),
+    'dim_professor': _consulta(Professor, 'id', 'nome', 'departamento', 'ativo'),
+    'dim_data': _linhas_data,
+}
+TABELAS = list(FONTES)
+
+
+def lotes(tabela, mes=None, tamanho=None):
+    """RecordBatches de `tabela` com no máximo `tamanho` linhas cada"""
+    pa = _pyarrow()
+    esquema = _esquemas(pa)[tabela]
+    tamanho = tamanho or settings.EXPORTACAO_TAMANHO_LOTE
+    linhas = FONTES[tabela](mes) if tabela == 'fato_presenca' else FONTES[tabela]()
+
+    def lote(bloco):
+        colunas = zip(*bloco)
+        return pa.RecordBatch.from_arrays(
+            [pa.array(coluna, type=campo.type) for coluna, campo in zip(colunas, esquema)], schema=esquema
+        )
+
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= tamanho:
+            yield lote(bloco)
+            bloco = []
+    if bloco:
+        yield lote(bloco)
+
+
+# ========== ESCRITA ==========
+
+def gravar_parquet(tabela, alvo, mes=None, tamanho=None):
+    """Grava `tabela` em `alvo` (caminho ou arquivo), um row group por lote; retorna o total de linhas"""
+    pa = _pyarrow()
+    total = 0
+    with pa.parquet.ParquetWriter(alvo, _esquemas(pa)[tabela], compression='zstd') as escritor:
+        for lote in lotes(tabela, mes, tamanho):
+            escritor.write_batch(lote)
+            total += lote.num_rows
+    return total
+
+
+def escrever_parquet(tabela, destino, mes=None, tamanho=None):
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + '.tmp')
+    total = gravar_parquet(tabela, temporario, mes, tamanho)
+    os.replace(temporario, destino)  # leitores nunca veem um arquivo pela metade
+    return total
+
+
+def stream_arrow(tabela, mes=None, tamanho=None):
+    """Bytes no formato Arrow IPC (stream), gerados lote a lote para StreamingHttpResponse"""
+    pa = _pyarrow()
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, _esquemas(pa)[tabela]) as escritor:
+        for lote in lotes(tabela, mes, tamanho):
+            escritor.write_batch(lote)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _proximo_mes(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def situacao_meses():
+    """{'AAAA-MM': {'linhas': n, 'atualizado_em': iso}} do fato, calculado no banco"""
+    return {
+        f"{m['mes']:%Y-%m}": {'linhas': m['linhas'], 'atualizado_em': m['ultima'].isoformat()}
+        for m in Presenca.objects.order_by().annotate(mes=TruncMonth('data'))
+        .values('mes').annotate(linhas=Count('id'), ultima=Max('atualizado_em'))
+    }
+
+
+def exportar(diretorio, incremental=False, meses=None, tamanho=None):
+    """
+    Exporta o esquema estrela para `diretorio`. Dimensões são sempre
+    reescritas; do fato, todos os meses, os `meses` pedidos ou, com
+    `incremental`, apenas os que mudaram. Retorna um relatório.
+    """
+    _pyarrow()
+    inicio = time.perf_counter()
+    diretorio = Path(diretorio)
+    arquivo_manifesto = diretorio / MANIFESTO
+    anterior = json.loads(arquivo_manifesto.read_text()) if arquivo_manifesto.exists() else {'meses': {}}
+
+    atual = situacao_meses()
+    if meses:
+        a_exportar = [mes for mes in meses if mes in atual]
+    elif incremental:
+        a_exportar = [mes for mes, info in atual.items() if anterior['meses'].get(mes) != info]
+    else:
+        a_exportar = list(atual)
+
+    relatorio = {'dimensoes': {}, 'meses': {}, 'removidos': []}
+    for tabela in TABELAS[1:]:
+        relatorio['dimensoes'][tabela] = escrever_parquet(tabela, diretorio / f'{tabela}.parquet', tamanho=tamanho)
+
+    for mes in sorted(a_exportar):
+        ano, numero = map(int, mes.split('-'))
+        relatorio['meses'][mes] = escrever_parquet(
+            'fato_presenca', diretorio / 'fato_presenca' / f'mes={mes}' / 'part-0.parquet',
+            mes=date(ano, numero, 1), tamanho=tamanho
+        )
+
+    # Meses que deixaram de ter presenças (todas excluídas)
+    for mes in set(anterior['meses']) - set(atual):
+        particao = diretorio / 'fato_presenca' / f'mes={mes}' / 'part-0.parquet'
+        if particao.exists():
+            particao.unlink()
+            particao.parent.rmdir()
+        relatorio['removidos'].append(mes)
+
+    # Meses não reescritos mantêm o registro anterior (e voltam no próximo incremental se mudaram)
+    registrados = {
+        mes: info if mes in a_exportar else anterior['meses'].get(mes) for mes, info in atual.items()
+    }
+    manifesto = {
+        'exportado_em': timezone.now().isoformat(),
+        'meses': {mes: info for mes, info in registrados.items() if info is not None},
+    }
+    temporario = arquivo_manifesto.with_name(MANIFESTO + '.tmp')
+    temporario.write_text(json.dumps(manifesto, indent=2))
+    os.replace(temporario, arquivo_manifesto)
+
+    relatorio['linhas_fato'] = sum(relatorio['meses'].values())
+    relatorio['segundos'] = round(time.perf_counter() - inicio, 3)
+    return relatorio
@@ -0,0 +1,302 @@
+# app/fila_presencas.py
+"""
+Escrita adiada de presenças (PRESENCA_ESCRITA_ADIADA).
+
+- A requisição é validada como no modo normal e vira uma linha na tabela
+  FilaPresenca (um INSERT pequeno, durável); a resposta é 202 com o ticket.
+- Uma thread por processo (ou o comando processar_fila_presencas) grava a
+  fila em lotes: escritas do mesmo registro são combinadas (a última vence),
+  as presenças são criadas/atualizadas em bulk e a presença acumulada das
+  matrículas afetadas é recalculada uma vez por lote.
+- Consistência: o ticket é consultado em /api/presencas/fila/{ticket}/ e as
+  leituras de presenças trazem o cabeçalho X-Fila-Presencas-Processada com o
+  maior ticket já aplicado (ticket <= valor: a escrita já está visível).
+  O valor fica em cache por FILA_PRESENCAS_INTERVALO segundos (pode atrasar,
+  nunca adiantar) e é invalidado a cada lote gravado pelo processo.
+- Itens processados há mais de FILA_PRESENCAS_RETENCAO_HORAS são apagados
+  (limpar(), no máximo uma vez por hora); depois disso o ticket dá 404.
+
+O lote é lido e gravado na mesma transação IMMEDIATE, então vários
+processos podem drenar a fila sem aplicar o mesmo item duas vezes.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .eventos import publicar_presenca
+from .models import FilaPresenca, Matricula, Presenca
+from .transacoes import com_retentativa
+
+logger = logging.getLogger(__name__)
+
+CHAVE_PROCESSADA = 'fila-presencas:processada'
+
+
+def escrita_adiada_ativa():
+    return settings.PRESENCA_ESCRITA_ADIADA
+
+
+# ========== ENFILEIRAR ==========
+
+def _para_fila(validated_data):
+    """validated_data do PresencaSerializer → JSON com os nomes das colunas"""
+    dados = {}
+    for campo, valor in validated_data.items():
+        if campo == 'matricula':
+            dados['matricula_id'] = valor.pk
+        elif campo == 'data':
+            dados['data'] = valor.isoformat()
+        else:
+            dados[campo] = valor
+    return dados
+
+
+def _da_fila(dados):
+    dados = dict(dados)
+    if 'data' in dados:
+        dados['data'] = date.fromisoformat(dados['data'])
+    return dados
+
+
+def enfileirar(operacao, validated_data, presenca=None, usuario=None):
+    item = FilaPresenca.objects.create(
+        operacao=operacao,
+        presenca=presenca,
+        dados=_para_fila(validated_data),
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+    transaction.on_commit(get_processador().notificar)
+    return item
+
+
+def _calcular_ultimo_processado():
+    primeiro_pendente = FilaPresenca.objects.filter(estado='pendente').aggregate(id=Min('id'))['id']
+    if primeiro_pendente is not None:
+        return primeiro_pendente - 1
+    return FilaPresenca.objects.aggregate(id=Max('id'))['id'] or 0
+
+
+def ultimo_processado():
+    """Maior ticket tal que ele e todos os anteriores já foram processados (em cache)"""
+    return cache.get_or_set(CHAVE_PROCESSADA, _calcular_ultimo_processado, settings.FILA_PRESENCAS_INTERVALO)
+
+
+async def aultimo_processado():
+    valor = await cache.aget(CHAVE_PROCESSADA)
+    if valor is not None:
+        return valor
+    primeiro_pendente = (await FilaPresenca.objects.filter(estado='pendente').aaggregate(id=Min('id')))['id']
+    if primeiro_pendente is not None:
+        valor = primeiro_pendente - 1
+    else:
+        valor = (await FilaPresenca.objects.aaggregate(id=Max('id')))['id'] or 0
+    await cache.aset(CHAVE_PROCESSADA, valor, settings.FILA_PRESENCAS_INTERVALO)
+    return valor
+
+
+# ========== APLICAR UM LOTE ==========
+
+def _rejeitar(itens, motivo):
+    for item in itens:
+        item.estado = 'rejeitado'
+        item.erro = motivo
+
+
+def _aplicar(itens):
+    """Aplica os itens em bulk; retorna (ids das presenças alteradas, ids das matrículas afetadas)"""
+    criar, atualizar = {}, {}
+    for item in itens:
+        if item.operacao == 'criar':
+            criar.setdefault((item.dados['matricula_id'], item.dados['data']), []).append(item)
+        else:
+            atualizar.setdefault(item.presenca_id, []).append(item)
+
+    alteradas, novas, campos, matriculas = {}, [], set(), set()
+
+    # Atualizações: os campos de cada escrita são aplicados em ordem
+    existentes = Presenca.objects.in_bulk(atualizar)
+    for presenca_id, grupo in atualizar.items():
+        presenca = existentes.get(presenca_id)
+        if presenca is None:
+            _rejeitar(grupo, 'Presença removida antes da gravação.')
+            continue
+        matriculas.add(presenca.matricula_id)
+        for item in grupo:
+            for campo, valor in _da_fila(item.dados).items():
+                setattr(presenca, campo, valor)
+                campos.add(campo)
+            item.estado = 'gravado'
+        alteradas[presenca.id] = presenca
+
+    # Criações: uma por (matrícula, data); se a presença surgiu enquanto a
+    # escrita aguardava na fila, ela é atualizada (a última escrita vence)
+    if criar:
+        datas = {date.fromisoformat(data) for _, data in criar}
+        existentes = {
+            (p.matricula_id, p.data.isoformat()): p
+            for p in Presenca.objects.filter(matricula_id__in={m for m, _ in criar}, data__in=datas)
+        }
+        destinos = []
+        for chave, grupo in criar.items():
+            valores = {}
+            for item in grupo:
+                valores.update(_da_fila(item.dados))
+            presenca = existentes.get(chave)
+            if presenca is not None:
+                presenca = alteradas.get(presenca.id, presenca)
+            if presenca is None:
+                presenca = Presenca(**valores)
+                novas.append(presenca)
+            else:
+                for campo, valor in valores.items():
+                    setattr(presenca, campo, valor)
+                campos.update(valores)
+                alteradas[presenca.id] = presenca
+            matriculas.add(presenca.matricula_id)
+            destinos.append((presenca, grupo))
+
+        Presenca.objects.bulk_create(novas, batch_size=500)
+        for presenca, grupo in destinos:
+            for item in grupo:
+                item.presenca = presenca
+                item.estado = 'gravado'
+
+    if alteradas and campos:
+        agora = timezone.now()  # bulk_update não preenche auto_now
+        for presenca in alteradas.values():
+            presenca.atualizado_em = agora
+        Presenca.objects.bulk_update(
+            list(alteradas.values()), sorted(campos | {'atualizado_em'}), batch_size=500
+        )
+        # Mudança de matrícula: a nova também precisa de recálculo
+        matriculas.update(p.matricula_id for p in alteradas.values())
+
+    return set(alteradas) | {p.id for p in novas}, matriculas
+
+
+def _processar(limite):
+    itens = list(FilaPresenca.objects.filter(estado='pendente').order_by('id')[:limite])
+    if not itens:
+        return 0
+
+    try:
+        with transaction.atomic():
+            presencas, matriculas = _aplicar(itens)
+    except IntegrityError:
+        # Algum item conflita (ex.: atualização para uma data já ocupada):
+        # aplica um a um para rejeitar só os que falham
+        presencas, matriculas = set(), set()
+        for item in itens:
+            try:
+                with transaction.atomic():
+                    ids, afetadas = _aplicar([item])
+            except IntegrityError as erro:
+                if item.operacao == 'criar':
+                    item.presenca = None
+                _rejeitar([item], str(erro))
+                continue
+            presencas |= ids
+            matriculas |= afetadas
+
+    Matricula.objects.filter(id__in=matriculas).recalcular_presenca()
+
+    agora = timezone.now()
+    for item in itens:
+        item.processado_em = agora
+    FilaPresenca.objects.bulk_update(itens, ['presenca', 'estado', 'erro', 'processado_em'], batch_size=500)
+
+    gravadas = list(Presenca.objects.filter(id__in=presencas).select_related('matricula'))
+    transaction.on_commit(lambda: [publicar_presenca(p, p.matricula) for p in gravadas])
+    transaction.on_commit(lambda: cache.delete(CHAVE_PROCESSADA))
+    return len(itens)
+
+
+def processar_lote(limite=None):
+    """Grava um lote da fila em uma transação; retorna quantos itens foram processados"""
+    return com_retentativa(_processar)(limite or settings.FILA_PRESENCAS_TAMANHO_LOTE)
+
+
+def drenar():
+    total = 0
+    while processado := processar_lote():
+        total += processado
+    return total
+
+
+def limpar():
+    """
+    Apaga os itens processados há mais de FILA_PRESENCAS_RETENCAO_HORAS (no
+    máximo uma vez por hora); retorna quantos. O último item fica: sem
+    pendentes, é ele que dá o ultimo_processado().
+    """
+    if not cache.add('fila-presencas:limpeza', True, 3600):
+        return 0
+    limite = timezone.now() - timedelta(hours=settings.FILA_PRESENCAS_RETENCAO_HORAS)
+    ultimo = FilaPresenca.objects.aggregate(id=Max('id'))['id']
+    apagados, _ = FilaPresenca.objects.filter(
+        estado__in=['gravado', 'rejeitado'], processado_em__lt=limite
+    ).exclude(pk=ultimo).delete()
+    return apagados
+
+
+# ========== THREAD DO PROCESSO ==========
+
+class ProcessadorFila:
+    """Drena a fila numa thread própria, a cada FILA_PRESENCAS_INTERVALO segundos ou quando avisado"""
+
+    def __init__(self, intervalo=None):
+        self.intervalo = intervalo or settings.FILA_PRESENCAS_INTERVALO
+        self._acordar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.lotes = 0
+        self.processados = 0
+
+    def notificar(self):
+        self._iniciar()
+        self._acordar.set()
+
+    def _iniciar(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name='fila-presencas', daemon=True)
+                self._thread.start()
+                atexit.register(drenar)
+
+    def _executar(self):
+        while True:
+            # Espera o intervalo mesmo quando avisado, para acumular um lote maior
+            self._acordar.wait()
+            self._acordar.clear()
+            time.sleep(self.intervalo)
+            try:
+                while processado := processar_lote():
+                    self.lotes += 1
+                    self.processados += processado
+                limpar()
+            except Exception:
+                logger.exception('Falha ao gravar a fila de presenças; nova tentativa no próximo aviso')
+                self._acordar.set()
+
+
+_processador = None
+_processador_lock = threading.Lock()
+
+
+def get_processador():
+    """Processador do processo (criado sob demanda)"""
+    global _processador
+    with _processador_lock:
+        if _processador is None:
+            _processador = ProcessadorFila()
+        return _processador
@@ -0,0 +1,40 @@
+# app/filters.py
+import django_filters
+
+from .analytics import filtro_idade
+from .models import Aluno, Presenca
+
+
+# Busca (?search=) da listagem de presenças, síncrona e assíncrona
+BUSCA_PRESENCA = ['matricula__aluno__nome', 'matricula__aluno__matricula', 'observacao']
+
+# Fora desse intervalo o ano da data de nascimento limite sai do alcance de date
+IDADE_MAXIMA = 150
+
+
+class AlunoFilter(django_filters.FilterSet):
+    """Filtros de aluno; a idade é convertida em intervalo de data_nascimento"""
+    idade_min = django_filters.NumberFilter(
+        method='filtrar_idade_min', label='Idade mínima', min_value=0, max_value=IDADE_MAXIMA
+    )
+    idade_max = django_filters.NumberFilter(
+        method='filtrar_idade_max', label='Idade máxima', min_value=0, max_value=IDADE_MAXIMA
+    )
+
+    class Meta:
+        model = Aluno
+        fields = ['curso', 'genero', 'idade_min', 'idade_max']
+
+    def filtrar_idade_min(self, queryset, name, value):
+        return queryset.filter(filtro_idade(idade_min=int(value)))
+
+    def filtrar_idade_max(self, queryset, name, value):
+        return queryset.filter(filtro_idade(idade_max=int(value)))
+
+
+class PresencaFilter(django_filters.FilterSet):
+    """Filtros da listagem de presenças (PresencaViewSet e PresencasAsyncView)"""
+
+    class Meta:
+        model = Presenca
+        fields = ['status', 'data', 'matricula__turma']
@@ -0,0 +1,62 @@
+# app/geracao_presencas.py
+"""
+Linhas de presença sintéticas (app/dados_sinteticos.py), sem Django.
+
+Este módulo não importa Django nem os modelos: os workers de
+ProcessPoolExecutor o importam do zero quando o processo é criado por
+spawn (Windows e macOS), antes de qualquer django.setup().
+"""
+import random
+import sqlite3
+from datetime import date, timedelta
+
+INICIO = date(2025, 2, 3)  # segunda-feira; fixa para o resultado não depender do dia da geração
+COLUNAS_PRESENCA = ('matricula_id', 'data', 'status', 'observacao', 'data_registro', 'atualizado_em')
+
+
+def datas_aula(indice_turma, semanas, aulas_por_semana, inicio=INICIO):
+    """Dias de aula da turma: `aulas_por_semana` dias úteis distintos por semana"""
+    dias = sorted((indice_turma + aula) % 5 for aula in range(aulas_por_semana))
+    return [inicio + timedelta(weeks=semana, days=dia) for semana in range(semanas) for dia in dias]
+
+
+def status_presenca(rng, taxa_falta, justificadas=0.15):
+    if rng.random() >= taxa_falta:
+        return 'Presente'
+    return 'Justificado' if rng.random() < justificadas else 'Ausente'
+
+
+def linhas_presenca(semente, indice_turma, matriculas, semanas, aulas_por_semana, inicio=INICIO, justificadas=0.15):
+    """Linhas (matricula_id, data, status, observacao, data_registro, atualizado_em) de uma turma"""
+    rng = random.Random(f'{semente}:turma:{indice_turma}')
+    datas = [
+        (dia.isoformat(), f'{dia.isoformat()} 12:00:00')
+        for dia in datas_aula(indice_turma, semanas, aulas_por_semana, inicio)
+    ]
+    for matricula_id, taxa in matriculas:
+        for dia, registro in datas:
+            yield matricula_id, dia, status_presenca(rng, taxa, justificadas), '', registro, registro
+
+
+def linhas_turmas(turmas, parametros):
+    """Linhas de presença de várias turmas [(indice_turma, matriculas)], na ordem"""
+    for indice, matriculas in turmas:
+        yield from linhas_presenca(parametros['semente'], indice, matriculas, *parametros['aulas'])
+
+
+def gerar_fatia(arquivo, turmas, parametros):
+    """Roda em outro processo: grava as presenças da fatia num SQLite próprio"""
+    conexao = sqlite3.connect(arquivo, isolation_level=None)
+    try:
+        conexao.execute('PRAGMA journal_mode=OFF')
+        conexao.execute('PRAGMA synchronous=OFF')
+        conexao.execute(f'CREATE TABLE presenca ({", ".join(COLUNAS_PRESENCA)})')
+        conexao.execute('BEGIN')
+        conexao.executemany(
+            f'INSERT INTO presenca VALUES ({", ".join("?" * len(COLUNAS_PRESENCA))})',
+            linhas_turmas(turmas, parametros)
+        )
+        conexao.execute('COMMIT')
+    finally:
+        conexao.close()
+    return arquivo
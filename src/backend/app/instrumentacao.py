@@ -0,0 +1,191 @@
+# app/instrumentacao.py
+"""
+Medição por requisição: consultas SQL, tempo no banco, tempo de
+serialização (DRF) e tempo total.
+
+O InstrumentacaoMiddleware sorteia as requisições detalhadas
+(INSTRUMENTACAO_AMOSTRAGEM): elas recebem o cabeçalho Server-Timing e uma
+linha JSON no logger 'app.instrumentacao' com o nome da view (ex.:
+PresencaViewSet.list). Com METRICAS_ATIVAS todas as requisições são
+medidas para os histogramas de app/metricas.py. Sem medição em andamento
+os medidores só consultam uma ContextVar e seguem direto.
+
+- SQL: execute_wrapper instalado em cada conexão ao ser aberta (vale para
+  o primário, a réplica e as threads de sync_to_async das views async).
+- Serialização: os serializers do app herdam SerializacaoMedida, que mede
+  to_representation e run_validation (vale também com many=True, item a
+  item); aninhados contam uma vez só. Consultas disparadas durante a
+  serialização (querysets preguiçosos) entram nos dois tempos.
+- Consultas lentas (app/consultas_lentas.py): com CONSULTA_LENTA_MS, toda
+  consulta é cronometrada, mesmo fora de requisições medidas.
+- Perfil sob demanda (app/perfilamento.py): a medição guarda também cada
+  consulta SQL com o seu tempo.
+- Signals: os receptores do app (app/signals.py) decorados com
+  @medir_receptor têm o tempo registrado por receptor e modelo.
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from . import consultas_lentas, metricas
+
+logger = logging.getLogger(__name__)
+
+_medicao = contextvars.ContextVar('medicao_requisicao', default=None)
+
+
+class Medicao:
+    __slots__ = (
+        'inicio', 'duracao', 'amostrada', 'view', 'consultas', 'tempo_db', 'tempo_serializacao', 'profundidade', 'sql'
+    )
+
+    def __init__(self, amostrada=True, capturar_sql=False):
+        self.inicio = time.perf_counter()
+        self.duracao = None
+        self.amostrada = amostrada
+        self.view = None
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_serializacao = 0.0
+        self.profundidade = 0
+        self.sql = [] if capturar_sql else None
+
+
+def iniciar(capturar_sql=False):
+    """
+    Inicia a medição da requisição atual (se sorteada, com métricas ou
+    perfil); devolve o token para reset ou None
+    """
+    amostragem = settings.INSTRUMENTACAO_AMOSTRAGEM
+    amostrada = amostragem >= 1 or (amostragem > 0 and random.random() < amostragem)
+    if not (amostrada or capturar_sql or settings.METRICAS_ATIVAS):
+        return None
+    return _medicao.set(Medicao(amostrada, capturar_sql))
+
+
+def finalizar(token):
+    medicao = _medicao.get()
+    _medicao.reset(token)
+    medicao.duracao = time.perf_counter() - medicao.inicio
+    return medicao
+
+
+def medicao_atual():
+    return _medicao.get()
+
+
+def nome_view(view_func, metodo):
+    """'Classe.acao' para views baseadas em classe (DRF ou Django) ou o nome da função"""
+    classe = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if classe is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    acoes = getattr(view_func, 'actions', None) or {}
+    return f'{classe.__name__}.{acoes.get(metodo.lower(), metodo.lower())}'
+
+
+# ========== MEDIDORES ==========
+
+def medir_sql(execute, sql, params, many, context):
+    medicao = _medicao.get()
+    limite_lenta = settings.CONSULTA_LENTA_MS
+    if medicao is None and not limite_lenta:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracao = time.perf_counter() - inicio
+        if medicao is not None:
+            medicao.tempo_db += duracao
+            medicao.consultas += 1
+            if medicao.sql is not None:
+                medicao.sql.append((sql, duracao, many))
+        if limite_lenta and duracao * 1000 >= limite_lenta and not consultas_lentas.controle_de_transacao(sql):
+            consultas_lentas.registrar(
+                sql, params, many, duracao, context['connection'], medicao.view if medicao else None
+            )
+
+
+def _instalar_medidor_sql(sender, connection, **kwargs):
+    if medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_sql)
+
+
+def _serializando(funcao, *args, **kwargs):
+    medicao = _medicao.get()
+    if medicao is None:
+        return funcao(*args, **kwargs)
+    medicao.profundidade += 1
+    inicio = time.perf_counter()
+    try:
+        return funcao(*args, **kwargs)
+    finally:
+        medicao.profundidade -= 1
+        if not medicao.profundidade:
+            medicao.tempo_serializacao += time.perf_counter() - inicio
+
+
+class SerializacaoMedida:
+    """Mixin dos serializers do app: o tempo de leitura e escrita entra na medição da requisição"""
+
+    def to_representation(self, instance):
+        return _serializando(super().to_representation, instance)
+
+    def run_validation(self, *args, **kwargs):
+        return _serializando(super().run_validation, *args, **kwargs)
+
+
+def medir_receptor(receptor):
+    """Decorador dos receptores de signals do app (abaixo do @receiver): tempo por receptor e modelo"""
+    @wraps(receptor)
+    def medido(sender, **kwargs):
+        if not settings.METRICAS_ATIVAS:
+            return receptor(sender, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return receptor(sender, **kwargs)
+        finally:
+            metricas.observar_sinal(receptor.__name__, sender.__name__, time.perf_counter() - inicio)
+    return medido
+
+
+def instalar():
+    """Chamado em AppConfig.ready()"""
+    connection_created.connect(_instalar_medidor_sql, dispatch_uid='instrumentacao_sql')
+
+
+# ========== SAÍDA ==========
+
+def registrar(medicao, request, response):
+    """Métricas do processo e, se sorteada, Server-Timing na resposta e uma linha JSON no log"""
+    segundos = medicao.duracao
+    if settings.METRICAS_ATIVAS:
+        metricas.observar_requisicao(
+            medicao.view or 'desconhecida', response.status_code, segundos, medicao.consultas
+        )
+    if not medicao.amostrada:
+        return
+
+    total = segundos * 1000
+    db = medicao.tempo_db * 1000
+    serializacao = medicao.tempo_serializacao * 1000
+    response['Server-Timing'] = (
+        f'db;dur={db:.1f};desc="{medicao.consultas} consultas", '
+        f'ser;dur={serializacao:.1f}, total;dur={total:.1f}'
+    )
+    logger.info(json.dumps({
+        'view': medicao.view,
+        'metodo': request.method,
+        'caminho': request.path,
+        'status': response.status_code,
+        'consultas': medicao.consultas,
+        'db_ms': round(db, 2),
+        'serializacao_ms': round(serializacao, 2),
+        'total_ms': round(total, 2),
+    }, ensure_ascii=False))
@@ -0,0 +1,33 @@
+# src/backend/app/management/commands/atualizar_banco_analitico.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.banco_analitico import atualizar
+
+
+class Command(BaseCommand):
+    help = 'Atualiza incrementalmente o banco analítico do BI (SQLite separado, desnormalizado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--arquivo', default=settings.BANCO_ANALITICO_NAME, help='Arquivo do banco analítico')
+        parser.add_argument('--completo', action='store_true', help='Reconstrói tudo, ignorando a marca d\'água')
+        parser.add_argument(
+            '--intervalo', type=float, default=0,
+            help='Repete a atualização a cada N segundos (0 = atualiza uma vez e sai)'
+        )
+
+    def handle(self, *args, **options):
+        completo = options['completo']
+        while True:
+            relatorio = atualizar(options['arquivo'], completo=completo)
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Reconstrução' if relatorio['completo'] else 'Atualização'} em {relatorio['segundos']}s: "
+                f"{relatorio['presencas']} presenças gravadas, {relatorio['removidas']} removidas, "
+                f"{relatorio['desnormalizadas']} desnormalizadas, {relatorio['dias']} dias recalculados"
+            ))
+            if not options['intervalo']:
+                break
+            completo = False
+            time.sleep(options['intervalo'])
@@ -0,0 +1,51 @@
+# src/backend/app/management/commands/exportar_mudancas.py
+import json
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from app.captura import ler_mudancas, posicao, confirmar, compactar
+
+
+class Command(BaseCommand):
+    help = 'Acompanha a outbox de mudanças e grava em arquivos NDJSON diários (para o BI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--diretorio', default=settings.CAPTURA_DIRETORIO, help='Destino dos arquivos .ndjson')
+        parser.add_argument('--consumidor', default='ndjson', help='Nome usado para guardar a posição')
+        parser.add_argument('--lote', type=int, default=settings.CAPTURA_LIMITE_LEITURA)
+        parser.add_argument('--seguir', action='store_true', help='Continua acompanhando a outbox')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Espera entre leituras com --seguir')
+
+    def handle(self, *args, **options):
+        diretorio = Path(options['diretorio'])
+        diretorio.mkdir(parents=True, exist_ok=True)
+        consumidor = options['consumidor']
+        cursor = posicao(consumidor)
+        total = 0
+
+        while True:
+            mudancas, novo_cursor = ler_mudancas(cursor, options['lote'])
+            if mudancas:
+                arquivo = diretorio / f"mudancas-{timezone.now():%Y%m%d}.ndjson"
+                with open(arquivo, 'a', encoding='utf-8') as saida:
+                    saida.writelines(json.dumps(m, cls=DjangoJSONEncoder) + '\n' for m in mudancas)
+                    saida.flush()
+                    os.fsync(saida.fileno())
+                # Só confirma depois que o lote está no disco
+                confirmar(consumidor, novo_cursor)
+                compactadas = compactar()
+                cursor = novo_cursor
+                total += len(mudancas)
+                self.stdout.write(f"  {len(mudancas)} mudanças → {arquivo.name} (até #{cursor}, {compactadas} compactadas)")
+                continue
+            if not options['seguir']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} mudanças exportadas (posição #{cursor})"))
@@ -0,0 +1,38 @@
+# src/backend/app/management/commands/exportar_parquet.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.exportacao import ExportacaoIndisponivel, exportar
+
+
+class Command(BaseCommand):
+    help = 'Exporta presenças em esquema estrela (Parquet, particionado por mês) para o BI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--diretorio', default=settings.EXPORTACAO_DIRETORIO, help='Diretório da exportação')
+        parser.add_argument('--incremental', action='store_true', help='Reescreve só os meses alterados')
+        parser.add_argument(
+            '--meses', type=lambda v: [m.strip() for m in v.split(',')],
+            help='Meses a exportar, separados por vírgula (AAAA-MM)'
+        )
+        parser.add_argument('--lote', type=int, help='Linhas por row group (padrão: EXPORTACAO_TAMANHO_LOTE)')
+
+    def handle(self, *args, **options):
+        try:
+            relatorio = exportar(
+                options['diretorio'], incremental=options['incremental'],
+                meses=options['meses'], tamanho=options['lote']
+            )
+        except ExportacaoIndisponivel as e:
+            raise CommandError(str(e))
+
+        for tabela, linhas in relatorio['dimensoes'].items():
+            self.stdout.write(f"  {tabela}: {linhas} linhas")
+        for mes, linhas in relatorio['meses'].items():
+            self.stdout.write(f"  fato_presenca mes={mes}: {linhas} linhas")
+        for mes in relatorio['removidos']:
+            self.stdout.write(self.style.WARNING(f"  fato_presenca mes={mes}: removido (sem presenças)"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio['linhas_fato']} presenças em {len(relatorio['meses'])} meses exportadas "
+            f"em {relatorio['segundos']}s"
+        ))
@@ -0,0 +1,81 @@
+# src/backend/app/management/commands/gerar_dados.py
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app import dados_sinteticos
+from app.models import Aluno
+
+
+def data(valor):
+    resultado = parse_date(valor)
+    if resultado is None:
+        raise ValueError(valor)
+    return resultado
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera dados sintéticos determinísticos em lote (professores, alunos, turmas, matrículas e presenças). '
+        'Os parâmetros informados sobrescrevem os da escala.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=list(dados_sinteticos.ESCALAS), default='demo')
+        parser.add_argument('--campi', type=int, default=1, help='Alunos só se matriculam em turmas do seu campus')
+        parser.add_argument('--professores', type=int)
+        parser.add_argument('--turmas', type=int)
+        parser.add_argument('--alunos', type=int)
+        parser.add_argument('--turmas-por-aluno', type=int)
+        parser.add_argument('--semanas', type=int)
+        parser.add_argument('--aulas-por-semana', type=int, default=1)
+        parser.add_argument(
+            '--inicio', type=data, default=dados_sinteticos.INICIO, help='Segunda-feira da primeira semana (AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--faltas', choices=list(dados_sinteticos.DISTRIBUICOES_FALTA), default='beta',
+            help='Distribuição da taxa de falta entre os alunos'
+        )
+        parser.add_argument('--taxa-falta', type=float, default=0.1, help='Taxa média de faltas')
+        parser.add_argument('--justificadas', type=float, default=0.15, help='Fração das faltas justificadas')
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument(
+            '--processos', type=int, default=1,
+            help=f'Processos gerando presenças em paralelo (0 = {os.cpu_count()}, os núcleos da máquina)'
+        )
+        parser.add_argument(
+            '--sem-captura', action='store_true',
+            help='Desliga os gatilhos de captura de mudanças durante a carga (só em bancos sem outros usuários)'
+        )
+
+    def handle(self, *args, **options):
+        parametros = dict(dados_sinteticos.ESCALAS[options['escala']])
+        for campo in ('professores', 'turmas', 'alunos', 'turmas_por_aluno', 'semanas'):
+            if options[campo] is not None:
+                parametros[campo] = options[campo]
+
+        semente = options['semente']
+        if Aluno.objects.filter(matricula__startswith=f'S{semente}-').exists():
+            raise CommandError(f'Já existem dados gerados com a semente {semente} neste banco; use outra --semente')
+
+        previstas = (
+            parametros['alunos'] * parametros['turmas_por_aluno'] * parametros['semanas'] * options['aulas_por_semana']
+        )
+        self.stdout.write(f"Gerando ~{previstas} presenças com a semente {semente}...")
+        try:
+            contagens = dados_sinteticos.gerar(
+                **parametros, semente=semente, campi=options['campi'], inicio=options['inicio'],
+                aulas_por_semana=options['aulas_por_semana'], faltas=options['faltas'],
+                taxa_falta=options['taxa_falta'], justificadas=options['justificadas'],
+                processos=options['processos'] or os.cpu_count(), sem_captura=options['sem_captura'],
+                progresso=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{contagens['professores']} professores, {contagens['alunos']} alunos, {contagens['turmas']} turmas, "
+            f"{contagens['matriculas']} matrículas e {contagens['presencas']} presenças "
+            f"({contagens['primeira_aula']} a {contagens['ultima_aula']})"
+        ))
@@ -0,0 +1,31 @@
+# src/backend/app/management/commands/processar_fila_presencas.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.fila_presencas import limpar, processar_lote
+
+
+class Command(BaseCommand):
+    help = 'Grava em lotes as escritas de presença pendentes (modo PRESENCA_ESCRITA_ADIADA)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help='Itens por transação (padrão: FILA_PRESENCAS_TAMANHO_LOTE)')
+        parser.add_argument('--continuo', action='store_true', help='Continua acompanhando a fila (worker dedicado)')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            inicio = time.perf_counter()
+            processados = processar_lote(options['lote'])
+            if processados:
+                total += processados
+                self.stdout.write(f"  {processados} escritas em {time.perf_counter() - inicio:.3f}s")
+                continue
+            limpar()
+            if not options['continuo']:
+                break
+            time.sleep(settings.FILA_PRESENCAS_INTERVALO)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} escritas de presença processadas"))
@@ -0,0 +1,33 @@
+# src/backend/app/management/commands/replicar_banco.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.roteador import ALIAS_PRIMARIO, alias_leitura, sincronizar_replica
+
+
+class Command(BaseCommand):
+    help = 'Copia o banco primário para a réplica de leitura (substituto local da replicação)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=float, default=0,
+            help='Repete a cópia a cada N segundos (0 = copia uma vez e sai)'
+        )
+
+    def handle(self, *args, **options):
+        if alias_leitura() == ALIAS_PRIMARIO:
+            raise CommandError(
+                'Nenhuma réplica configurada. Defina SQLITE_REPLICA_NAME para habilitar.'
+            )
+
+        intervalo = options['intervalo']
+        while True:
+            inicio = time.perf_counter()
+            sincronizar_replica()
+            self.stdout.write(self.style.SUCCESS(
+                f'Réplica sincronizada em {time.perf_counter() - inicio:.3f}s'
+            ))
+            if not intervalo:
+                break
+            time.sleep(intervalo)
@@ -0,0 +1,50 @@
+# src/backend/app/management/commands/virar_semestre.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app.provisionamento import virar_semestre
+
+
+def data(valor):
+    resultado = parse_date(valor)
+    if resultado is None:
+        raise ValueError(valor)
+    return resultado
+
+
+class Command(BaseCommand):
+    help = 'Abre um novo período letivo: clona turmas, copia matrículas e conclui as turmas encerradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('data_inicio', type=data, help='Início do novo período (AAAA-MM-DD)')
+        parser.add_argument('data_fim', type=data, help='Fim do novo período (AAAA-MM-DD)')
+        parser.add_argument(
+            '--turmas', type=lambda v: [int(i) for i in v.split(',')],
+            help='Ids das turmas a clonar, separados por vírgula '
+                 '(padrão: ativas que terminam antes de data_inicio)'
+        )
+        parser.add_argument('--carregar-matriculas', action='store_true', help='Copia as matrículas para as novas turmas')
+        parser.add_argument('--renomear', nargs=2, metavar=('DE', 'PARA'), help='Substitui texto no nome (ex.: 2025.1 2025.2)')
+        parser.add_argument('--dry-run', action='store_true', help='Mostra o relatório sem gravar nada')
+
+    def handle(self, *args, **options):
+        try:
+            relatorio = virar_semestre(
+                options['data_inicio'], options['data_fim'], turma_ids=options['turmas'],
+                carregar_matriculas=options['carregar_matriculas'],
+                renomear=options['renomear'], dry_run=options['dry_run'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for turma in relatorio['criadas']:
+            self.stdout.write(f"  + {turma['nome']} (origem {turma['origem']})")
+        for turma in relatorio['ignoradas']:
+            self.stdout.write(self.style.WARNING(f"  = {turma['nome']}: {turma['motivo']}"))
+
+        prefixo = '[DRY-RUN] ' if relatorio['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixo}{relatorio['turmas_criadas']} turmas criadas, "
+            f"{relatorio['matriculas_copiadas']} matrículas copiadas, "
+            f"{relatorio['turmas_concluidas']} turmas concluídas em {relatorio['segundos']}s"
+        ))
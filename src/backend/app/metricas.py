@@ -0,0 +1,204 @@
+# app/metricas.py
+"""
+Registro de métricas do processo, exposto em /api/metricas/ no formato de
+texto do Prometheus.
+
+- chamada_requisicao_segundos{view}: latência por view/ação (histograma)
+- chamada_requisicao_consultas{view}: consultas SQL por requisição (histograma)
+- chamada_requisicoes_total{view,status}
+- chamada_presencas_gravadas_total: presenças gravadas (use rate() para por segundo)
+- chamada_cache_total{cache,resultado}: acertos/falhas de cada cache
+  (razão de acerto = acerto / (acerto + falha))
+- chamada_sinal_segundos{receptor,modelo}: tempo nos receptores de signals do app
+
+Com vários workers, METRICAS_DIRETORIO_MULTIPROCESSO ativa a agregação:
+cada processo grava seu estado em <diretorio>/metricas-<pid>.json (no
+máximo a cada METRICAS_INTERVALO_GRAVACAO segundos e ao sair) e a coleta
+soma os arquivos de todos os processos. Limpe o diretório ao reiniciar o
+serviço para descartar processos antigos.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_SINAL = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+# nome → (tipo, descrição, buckets)
+METRICAS = {
+    'chamada_requisicao_segundos': ('histogram', 'Latência das requisições por view', BUCKETS_SEGUNDOS),
+    'chamada_requisicao_consultas': ('histogram', 'Consultas SQL por requisição', BUCKETS_CONSULTAS),
+    'chamada_requisicoes_total': ('counter', 'Requisições atendidas por view e status', None),
+    'chamada_presencas_gravadas_total': ('counter', 'Presenças gravadas (criadas ou alteradas)', None),
+    'chamada_cache_total': ('counter', 'Consultas ao cache por resultado (acerto/falha)', None),
+    'chamada_sinal_segundos': ('histogram', 'Tempo nos receptores do app por receptor e modelo', BUCKETS_SINAL),
+}
+
+
+class Registro:
+    """Contadores e histogramas em memória, protegidos por lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+
+    def contar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        buckets = METRICAS[nome][2]
+        chave = (nome, tuple(sorted(rotulos.items())))
+        posicao = bisect_left(buckets, valor)  # le= é inclusivo
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = [[0] * (len(buckets) + 1), 0.0]
+            histograma[0][posicao] += 1
+            histograma[1] += valor
+
+    def estado(self):
+        """Cópia serializável em JSON"""
+        with self._lock:
+            return {
+                'contadores': [[nome, list(rotulos), valor] for (nome, rotulos), valor in self._contadores.items()],
+                'histogramas': [
+                    [nome, list(rotulos), list(contagens), soma]
+                    for (nome, rotulos), (contagens, soma) in self._histogramas.items()
+                ],
+            }
+
+
+registro = Registro()
+
+
+# ========== PONTOS DE COLETA ==========
+
+def observar_requisicao(view, status, segundos, consultas):
+    registro.observar('chamada_requisicao_segundos', segundos, view=view)
+    registro.observar('chamada_requisicao_consultas', consultas, view=view)
+    registro.contar('chamada_requisicoes_total', view=view, status=str(status))
+    gravar_processo()
+
+
+def contar_presencas(quantidade=1):
+    registro.contar('chamada_presencas_gravadas_total', quantidade)
+
+
+def contar_cache(cache, acerto):
+    registro.contar('chamada_cache_total', cache=cache, resultado='acerto' if acerto else 'falha')
+
+
+def observar_sinal(receptor, modelo, segundos):
+    registro.observar('chamada_sinal_segundos', segundos, receptor=receptor, modelo=modelo)
+
+
+# ========== VÁRIOS PROCESSOS ==========
+
+_ultima_gravacao = 0.0
+
+
+def gravar_estado(prefixo, estado):
+    """Grava `estado` (JSON) em <diretorio>/<prefixo>-<pid>.json, de forma atômica"""
+    arquivo = Path(settings.METRICAS_DIRETORIO_MULTIPROCESSO) / f'{prefixo}-{os.getpid()}.json'
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    temporario = arquivo.with_name(f'.{arquivo.name}.tmp')
+    temporario.write_text(json.dumps(estado))
+    os.replace(temporario, arquivo)
+
+
+def ler_estados(prefixo):
+    """Estados gravados por todos os processos com `prefixo`"""
+    estados = []
+    for arquivo in Path(settings.METRICAS_DIRETORIO_MULTIPROCESSO).glob(f'{prefixo}-*.json'):
+        try:
+            estados.append(json.loads(arquivo.read_text()))
+        except (OSError, ValueError):
+            continue  # arquivo removido ou sendo substituído
+    return estados
+
+
+def gravar_processo(forcar=False):
+    """Grava o estado deste processo no diretório compartilhado (se configurado)"""
+    global _ultima_gravacao
+    if not settings.METRICAS_DIRETORIO_MULTIPROCESSO:
+        return
+    agora = time.monotonic()
+    if not forcar and agora - _ultima_gravacao < settings.METRICAS_INTERVALO_GRAVACAO:
+        return
+    if not _ultima_gravacao:
+        atexit.register(gravar_processo, forcar=True)
+    _ultima_gravacao = agora
+    gravar_estado('metricas', registro.estado())
+
+
+def _somar(estados):
+    contadores, histogramas = {}, {}
+    for estado in estados:
+        for nome, rotulos, valor in estado['contadores']:
+            chave = (nome, tuple(map(tuple, rotulos)))
+            contadores[chave] = contadores.get(chave, 0) + valor
+        for nome, rotulos, contagens, soma in estado['histogramas']:
+            chave = (nome, tuple(map(tuple, rotulos)))
+            if chave not in histogramas:
+                histogramas[chave] = [[0] * len(contagens), 0.0]
+            histogramas[chave][0] = [a + b for a, b in zip(histogramas[chave][0], contagens)]
+            histogramas[chave][1] += soma
+    return contadores, histogramas
+
+
+def coletar():
+    """Contadores e histogramas deste processo ou, no modo multiprocesso, de todos"""
+    if not settings.METRICAS_DIRETORIO_MULTIPROCESSO:
+        return _somar([registro.estado()])
+    gravar_processo(forcar=True)
+    return _somar(ler_estados('metricas'))
+
+
+# ========== FORMATO PROMETHEUS ==========
+
+def _rotulos(pares):
+    if not pares:
+        return ''
+    texto = ','.join(
+        '{}="{}"'.format(chave, str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for chave, valor in pares
+    )
+    return '{' + texto + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def texto_prometheus():
+    contadores, histogramas = coletar()
+    linhas = []
+    for nome, (tipo, descricao, buckets) in METRICAS.items():
+        linhas.append(f'# HELP {nome} {descricao}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        if tipo == 'counter':
+            for (metrica, rotulos), valor in sorted(contadores.items()):
+                if metrica == nome:
+                    linhas.append(f'{nome}{_rotulos(rotulos)} {_numero(valor)}')
+            continue
+
+        for (metrica, rotulos), (contagens, soma) in sorted(histogramas.items()):
+            if metrica != nome:
+                continue
+            acumulado = 0
+            for limite, contagem in zip((*buckets, '+Inf'), contagens):
+                acumulado += contagem
+                linhas.append(f'{nome}_bucket{_rotulos((*rotulos, ("le", limite)))} {acumulado}')
+            linhas.append(f'{nome}_sum{_rotulos(rotulos)} {_numero(soma)}')
+            linhas.append(f'{nome}_count{_rotulos(rotulos)} {acumulado}')
+    return '\n'.join(linhas) + '\n'
@@ -0,0 +1,102 @@
+# app/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from rest_framework import permissions
+
+from . import instrumentacao, perfilamento, roteador
+
+
+class RoteamentoBancoMiddleware:
+    """
+    Mantém o estado do roteador primário/réplica por requisição e fixa o
+    cliente no primário por alguns segundos depois de uma escrita.
+    Compatível com WSGI e ASGI (não força as views assíncronas para uma thread).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = roteador.iniciar_requisicao()
+        try:
+            response = self.get_response(request)
+        finally:
+            estado = roteador.finalizar_requisicao(token)
+        return self.registrar_escrita(request, response, estado)
+
+    async def __acall__(self, request):
+        token = roteador.iniciar_requisicao()
+        try:
+            response = await self.get_response(request)
+        finally:
+            estado = roteador.finalizar_requisicao(token)
+        return self.registrar_escrita(request, response, estado)
+
+    def registrar_escrita(self, request, response, estado):
+        if estado['escreveu'] or request.method not in permissions.SAFE_METHODS:
+            roteador.fixar_primario(request, response)
+        return response
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede consultas, tempo no banco, serialização e tempo total das
+    requisições (app/instrumentacao.py e app/metricas.py) e executa o perfil
+    sob demanda (app/perfilamento.py). Deve ser o primeiro middleware para
+    que o total inclua os demais.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        perfilador = perfilamento.solicitado(request)
+        token = instrumentacao.iniciar(capturar_sql=perfilador is not None)
+        if token is None:
+            return self.get_response(request)
+        try:
+            if perfilador:
+                perfilador.iniciar()
+            response = self.get_response(request)
+        finally:
+            if perfilador:
+                perfilador.parar()
+            medicao = instrumentacao.finalizar(token)
+        instrumentacao.registrar(medicao, request, response)
+        if perfilador:
+            perfilador.salvar(medicao, request, response)
+        return response
+
+    async def __acall__(self, request):
+        perfilador = perfilamento.solicitado(request)
+        token = instrumentacao.iniciar(capturar_sql=perfilador is not None)
+        if token is None:
+            return await self.get_response(request)
+        try:
+            if perfilador:
+                perfilador.iniciar()
+            response = await self.get_response(request)
+        finally:
+            if perfilador:
+                perfilador.parar()
+            medicao = instrumentacao.finalizar(token)
+        instrumentacao.registrar(medicao, request, response)
+        if perfilador:
+            await sync_to_async(perfilador.salvar)(medicao, request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicao = instrumentacao.medicao_atual()
+        if medicao is not None:
+            medicao.view = instrumentacao.nome_view(view_func, request.method)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-19 11:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_aluno_usuario_professor_usuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilaPresenca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operacao', models.CharField(choices=[('criar', 'Criar'), ('atualizar', 'Atualizar')], max_length=10, verbose_name='Operação')),
+                ('dados', models.JSONField(verbose_name='Dados validados')),
+                ('estado', models.CharField(choices=[('pendente', 'Pendente'), ('gravado', 'Gravado'), ('rejeitado', 'Rejeitado')], db_index=True, default='pendente', max_length=10, verbose_name='Estado')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Recebido em')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+                ('presenca', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.presenca', verbose_name='Presença')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Enviado por')),
+            ],
+            options={
+                'verbose_name': 'Escrita de Presença Pendente',
+                'verbose_name_plural': 'Fila de Presenças',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-19 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_fila_presenca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matricula',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em'),
+        ),
+        migrations.AddField(
+            model_name='presenca',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em'),
+        ),
+        migrations.AddField(
+            model_name='turma',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em'),
+        ),
+        migrations.CreateModel(
+            name='RegistroExclusao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('turma', 'Turma'), ('matricula', 'Matrícula'), ('presenca', 'Presença')], max_length=10, verbose_name='Modelo')),
+                ('objeto_id', models.IntegerField(verbose_name='Id do Objeto')),
+                ('pai_id', models.IntegerField(verbose_name='Id do Pai')),
+                ('excluido_em', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Excluído em')),
+            ],
+            options={
+                'verbose_name': 'Registro de Exclusão',
+                'verbose_name_plural': 'Registros de Exclusão',
+                'indexes': [models.Index(fields=['modelo', 'pai_id', 'excluido_em'], name='app_registr_modelo_da6838_idx')],
+            },
+        ),
+    ]
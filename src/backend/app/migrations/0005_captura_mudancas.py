@@ -0,0 +1,102 @@
+# Generated by Django 5.2 on 2026-10-19 11:50
+
+from django.db import migrations, models
+
+
+# Cópia congelada dos gatilhos de app/captura.py: a migração não pode depender
+# do código atual do app. Depois de cada migrate o post_migrate recria os
+# gatilhos com as colunas atuais (app/signals.py).
+MODELOS_CAPTURADOS = ['Presenca', 'Matricula', 'Turma', 'Aluno', 'Professor']
+COLUNAS_IGNORADAS = {'atualizado_em'}
+OPERACOES = {'INSERT': 'criado', 'UPDATE': 'atualizado', 'DELETE': 'excluido'}
+
+
+def _nome_gatilho(tabela, evento):
+    return f'captura_{tabela}_{evento.lower()}'
+
+
+def _sql_gatilhos(modelo, tabela_saida):
+    tabela = modelo._meta.db_table
+    colunas = [campo.column for campo in modelo._meta.concrete_fields]
+    pk = modelo._meta.pk.column
+
+    comandos = []
+    for evento, operacao in OPERACOES.items():
+        linha = 'OLD' if evento == 'DELETE' else 'NEW'
+        dados = ', '.join(f"'{coluna}', {linha}.\"{coluna}\"" for coluna in colunas)
+        condicao = ''
+        if evento == 'UPDATE':
+            mudou = ' OR '.join(
+                f'OLD."{coluna}" IS NOT NEW."{coluna}"' for coluna in colunas if coluna not in COLUNAS_IGNORADAS
+            )
+            condicao = f' WHEN {mudou}'
+
+        nome = _nome_gatilho(tabela, evento)
+        comandos.append(f'DROP TRIGGER IF EXISTS "{nome}"')
+        comandos.append(
+            f'CREATE TRIGGER "{nome}" AFTER {evento} ON "{tabela}" FOR EACH ROW{condicao} BEGIN '
+            f'INSERT INTO "{tabela_saida}" ("tabela", "objeto_id", "operacao", "dados", "registrado_em") '
+            f"VALUES ('{tabela}', {linha}.\"{pk}\", '{operacao}', json_object({dados}), "
+            f"strftime('%Y-%m-%d %H:%M:%f', 'now')); END"
+        )
+    return comandos
+
+
+def instalar_gatilhos(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    saida = apps.get_model('app', 'RegistroMudanca')._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        for nome in MODELOS_CAPTURADOS:
+            for comando in _sql_gatilhos(apps.get_model('app', nome), saida):
+                cursor.execute(comando)
+
+
+def remover_gatilhos(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for nome in MODELOS_CAPTURADOS:
+            tabela = apps.get_model('app', nome)._meta.db_table
+            for evento in OPERACOES:
+                cursor.execute(f'DROP TRIGGER IF EXISTS "{_nome_gatilho(tabela, evento)}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_sincronizacao_offline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumidorMudancas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True, verbose_name='Nome')),
+                ('posicao', models.BigIntegerField(default=0, verbose_name='Último registro confirmado')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Consumidor de Mudanças',
+                'verbose_name_plural': 'Consumidores de Mudanças',
+            },
+        ),
+        migrations.CreateModel(
+            name='RegistroMudanca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabela', models.CharField(max_length=50, verbose_name='Tabela')),
+                ('objeto_id', models.BigIntegerField(verbose_name='Id do Objeto')),
+                ('operacao', models.CharField(choices=[('criado', 'Criado'), ('atualizado', 'Atualizado'), ('excluido', 'Excluído')], max_length=10, verbose_name='Operação')),
+                ('dados', models.JSONField(verbose_name='Dados')),
+                ('registrado_em', models.DateTimeField(verbose_name='Registrado em')),
+            ],
+            options={
+                'verbose_name': 'Registro de Mudança',
+                'verbose_name_plural': 'Registros de Mudança',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(instalar_gatilhos, remover_gatilhos),
+    ]
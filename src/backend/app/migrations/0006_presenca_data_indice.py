@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_captura_mudancas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='presenca',
+            name='data',
+            field=models.DateField(db_index=True, verbose_name='Data da Aula'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 12:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_presenca_data_indice'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilRequisicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(max_length=200, verbose_name='View')),
+                ('metodo', models.CharField(max_length=10, verbose_name='Método')),
+                ('caminho', models.CharField(max_length=500, verbose_name='Caminho')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Status HTTP')),
+                ('duracao_ms', models.FloatField(verbose_name='Duração (ms)')),
+                ('consultas', models.PositiveIntegerField(verbose_name='Consultas SQL')),
+                ('tempo_db_ms', models.FloatField(verbose_name='Tempo no banco (ms)')),
+                ('arquivo', models.CharField(max_length=500, verbose_name='Arquivo do perfil')),
+                ('resumo', models.TextField(verbose_name='Resumo')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Criado em')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Requisição',
+                'verbose_name_plural': 'Perfis de Requisição',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
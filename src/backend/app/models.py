@@ -1,8 +1,18 @@
 # app/models.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Coalesce, NullIf, Round
+
+from .analytics import expressao_idade, expressao_carga_docente
+from .eventos import publicar_presenca
+
+
+class ProfessorQuerySet(models.QuerySet):
+    def com_carga(self):
+        """Anota turmas (total e por status), alunos e aulas registradas em uma única consulta"""
+        return self.annotate(**expressao_carga_docente())
 
 
 class Professor(models.Model):
@@ -21,6 +31,11 @@ class Professor(models.Model):
         verbose_name="Usuário do Sistema"
     )
 
+    objects = ProfessorQuerySet.as_manager()
+
+    # Preenchido quando a consulta usa ProfessorQuerySet.com_carga()
+    _quantidade_turmas = None
+
     class Meta:
         verbose_name = "Professor"
         verbose_name_plural = "Professores"
@@ -31,8 +46,20 @@ class Professor(models.Model):
     
     @property
     def quantidade_turmas(self):
+        if self._quantidade_turmas is not None:
+            return self._quantidade_turmas
         return self.turmas.count()
 
+    @quantidade_turmas.setter
+    def quantidade_turmas(self, valor):
+        self._quantidade_turmas = valor
+
+
+class AlunoQuerySet(models.QuerySet):
+    def com_idade(self):
+        """Anota a idade calculada pelo banco, permitindo filtrar e ordenar por ela"""
+        return self.annotate(idade=expressao_idade())
+
 
 class Aluno(models.Model):
     """Entidade C: Representa os estudantes matriculados"""
@@ -63,6 +90,11 @@ class Aluno(models.Model):
         verbose_name="Gênero"
     )
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name="Data de Cadastro")
+
+    objects = AlunoQuerySet.as_manager()
+
+    # Preenchido quando a consulta usa AlunoQuerySet.com_idade()
+    _idade = None
     
     class Meta:
         verbose_name = "Aluno"
@@ -74,12 +106,26 @@ class Aluno(models.Model):
     
     @property
     def idade(self):
+        if self._idade is not None:
+            return self._idade
         from datetime import date
         hoje = date.today()
         return hoje.year - self.data_nascimento.year - (
             (hoje.month, hoje.day) < (self.data_nascimento.month, self.data_nascimento.day)
         )
 
+    @idade.setter
+    def idade(self, valor):
+        self._idade = valor
+
+
+class TurmaQuerySet(models.QuerySet):
+    def com_total_alunos(self):
+        """Anota o total de matrículas e carrega professor/representante na mesma consulta"""
+        return self.select_related('professor', 'representante').annotate(
+            total_alunos=models.Count('matriculas')
+        )
+
 
 class Turma(models.Model):
     """Entidade B: Representa as classes ou disciplinas lecionadas"""
@@ -114,6 +160,12 @@ class Turma(models.Model):
         verbose_name="Aluno Representante"
     )
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name="Data de Cadastro")
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Atualizado em")
+
+    objects = TurmaQuerySet.as_manager()
+
+    # Preenchido quando a consulta usa TurmaQuerySet.com_total_alunos()
+    _total_alunos = None
     
     class Meta:
         verbose_name = "Turma"
@@ -122,6 +174,13 @@ class Turma(models.Model):
     
     def __str__(self):
         return f"{self.nome} - {self.professor.nome} ({self.status})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Professor lido do banco, para detectar a troca (sincronização offline)
+        instancia._professor_id_original = instancia.__dict__.get('professor_id')
+        return instancia
     
     @property
     def duracao_dias(self):
@@ -129,8 +188,36 @@ class Turma(models.Model):
     
     @property
     def total_alunos(self):
+        if self._total_alunos is not None:
+            return self._total_alunos
         return self.matriculas.count()
 
+    @total_alunos.setter
+    def total_alunos(self, valor):
+        self._total_alunos = valor
+
+
+class MatriculaQuerySet(models.QuerySet):
+    def recalcular_presenca(self):
+        """
+        Recalcula a presença acumulada de todas as matrículas do queryset
+        em um único UPDATE (mesma regra de calcular_presenca_acumulada)
+        """
+        def contagem(**filtros):
+            return models.Subquery(
+                Presenca.objects.filter(matricula=models.OuterRef('pk'), **filtros)
+                .order_by().values('matricula').annotate(total=models.Count('id')).values('total')
+            )
+
+        percentual = models.ExpressionWrapper(
+            models.Value(100.0) * Coalesce(contagem(status='Presente'), 0) / NullIf(contagem(), 0),
+            output_field=models.FloatField()
+        )
+        return self.update(
+            presenca_acumulada=Coalesce(Round(percentual, 2), 0, output_field=models.DecimalField()),
+            atualizado_em=timezone.now()
+        )
+
 
 class Matricula(models.Model):
     """Tabela de junção para relacionamento N:N entre Turma e Aluno"""
@@ -154,6 +241,9 @@ class Matricula(models.Model):
         verbose_name="Presença Acumulada (%)",
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Atualizado em")
+
+    objects = MatriculaQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Matrícula"
@@ -188,7 +278,7 @@ class Presenca(models.Model):
         related_name='presencas',
         verbose_name="Matrícula"
     )
-    data = models.DateField(verbose_name="Data da Aula")
+    data = models.DateField(db_index=True, verbose_name="Data da Aula")
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -197,6 +287,7 @@ class Presenca(models.Model):
     )
     observacao = models.TextField(blank=True, verbose_name="Observação")
     data_registro = models.DateTimeField(auto_now_add=True, verbose_name="Data do Registro")
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Atualizado em")
     
     class Meta:
         verbose_name = "Presença"
@@ -208,7 +299,155 @@ class Presenca(models.Model):
         return f"{self.matricula.aluno.nome} - {self.data} - {self.status}"
     
     def save(self, *args, **kwargs):
-        """Atualiza a presença acumulada ao salvar"""
+        """Atualiza a presença acumulada ao salvar e avisa o feed ao vivo da turma"""
         super().save(*args, **kwargs)
-        self.matricula.presenca_acumulada = self.matricula.calcular_presenca_acumulada()
-        self.matricula.save()
\ No newline at end of file
+        matricula = self.matricula
+        matricula.presenca_acumulada = matricula.calcular_presenca_acumulada()
+        matricula.save()
+        transaction.on_commit(lambda: publicar_presenca(self, matricula))
+
+
+class FilaPresenca(models.Model):
+    """Escrita de presença aceita no modo de escrita adiada, aguardando gravação em lote"""
+    OPERACAO_CHOICES = [
+        ('criar', 'Criar'),
+        ('atualizar', 'Atualizar'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('gravado', 'Gravado'),
+        ('rejeitado', 'Rejeitado'),
+    ]
+
+    operacao = models.CharField(max_length=10, choices=OPERACAO_CHOICES, verbose_name="Operação")
+    # Alvo da atualização ou, depois de gravada, a presença criada
+    presenca = models.ForeignKey(
+        Presenca,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name="Presença"
+    )
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name="Enviado por"
+    )
+    dados = models.JSONField(verbose_name="Dados validados")
+    estado = models.CharField(
+        max_length=10,
+        choices=ESTADO_CHOICES,
+        default='pendente',
+        db_index=True,
+        verbose_name="Estado"
+    )
+    erro = models.TextField(blank=True, verbose_name="Erro")
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Recebido em")
+    processado_em = models.DateTimeField(null=True, blank=True, verbose_name="Processado em")
+
+    class Meta:
+        verbose_name = "Escrita de Presença Pendente"
+        verbose_name_plural = "Fila de Presenças"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} {self.operacao} ({self.estado})"
+
+
+class RegistroExclusao(models.Model):
+    """Marca de exclusão (tombstone) para a sincronização offline dos professores"""
+    MODELO_CHOICES = [
+        ('turma', 'Turma'),
+        ('matricula', 'Matrícula'),
+        ('presenca', 'Presença'),
+    ]
+
+    modelo = models.CharField(max_length=10, choices=MODELO_CHOICES, verbose_name="Modelo")
+    objeto_id = models.IntegerField(verbose_name="Id do Objeto")
+    # Professor (turma), turma (matrícula) ou matrícula (presença) a que o objeto pertencia
+    pai_id = models.IntegerField(verbose_name="Id do Pai")
+    excluido_em = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Excluído em")
+
+    class Meta:
+        verbose_name = "Registro de Exclusão"
+        verbose_name_plural = "Registros de Exclusão"
+        indexes = [models.Index(fields=['modelo', 'pai_id', 'excluido_em'])]
+
+    def __str__(self):
+        return f"{self.modelo} #{self.objeto_id} em {self.excluido_em}"
+
+
+class RegistroMudanca(models.Model):
+    """
+    Outbox de captura de mudanças (CDC) para o BI. Preenchida por gatilhos do
+    banco (app/captura.py) na mesma transação da escrita; não grave pelo ORM.
+    """
+    OPERACAO_CHOICES = [
+        ('criado', 'Criado'),
+        ('atualizado', 'Atualizado'),
+        ('excluido', 'Excluído'),
+    ]
+
+    tabela = models.CharField(max_length=50, verbose_name="Tabela")
+    objeto_id = models.BigIntegerField(verbose_name="Id do Objeto")
+    operacao = models.CharField(max_length=10, choices=OPERACAO_CHOICES, verbose_name="Operação")
+    # Linha depois da escrita (ou a última versão, na exclusão), com os nomes das colunas
+    dados = models.JSONField(verbose_name="Dados")
+    registrado_em = models.DateTimeField(verbose_name="Registrado em")
+
+    class Meta:
+        verbose_name = "Registro de Mudança"
+        verbose_name_plural = "Registros de Mudança"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} {self.tabela} {self.objeto_id} {self.operacao}"
+
+
+class ConsumidorMudancas(models.Model):
+    """Posição confirmada de cada consumidor da outbox (base da compactação)"""
+    nome = models.CharField(max_length=50, unique=True, verbose_name="Nome")
+    posicao = models.BigIntegerField(default=0, verbose_name="Último registro confirmado")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Consumidor de Mudanças"
+        verbose_name_plural = "Consumidores de Mudanças"
+
+    def __str__(self):
+        return f"{self.nome} (até #{self.posicao})"
+
+
+class PerfilRequisicao(models.Model):
+    """Perfil sob demanda de uma requisição (app/perfilamento.py); os arquivos ficam em PERFIL_DIRETORIO"""
+    view = models.CharField(max_length=200, verbose_name="View")
+    metodo = models.CharField(max_length=10, verbose_name="Método")
+    caminho = models.CharField(max_length=500, verbose_name="Caminho")
+    status = models.PositiveSmallIntegerField(verbose_name="Status HTTP")
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name="Solicitado por"
+    )
+    duracao_ms = models.FloatField(verbose_name="Duração (ms)")
+    consultas = models.PositiveIntegerField(verbose_name="Consultas SQL")
+    tempo_db_ms = models.FloatField(verbose_name="Tempo no banco (ms)")
+    # Caminho do .prof (pstats/snakeviz); o resumo em texto fica ao lado, com extensão .txt
+    arquivo = models.CharField(max_length=500, verbose_name="Arquivo do perfil")
+    resumo = models.TextField(verbose_name="Resumo")
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Criado em")
+
+    class Meta:
+        verbose_name = "Perfil de Requisição"
+        verbose_name_plural = "Perfis de Requisição"
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"#{self.id} {self.view} {self.duracao_ms:.0f}ms"
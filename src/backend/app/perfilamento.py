@@ -0,0 +1,129 @@
+# app/perfilamento.py
+"""
+Perfil sob demanda de uma única requisição, para investigar lentidão em
+produção.
+
+Um usuário staff envia o cabeçalho `X-Perfil: <PERFIL_TOKEN>`: a
+requisição roda sob cProfile e com todas as consultas SQL registradas
+(app/instrumentacao.py). Ao final são gravados em PERFIL_DIRETORIO o
+.prof (abrir com pstats ou snakeviz) e um resumo em texto, e um
+PerfilRequisicao aparece no admin; a resposta traz o id em X-Perfil-Id.
+O segredo é conferido antes de ligar o cProfile (o usuário só é conhecido
+depois da autenticação do DRF, dentro da view); sem PERFIL_TOKEN o perfil
+fica desligado. Requisições sem o cabeçalho só pagam a verificação dele.
+Com o segredo certo mas sem staff o perfil é descartado.
+
+Em views assíncronas o cProfile cobre apenas o event loop; o SQL feito
+nas threads de sync_to_async continua registrado.
+"""
+import cProfile
+import hmac
+import io
+import pstats
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import PerfilRequisicao
+
+LINHAS_RESUMO = 30
+
+
+def solicitado(request):
+    """Perfilador quando a requisição pediu perfil com o segredo PERFIL_TOKEN; None caso contrário"""
+    valor = request.META.get('HTTP_X_PERFIL')
+    if valor is None or not settings.PERFIL_TOKEN:
+        return None
+    if not hmac.compare_digest(valor, settings.PERFIL_TOKEN):
+        return None
+    return Perfilador()
+
+
+def _resumir_sql(sql, limite=120):
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= limite else sql[:limite - 3] + '...'
+
+
+class Perfilador:
+    def __init__(self):
+        self.perfil = cProfile.Profile()
+
+    def iniciar(self):
+        self.perfil.enable()
+
+    def parar(self):
+        self.perfil.disable()
+
+    def resumo(self, medicao, request, response):
+        saida = io.StringIO()
+        saida.write(
+            f"{request.method} {request.get_full_path()} → {medicao.view} ({response.status_code})\n"
+            f"Total: {medicao.duracao * 1000:.1f} ms"
+            f" | SQL: {medicao.consultas} consultas, {medicao.tempo_db * 1000:.1f} ms"
+            f" | Serialização: {medicao.tempo_serializacao * 1000:.1f} ms\n"
+        )
+
+        saida.write(f"\n== Funções por tempo acumulado (top {LINHAS_RESUMO}) ==\n")
+        pstats.Stats(self.perfil, stream=saida).strip_dirs().sort_stats('cumulative').print_stats(LINHAS_RESUMO)
+
+        saida.write(f"== Consultas mais lentas (top {LINHAS_RESUMO}) ==\n")
+        for sql, duracao, many in sorted(medicao.sql, key=lambda item: -item[1])[:LINHAS_RESUMO]:
+            saida.write(f"{duracao * 1000:9.2f} ms  {'[lote] ' if many else ''}{_resumir_sql(sql)}\n")
+
+        repetidas = [(sql, n) for sql, n in Counter(sql for sql, _, _ in medicao.sql).most_common() if n > 1]
+        if repetidas:
+            saida.write("\n== Consultas repetidas (possível N+1) ==\n")
+            for sql, n in repetidas[:LINHAS_RESUMO]:
+                saida.write(f"{n:6d}x  {_resumir_sql(sql)}\n")
+        return saida.getvalue()
+
+    def salvar(self, medicao, request, response):
+        """Grava o perfil se quem pediu é staff; devolve o PerfilRequisicao ou None"""
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated or not user.is_staff:
+            return None
+
+        diretorio = Path(settings.PERFIL_DIRETORIO)
+        diretorio.mkdir(parents=True, exist_ok=True)
+        nome = f"{timezone.now():%Y%m%d-%H%M%S}-{slugify(medicao.view or 'requisicao')}-{uuid.uuid4().hex[:6]}"
+        arquivo = diretorio / f'{nome}.prof'
+        self.perfil.dump_stats(arquivo)
+        resumo = self.resumo(medicao, request, response)
+        arquivo.with_suffix('.txt').write_text(resumo)
+
+        registro = PerfilRequisicao.objects.create(
+            view=(medicao.view or '')[:200],
+            metodo=request.method,
+            caminho=request.get_full_path()[:500],
+            status=response.status_code,
+            usuario=user,
+            duracao_ms=round(medicao.duracao * 1000, 2),
+            consultas=medicao.consultas,
+            tempo_db_ms=round(medicao.tempo_db * 1000, 2),
+            arquivo=str(arquivo),
+            resumo=resumo,
+        )
+        response['X-Perfil-Id'] = str(registro.id)
+        podar()
+        return registro
+
+
+# ========== LIMPEZA ==========
+
+def remover_arquivos(perfis):
+    for perfil in perfis:
+        arquivo = Path(perfil.arquivo)
+        arquivo.unlink(missing_ok=True)
+        arquivo.with_suffix('.txt').unlink(missing_ok=True)
+
+
+def podar():
+    """Mantém só os PERFIL_MAXIMO perfis mais recentes (registros e arquivos)"""
+    antigos = list(PerfilRequisicao.objects.order_by('-id')[settings.PERFIL_MAXIMO:])
+    if antigos:
+        remover_arquivos(antigos)
+        PerfilRequisicao.objects.filter(id__in=[perfil.id for perfil in antigos]).delete()
@@ -1,4 +1,7 @@
 # app/permissions.py (atualização)
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 from .models import Turma, Matricula, Professor, Aluno
 
@@ -101,6 +104,25 @@ class CanVerMinhasPresencas(permissions.BasePermission):
         return False
 
 
+class IsProfessor(permissions.BasePermission):
+    """Apenas usuários com perfil de professor (ex.: sincronização offline)"""
+    def has_permission(self, request, view):
+        return hasattr(request.user, 'professor')
+
+
+class IsAluno(permissions.BasePermission):
+    """Apenas usuários com perfil de aluno (ex.: check-in em sala)"""
+    def has_permission(self, request, view):
+        return hasattr(request.user, 'aluno')
+
+
+class TokenMetricas(permissions.BasePermission):
+    """Coletor de métricas (Prometheus) identificado pelo cabeçalho X-Metricas-Token"""
+    def has_permission(self, request, view):
+        token = request.headers.get('X-Metricas-Token', '')
+        return bool(settings.METRICAS_TOKEN) and hmac.compare_digest(token, settings.METRICAS_TOKEN)
+
+
 class PublicReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
@@ -0,0 +1,368 @@
+# app/provisionamento.py
+"""
+Importação em massa de alunos/professores (roster) com usuários e grupos.
+
+Os signals de criação (um usuário por perfil, com busca de username em laço e
+hash de senha completo) são contornados: usuários, perfis e vínculos de grupo
+entram com bulk_create em uma única transação.
+
+Senhas:
+- 'inutilizavel': senha inutilizável + token de ativação no primeiro acesso
+  (POST /api/auth/ativar-conta/). Custo desprezível por usuário.
+- 'hash': a senha informada é hasheada para cada usuário, em paralelo num
+  pool de processos.
+"""
+import csv
+import io
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework import serializers
+
+from .models import Aluno, Professor, Turma, Matricula
+from .serializers import RosterAlunoSerializer, RosterProfessorSerializer
+from .signals import ids_grupos
+
+TIPOS_ROSTER = {
+    'aluno': (Aluno, RosterAlunoSerializer, 'Aluno', ('matricula', 'email')),
+    'professor': (Professor, RosterProfessorSerializer, 'Professor', ('email',)),
+}
+MODOS_SENHA = ('inutilizavel', 'hash')
+TAMANHO_LOTE = 500
+
+
+def _em_lotes(itens, tamanho=TAMANHO_LOTE):
+    itens = list(itens)
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def ler_csv(arquivo):
+    """Lê um CSV enviado (UTF-8, com ou sem BOM) como lista de dicts"""
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig')
+    return [
+        {campo.strip(): (valor or '').strip() for campo, valor in linha.items() if campo}
+        for linha in csv.DictReader(texto)
+    ]
+
+
+def base_username(dados):
+    """Mesmo critério dos signals: parte local do email ou a matrícula"""
+    if dados.get('email'):
+        base = dados['email'].split('@')[0]
+    else:
+        base = dados['matricula'].lower()
+    return base[:140]
+
+
+def resolver_usernames(bases):
+    """
+    Um username livre para cada base, com sufixo numérico nas colisões
+    (como nos signals), consultando o banco por conjunto e não por usuário.
+    """
+    unicas = set(bases)
+    usados = set()
+    for bloco in _em_lotes(sorted(unicas)):
+        usados.update(User.objects.filter(username__in=bloco).values_list('username', flat=True))
+
+    # Só as bases que colidiram precisam conhecer os sufixos já usados
+    for bloco in _em_lotes(sorted(unicas & usados), 100):
+        padrao = '^(%s)[0-9]+$' % '|'.join(re.escape(base) for base in bloco)
+        usados.update(User.objects.filter(username__regex=padrao).values_list('username', flat=True))
+
+    usernames = []
+    for base in bases:
+        username, contador = base, 1
+        while username in usados:
+            username = f'{base}{contador}'
+            contador += 1
+        usados.add(username)
+        usernames.append(username)
+    return usernames
+
+
+def gerar_senhas(modo, total, senha=None, processos=None):
+    """Hashes de senha para `total` usuários conforme o modo"""
+    if modo == 'inutilizavel':
+        return [make_password(None) for _ in range(total)]
+    if processos and processos > 1 and total > processos:
+        with ProcessPoolExecutor(processos) as pool:
+            return list(pool.map(
+                make_password, repeat(senha, total), chunksize=max(1, total // (processos * 4))
+            ))
+    return [make_password(senha) for _ in range(total)]
+
+
+def criar_usuarios(perfis, grupo, senhas):
+    """
+    Versão em lote dos signals criar_usuario_para_aluno/professor: cria os
+    usuários de uma lista de dados de perfil (nome, email, matrícula) e os
+    coloca no grupo do papel. Deve rodar dentro de uma transação.
+    """
+    usernames = resolver_usernames([base_username(dados) for dados in perfis])
+    usuarios = User.objects.bulk_create([
+        User(
+            username=username, email=dados['email'], password=hash_senha,
+            first_name=dividir_nome(dados['nome'])[0], last_name=dividir_nome(dados['nome'])[1],
+        )
+        for dados, username, hash_senha in zip(perfis, usernames, senhas)
+    ], batch_size=TAMANHO_LOTE)
+    grupo_id = ids_grupos()[grupo]
+    User.groups.through.objects.bulk_create([
+        User.groups.through(user_id=usuario.pk, group_id=grupo_id) for usuario in usuarios
+    ], batch_size=TAMANHO_LOTE)
+    return usuarios
+
+
+def dados_ativacao(usuario):
+    """uid/token para o primeiro acesso (POST /api/auth/ativar-conta/)"""
+    return {
+        'uid': urlsafe_base64_encode(force_bytes(usuario.pk)),
+        'token_ativacao': default_token_generator.make_token(usuario),
+    }
+
+
+def _duplicados(modelo, campos, linhas):
+    """Linhas cujo valor único repete no arquivo ou já existe no banco"""
+    conflitos = {}
+    for campo in campos:
+        vistos = set()
+        existentes = set()
+        valores = [dados[campo] for _, dados in linhas]
+        for bloco in _em_lotes(set(valores)):
+            existentes.update(
+                modelo.objects.filter(**{f'{campo}__in': bloco}).values_list(campo, flat=True)
+            )
+        for numero, dados in linhas:
+            valor = dados[campo]
+            if valor in existentes:
+                conflitos.setdefault(numero, {})[campo] = ['Já cadastrado.']
+            elif valor in vistos:
+                conflitos.setdefault(numero, {})[campo] = ['Repetido no arquivo.']
+            vistos.add(valor)
+    return conflitos
+
+
+def dividir_nome(nome):
+    partes = nome.split()
+    if len(partes) < 2:
+        return '', ''
+    return partes[0], ' '.join(partes[1:])
+
+
+def importar_roster(linhas, tipo, modo_senha='inutilizavel', senha=None, processos=None):
+    """
+    Valida e cria em massa usuários + perfis + grupos a partir de `linhas`
+    (dicts com os campos do perfil). Linhas inválidas são reportadas e
+    ignoradas; as válidas são criadas numa única transação.
+    """
+    if tipo not in TIPOS_ROSTER:
+        raise ValueError(f'Tipo inválido: {tipo}')
+    if modo_senha not in MODOS_SENHA:
+        raise ValueError(f'Modo de senha inválido: {modo_senha}')
+    if modo_senha == 'hash' and not senha:
+        raise ValueError("O modo 'hash' exige uma senha")
+
+    modelo, serializer_class, grupo, campos_unicos = TIPOS_ROSTER[tipo]
+    inicio = time.perf_counter()
+    linhas = list(linhas)
+
+    # Uma única instância: os campos do ModelSerializer são montados uma vez só
+    serializer = serializer_class()
+    validas, erros = [], {}
+    for numero, linha in enumerate(linhas, start=1):
+        try:
+            validas.append((numero, serializer.run_validation(linha)))
+        except serializers.ValidationError as e:
+            erros[numero] = serializers.as_serializer_error(e)
+
+    erros.update(_duplicados(modelo, campos_unicos, validas))
+    validas = [(numero, dados) for numero, dados in validas if numero not in erros]
+
+    senhas = gerar_senhas(modo_senha, len(validas), senha, processos)
+
+    with transaction.atomic():
+        usuarios = criar_usuarios([dados for _, dados in validas], grupo, senhas)
+        perfis = modelo.objects.bulk_create([
+            modelo(usuario=usuario, **dados) for (_, dados), usuario in zip(validas, usuarios)
+        ], batch_size=TAMANHO_LOTE)
+
+    criados = []
+    for (numero, _), usuario, perfil in zip(validas, usuarios, perfis):
+        item = {'linha': numero, 'id': perfil.pk, 'usuario_id': usuario.pk, 'username': usuario.username}
+        if modo_senha == 'inutilizavel':
+            item.update(dados_ativacao(usuario))
+        criados.append(item)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'tipo': tipo,
+        'modo_senha': modo_senha,
+        'recebidas': len(linhas),
+        'criados': len(criados),
+        'ignoradas': len(erros),
+        'segundos': round(segundos, 3),
+        'linhas_por_segundo': round(len(linhas) / segundos, 1) if segundos else None,
+        'erros': [{'linha': numero, 'erros': erros[numero]} for numero in sorted(erros)],
+        'usuarios': criados,
+    }
+
+
+def matricular_em_massa(turma, aluno_ids=(), codigos=()):
+    """
+    Matricula vários alunos (por id ou por matrícula) na turma.
+    Uma consulta resolve os alunos e quem já está matriculado; as matrículas
+    novas entram com bulk_create (ignore_conflicts cobre corridas com o
+    unique_together). Retorna o resultado de cada item, na ordem recebida.
+    """
+    itens = [('aluno_id', valor) for valor in aluno_ids] + [('matricula', valor) for valor in codigos]
+
+    ids = set()
+    for campo, valor in itens:
+        if campo == 'aluno_id':
+            try:
+                ids.add(int(valor))
+            except (TypeError, ValueError):
+                pass
+    codigos_validos = {str(valor).strip() for campo, valor in itens if campo == 'matricula'}
+
+    alunos = Aluno.objects.filter(Q(id__in=ids) | Q(matricula__in=codigos_validos)).annotate(
+        ja_matriculado=Exists(Matricula.objects.filter(turma=turma, aluno=OuterRef('pk')))
+    ).values('id', 'matricula', 'nome', 'ja_matriculado')
+    por_id = {aluno['id']: aluno for aluno in alunos}
+    por_codigo = {aluno['matricula']: aluno for aluno in por_id.values()}
+
+    resultados, novos, vistos = [], [], set()
+    for campo, valor in itens:
+        if campo == 'aluno_id':
+            try:
+                aluno = por_id.get(int(valor))
+            except (TypeError, ValueError):
+                resultados.append({campo: valor, 'status': 'invalido'})
+                continue
+        else:
+            aluno = por_codigo.get(str(valor).strip())
+
+        if aluno is None:
+            resultado = {'status': 'nao_encontrado'}
+        elif aluno['id'] in vistos:
+            resultado = {'status': 'repetido'}
+        elif aluno['ja_matriculado']:
+            resultado = {'status': 'ja_matriculado'}
+        else:
+            resultado = {'status': 'matriculado'}
+            novos.append(aluno['id'])
+        if aluno is not None:
+            vistos.add(aluno['id'])
+            resultado.update(aluno_id=aluno['id'], nome=aluno['nome'])
+        resultados.append({campo: valor, **resultado})
+
+    with transaction.atomic():
+        Matricula.objects.bulk_create(
+            [Matricula(turma=turma, aluno_id=aluno_id) for aluno_id in novos],
+            batch_size=TAMANHO_LOTE, ignore_conflicts=True
+        )
+        matriculas = dict(
+            Matricula.objects.filter(turma=turma, aluno_id__in=novos).values_list('aluno_id', 'id')
+        ) if novos else {}
+
+    for resultado in resultados:
+        if resultado['status'] == 'matriculado':
+            resultado['matricula_id'] = matriculas.get(resultado['aluno_id'])
+
+    resumo = {}
+    for resultado in resultados:
+        resumo[resultado['status']] = resumo.get(resultado['status'], 0) + 1
+    return {'turma': turma.id, 'resumo': resumo, 'resultados': resultados}
+
+
+def virar_semestre(data_inicio, data_fim, turma_ids=None, carregar_matriculas=False,
+                   renomear=None, dry_run=False):
+    """
+    Abre o novo período letivo numa única transação:
+    1. clona as turmas de origem (mesmo professor/descrição, novas datas);
+    2. opcionalmente copia as matrículas para os clones;
+    3. marca como 'Concluída' as turmas ativas que terminam antes de `data_inicio`.
+
+    Sem `turma_ids`, a origem são justamente as turmas ativas que serão
+    concluídas. Clones já existentes (mesmo nome/professor/início) são
+    ignorados, então repetir o comando é seguro. Com dry_run tudo é
+    executado e desfeito ao final, e o relatório mostra o que seria feito.
+    """
+    if data_fim <= data_inicio:
+        raise ValueError('data_fim deve ser posterior a data_inicio')
+    if renomear and not renomear[0]:
+        # str.replace('', x) inseriria x entre todos os caracteres do nome
+        raise ValueError('o texto a substituir (renomear DE) não pode ser vazio')
+
+    inicio = time.perf_counter()
+    with transaction.atomic():
+        origem = Turma.objects.select_for_update().order_by('nome')
+        if turma_ids:
+            origem = origem.filter(id__in=turma_ids)
+        else:
+            origem = origem.filter(status='Ativa', data_fim__lt=data_inicio)
+        origem = list(origem.values('id', 'nome', 'descricao', 'professor_id'))
+
+        for turma in origem:
+            if renomear:
+                turma['nome_novo'] = turma['nome'].replace(*renomear)
+            else:
+                turma['nome_novo'] = turma['nome']
+
+        existentes = set(Turma.objects.filter(
+            data_inicio=data_inicio, professor_id__in={t['professor_id'] for t in origem}
+        ).values_list('nome', 'professor_id'))
+        a_clonar = [t for t in origem if (t['nome_novo'], t['professor_id']) not in existentes]
+        ignoradas = [
+            {'origem': t['id'], 'nome': t['nome_novo'], 'motivo': 'já existe no novo período'}
+            for t in origem if (t['nome_novo'], t['professor_id']) in existentes
+        ]
+
+        clones = Turma.objects.bulk_create([
+            Turma(
+                nome=t['nome_novo'], descricao=t['descricao'], professor_id=t['professor_id'],
+                data_inicio=data_inicio, data_fim=data_fim, status='Ativa'
+            )
+            for t in a_clonar
+        ], batch_size=TAMANHO_LOTE)
+        mapa = {t['id']: clone.pk for t, clone in zip(a_clonar, clones)}
+
+        matriculas_copiadas = 0
+        if carregar_matriculas and mapa:
+            pares = Matricula.objects.filter(turma_id__in=mapa).values_list('turma_id', 'aluno_id')
+            matriculas_copiadas = len(Matricula.objects.bulk_create([
+                Matricula(turma_id=mapa[turma_id], aluno_id=aluno_id) for turma_id, aluno_id in pares
+            ], batch_size=TAMANHO_LOTE, ignore_conflicts=True))
+
+        concluidas = Turma.objects.filter(
+            status='Ativa', data_fim__lt=data_inicio
+        ).exclude(id__in=mapa.values()).update(status='Concluída', atualizado_em=timezone.now())
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    return {
+        'dry_run': dry_run,
+        'periodo': {'data_inicio': data_inicio, 'data_fim': data_fim},
+        'turmas_origem': len(origem),
+        'turmas_criadas': len(clones),
+        'matriculas_copiadas': matriculas_copiadas,
+        'turmas_concluidas': concluidas,
+        'criadas': [
+            {'origem': t['id'], 'id': None if dry_run else mapa[t['id']], 'nome': t['nome_novo']}
+            for t in a_clonar
+        ],
+        'ignoradas': ignoradas,
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
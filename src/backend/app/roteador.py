@@ -0,0 +1,129 @@
+# app/roteador.py
+"""
+Roteamento de leituras/escritas entre o banco primário e uma réplica de leitura.
+
+Escritas sempre vão para o primário. Leituras só vão para a réplica quando a
+view pediu explicitamente (LeituraReplicaMixin) e o cliente não escreveu nada
+recentemente — na mesma requisição ou dentro de DB_FIXAR_PRIMARIO_SEGUNDOS
+(read-your-writes). Sem réplica configurada tudo continua no 'default'.
+"""
+import contextvars
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import permissions
+
+ALIAS_PRIMARIO = 'default'
+COOKIE_PRIMARIO = 'rw_primario'
+
+_estado = contextvars.ContextVar('estado_roteamento', default=None)
+
+
+def alias_leitura():
+    """Alias da réplica, ou o primário quando nenhuma réplica está configurada"""
+    alias = getattr(settings, 'DB_ALIAS_LEITURA', ALIAS_PRIMARIO)
+    return alias if alias in settings.DATABASES else ALIAS_PRIMARIO
+
+
+def iniciar_requisicao():
+    """Cria o estado de roteamento da requisição atual e devolve o token para reset"""
+    return _estado.set({'replica': False, 'escreveu': False})
+
+
+def finalizar_requisicao(token):
+    estado = _estado.get()
+    _estado.reset(token)
+    return estado
+
+
+def usar_replica():
+    """Permite que as próximas leituras desta requisição usem a réplica"""
+    estado = _estado.get()
+    if estado is not None:
+        estado['replica'] = True
+
+
+def _chave_usuario(user_id):
+    return f'roteador:primario:{user_id}'
+
+
+def fixar_primario(request, response=None):
+    """Registra que o cliente escreveu: leituras seguintes vão para o primário"""
+    segundos = settings.DB_FIXAR_PRIMARIO_SEGUNDOS
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(_chave_usuario(user.pk), time.time(), segundos)
+    if response is not None:
+        response.set_cookie(COOKIE_PRIMARIO, '1', max_age=segundos, httponly=True, samesite='Lax')
+
+
+def primario_fixado(request):
+    """Indica se o cliente escreveu dentro da janela de read-your-writes"""
+    if request.COOKIES.get(COOKIE_PRIMARIO):
+        return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return cache.get(_chave_usuario(user.pk)) is not None
+    return False
+
+
+class RoteadorLeituraEscrita:
+    """DATABASE_ROUTERS: separa leituras elegíveis para a réplica"""
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado and estado['replica'] and not estado['escreveu']:
+            return alias_leitura()
+        return ALIAS_PRIMARIO
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            # Depois de uma escrita a própria requisição passa a ler do primário
+            estado['escreveu'] = True
+        return ALIAS_PRIMARIO
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primário e réplica contêm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica é uma cópia do primário, nunca migrada diretamente
+        return db == ALIAS_PRIMARIO
+
+
+class LeituraReplicaMixin:
+    """
+    Mixin para views DRF cujas leituras podem ir para a réplica.
+    `acoes_replica` limita as actions elegíveis (None = todas as leituras).
+    """
+    acoes_replica = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in permissions.SAFE_METHODS:
+            return
+        acao = getattr(self, 'action', None)
+        if self.acoes_replica is not None and acao not in self.acoes_replica:
+            return
+        if not primario_fixado(request):
+            usar_replica()
+
+
+def sincronizar_replica(origem=None, destino=None):
+    """
+    Substituto local da replicação: copia o SQLite primário para o arquivo da
+    réplica usando a API de backup online (não bloqueia escritores em WAL).
+    """
+    origem = origem or settings.DATABASES[ALIAS_PRIMARIO]['NAME']
+    destino = destino or settings.DATABASES[alias_leitura()]['NAME']
+    if str(origem) == str(destino):
+        return False
+
+    with closing(sqlite3.connect(str(origem))) as conexao_origem, \
+            closing(sqlite3.connect(str(destino))) as conexao_destino:
+        conexao_origem.backup(conexao_destino)
+    return True
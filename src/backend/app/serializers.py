@@ -4,20 +4,164 @@ from django.contrib.auth.models import User, Group
 from rest_framework.authtoken.models import Token
 from .models import Professor, Aluno, Turma, Matricula, Presenca
 from django.contrib.auth import authenticate
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
 from django.core.exceptions import ValidationError
 from drf_spectacular.utils import extend_schema_field
+from django.conf import settings
+from django.db import transaction
+from rest_framework.validators import UniqueValidator
+from .analytics import campo_turmas_por_status
+from .authentication import invalidar_usuario
+from .instrumentacao import SerializacaoMedida
 
 
-class ProfessorSerializer(serializers.ModelSerializer):
+class ListaEmLoteSerializer(SerializacaoMedida, serializers.ListSerializer):
+    """
+    Criação e atualização parcial em lote (many=True).
+    A unicidade de `campos_unicos` é verificada para o lote inteiro, com uma
+    consulta por campo, em vez de uma consulta por item.
+    """
+    campos_unicos = ()
+    grupo = None
+
+    def _preparar_filho(self):
+        if getattr(self, '_filho_preparado', False):
+            return
+        for campo in self.campos_unicos:
+            field = self.child.fields.get(campo)
+            if field is not None:
+                field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+        self._por_id = {obj.pk: obj for obj in self.instance} if self.instance is not None else None
+        self._filho_preparado = True
+
+    def run_child_validation(self, data):
+        self._preparar_filho()
+        if self._por_id is None:
+            return super().run_child_validation(data)
+
+        pk = data.get('id') if isinstance(data, dict) else None
+        self.child.instance = self._por_id.get(pk) if isinstance(pk, int) else None
+        if self.child.instance is None:
+            raise serializers.ValidationError({'id': ['Informe o id de um registro existente.']})
+        self.child.initial_data = data
+        validated = super().run_child_validation(data)
+        validated['id'] = pk
+        return validated
+
+    def to_internal_value(self, data):
+        # Erros do lote no mesmo formato dos erros por item (uma lista)
+        itens = super().to_internal_value(data)
+        self._validar_lote(itens)
+        return itens
+
+    def _validar_lote(self, itens):
+        modelo = self.child.Meta.model
+        erros = [{} for _ in itens]
+
+        if self._por_id is not None:
+            vistos = set()
+            for erro, item in zip(erros, itens):
+                if item['id'] in vistos:
+                    erro['id'] = ['Repetido no lote.']
+                vistos.add(item['id'])
+
+        for campo in self.campos_unicos:
+            valores = [(i, item[campo]) for i, item in enumerate(itens) if campo in item]
+            if not valores:
+                continue
+            donos = dict(modelo.objects.filter(
+                **{f'{campo}__in': {valor for _, valor in valores}}
+            ).values_list(campo, 'pk'))
+            vistos = set()
+            for i, valor in valores:
+                dono = donos.get(valor)
+                if dono is not None and dono != itens[i].get('id'):
+                    erros[i][campo] = ['Já cadastrado.']
+                elif valor in vistos:
+                    erros[i][campo] = ['Repetido no lote.']
+                vistos.add(valor)
+
+        if any(erros):
+            raise serializers.ValidationError(erros)
+
+    def create(self, itens):
+        """Perfis e usuários em bulk; equivale aos signals de criação, em lote"""
+        from .provisionamento import criar_usuarios, dados_ativacao, gerar_senhas
+
+        modelo = self.child.Meta.model
+        with transaction.atomic():
+            usuarios = criar_usuarios(itens, self.grupo, gerar_senhas('inutilizavel', len(itens)))
+            objetos = modelo.objects.bulk_create(
+                [modelo(usuario=usuario, **item) for item, usuario in zip(itens, usuarios)],
+                batch_size=500
+            )
+        self.ativacao = {
+            obj.pk: {'username': usuario.username, **dados_ativacao(usuario)}
+            for obj, usuario in zip(objetos, usuarios)
+        }
+        return objetos
+
+    def update(self, instancias, itens):
+        modelo = self.child.Meta.model
+        campos = set()
+        objetos = []
+        for item in itens:
+            obj = self._por_id[item['id']]
+            for campo, valor in item.items():
+                if campo != 'id':
+                    setattr(obj, campo, valor)
+                    campos.add(campo)
+            objetos.append(obj)
+
+        usuario_ids = [obj.usuario_id for obj in objetos if obj.usuario_id]
+        with transaction.atomic():
+            if campos:
+                modelo.objects.bulk_update(objetos, sorted(campos), batch_size=500)
+            if 'email' in campos and usuario_ids:
+                # Mesmo efeito da sincronização de email dos signals, em uma escrita
+                User.objects.bulk_update(
+                    [User(pk=obj.usuario_id, email=obj.email) for obj in objetos if obj.usuario_id],
+                    ['email'], batch_size=500
+                )
+            transaction.on_commit(lambda: [invalidar_usuario(usuario_id) for usuario_id in usuario_ids])
+        return objetos
+
+
+class ProfessorListSerializer(ListaEmLoteSerializer):
+    campos_unicos = ('email',)
+    grupo = 'Professor'
+
+
+class AlunoListSerializer(ListaEmLoteSerializer):
+    campos_unicos = ('matricula', 'email')
+    grupo = 'Aluno'
+
+
+class ProfessorSerializer(SerializacaoMedida, serializers.ModelSerializer):
     quantidade_turmas = serializers.IntegerField(read_only=True)
+    # Disponíveis quando o queryset usa Professor.objects.com_carga()
+    total_alunos = serializers.IntegerField(read_only=True)
+    total_aulas = serializers.IntegerField(read_only=True)
+    turmas_por_status = serializers.SerializerMethodField()
     
     class Meta:
         model = Professor
         fields = [
             'id', 'nome', 'email', 'departamento', 
-            'ativo', 'data_cadastro', 'quantidade_turmas'
+            'ativo', 'data_cadastro', 'quantidade_turmas',
+            'total_alunos', 'total_aulas', 'turmas_por_status'
         ]
         read_only_fields = ['id', 'data_cadastro']
+        list_serializer_class = ProfessorListSerializer
+
+    @extend_schema_field(serializers.DictField(child=serializers.IntegerField(), allow_null=True))
+    def get_turmas_por_status(self, obj):
+        campos = {valor: campo_turmas_por_status(valor) for valor, _ in Turma.STATUS_CHOICES}
+        if not all(hasattr(obj, campo) for campo in campos.values()):
+            return None
+        return {valor: getattr(obj, campo) for valor, campo in campos.items()}
     
     def to_representation(self, instance):
         """Personaliza a representação para views públicas"""
@@ -32,7 +176,7 @@ class ProfessorSerializer(serializers.ModelSerializer):
         return representation
 
 
-class AlunoSerializer(serializers.ModelSerializer):
+class AlunoSerializer(SerializacaoMedida, serializers.ModelSerializer):
     idade = serializers.IntegerField(read_only=True)
     
     class Meta:
@@ -42,18 +186,103 @@ class AlunoSerializer(serializers.ModelSerializer):
             'data_nascimento', 'genero', 'data_cadastro', 'idade'
         ]
         read_only_fields = ['id', 'data_cadastro']
+        list_serializer_class = AlunoListSerializer
     
     def validate_matricula(self, value):
         """Valida se a matrícula já existe"""
         if self.instance and self.instance.matricula == value:
             return value
+        if isinstance(self.parent, serializers.ListSerializer):
+            return value  # Verificada para o lote inteiro em AlunoListSerializer
         
         if Aluno.objects.filter(matricula=value).exists():
             raise serializers.ValidationError("Matrícula já cadastrada")
         return value
 
 
-class TurmaSerializer(serializers.ModelSerializer):
+class RosterProfessorSerializer(SerializacaoMedida, serializers.ModelSerializer):
+    """Linha do roster de professores; unicidade é verificada em lote na importação"""
+
+    class Meta:
+        model = Professor
+        fields = ['nome', 'email', 'departamento']
+        extra_kwargs = {'email': {'validators': []}}
+
+
+class RosterAlunoSerializer(SerializacaoMedida, serializers.ModelSerializer):
+    """Linha do roster de alunos; unicidade é verificada em lote na importação"""
+
+    class Meta:
+        model = Aluno
+        fields = ['nome', 'matricula', 'email', 'curso', 'data_nascimento', 'genero']
+        extra_kwargs = {
+            'matricula': {'validators': []},
+            'email': {'validators': []},
+        }
+
+
+class ImportarRosterSerializer(SerializacaoMedida, serializers.Serializer):
+    tipo = serializers.ChoiceField(choices=[('aluno', 'Aluno'), ('professor', 'Professor')])
+    senhas = serializers.ChoiceField(
+        choices=[('inutilizavel', 'Ativação no primeiro acesso'), ('hash', 'Senha definida')],
+        default='inutilizavel'
+    )
+    senha = serializers.CharField(required=False, write_only=True, min_length=6)
+    linhas = serializers.ListField(child=serializers.DictField(), required=False)
+    arquivo = serializers.FileField(required=False, help_text='CSV com cabeçalho')
+
+    def validate(self, data):
+        if not data.get('linhas') and not data.get('arquivo'):
+            raise serializers.ValidationError('Envie "linhas" ou um "arquivo" CSV.')
+        if data['senhas'] == 'hash' and not data.get('senha'):
+            raise serializers.ValidationError({'senha': "Obrigatória no modo 'hash'."})
+        return data
+
+
+class VirarSemestreSerializer(SerializacaoMedida, serializers.Serializer):
+    data_inicio = serializers.DateField()
+    data_fim = serializers.DateField()
+    turmas = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        help_text='Turmas a clonar (padrão: ativas que terminam antes de data_inicio)'
+    )
+    carregar_matriculas = serializers.BooleanField(default=False)
+    renomear_de = serializers.CharField(required=False, allow_blank=False, trim_whitespace=False)
+    renomear_para = serializers.CharField(required=False, allow_blank=True)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data['data_fim'] <= data['data_inicio']:
+            raise serializers.ValidationError({'data_fim': 'Deve ser posterior a data_inicio.'})
+        if ('renomear_de' in data) != ('renomear_para' in data):
+            raise serializers.ValidationError('Informe renomear_de e renomear_para juntos.')
+        return data
+
+
+class PresencaOfflineSerializer(SerializacaoMedida, serializers.Serializer):
+    """Presença registrada no aparelho do professor sem conexão"""
+    matricula = serializers.IntegerField()
+    data = serializers.DateField()
+    status = serializers.ChoiceField(choices=Presenca.STATUS_CHOICES)
+    observacao = serializers.CharField(required=False, allow_blank=True, default='')
+    forcar = serializers.BooleanField(
+        required=False, default=False,
+        help_text='Sobrescreve a versão do servidor mesmo que ela tenha mudado depois do cursor'
+    )
+
+
+class SincronizacaoSerializer(SerializacaoMedida, serializers.Serializer):
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    # Cada item é validado separadamente: um item inválido não derruba o lote
+    presencas = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+
+    def validate_presencas(self, value):
+        if len(value) > settings.SYNC_MAX_PRESENCAS:
+            raise serializers.ValidationError(f'Envie no máximo {settings.SYNC_MAX_PRESENCAS} presenças por vez.')
+        return value
+
+
+class TurmaSerializer(SerializacaoMedida, serializers.ModelSerializer):
     professor_nome = serializers.CharField(source='professor.nome', read_only=True)
     total_alunos = serializers.IntegerField(read_only=True)
     duracao_dias = serializers.IntegerField(read_only=True)
@@ -93,7 +322,7 @@ class TurmaSerializer(serializers.ModelSerializer):
         return representation
 
 
-class MatriculaSerializer(serializers.ModelSerializer):
+class MatriculaSerializer(SerializacaoMedida, serializers.ModelSerializer):
     aluno_nome = serializers.CharField(source='aluno.nome', read_only=True)
     turma_nome = serializers.CharField(source='turma.nome', read_only=True)
     aluno_matricula = serializers.CharField(source='aluno.matricula', read_only=True)
@@ -107,7 +336,7 @@ class MatriculaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'data_matricula', 'presenca_acumulada']
 
 
-class PresencaSerializer(serializers.ModelSerializer):
+class PresencaSerializer(SerializacaoMedida, serializers.ModelSerializer):
     aluno_nome = serializers.CharField(source='matricula.aluno.nome', read_only=True)
     turma_nome = serializers.CharField(source='matricula.turma.nome', read_only=True)
     aluno_matricula = serializers.CharField(source='matricula.aluno.matricula', read_only=True)
@@ -121,7 +350,7 @@ class PresencaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'data_registro']
 
 
-class DashboardTurmaSerializer(serializers.Serializer):
+class DashboardTurmaSerializer(SerializacaoMedida, serializers.Serializer):
     """Serializer para a rota de dashboard da turma"""
     turma = serializers.SerializerMethodField()
     professor = serializers.SerializerMethodField()
@@ -157,7 +386,10 @@ class DashboardTurmaSerializer(serializers.Serializer):
         child=serializers.DictField(child=serializers.CharField())
     ))
     def get_alunos_matriculados(self, obj):
-        matriculas = Matricula.objects.filter(turma=obj['turma']).select_related('aluno')
+        # As views assíncronas já entregam as matrículas carregadas
+        matriculas = obj.get('matriculas')
+        if matriculas is None:
+            matriculas = Matricula.objects.filter(turma=obj['turma']).select_related('aluno')
         data = []
         for matricula in matriculas:
             data.append({
@@ -187,7 +419,7 @@ class DashboardTurmaSerializer(serializers.Serializer):
         return None
 
 # Serializers para rotas específicas
-class ProfessorTurmasSerializer(serializers.ModelSerializer):
+class ProfessorTurmasSerializer(SerializacaoMedida, serializers.ModelSerializer):
     turmas = TurmaSerializer(many=True, read_only=True)
     
     class Meta:
@@ -195,7 +427,7 @@ class ProfessorTurmasSerializer(serializers.ModelSerializer):
         fields = ['id', 'nome', 'turmas']
 
 
-class TurmaAlunosSerializer(serializers.ModelSerializer):
+class TurmaAlunosSerializer(SerializacaoMedida, serializers.ModelSerializer):
     alunos = serializers.SerializerMethodField()
     
     class Meta:
@@ -210,7 +442,7 @@ class TurmaAlunosSerializer(serializers.ModelSerializer):
         return MatriculaSerializer(matriculas, many=True).data
 
 
-class RepresentanteSerializer(serializers.ModelSerializer):
+class RepresentanteSerializer(SerializacaoMedida, serializers.ModelSerializer):
     representante = AlunoSerializer(read_only=True)
     
     class Meta:
@@ -218,7 +450,7 @@ class RepresentanteSerializer(serializers.ModelSerializer):
         fields = ['id', 'nome', 'representante']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SerializacaoMedida, serializers.ModelSerializer):
     grupo = serializers.SerializerMethodField()
     
     class Meta:
@@ -237,7 +469,7 @@ class UserSerializer(serializers.ModelSerializer):
         return 'Sem grupo'
 
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(SerializacaoMedida, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
     password2 = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
     tipo_usuario = serializers.ChoiceField(
@@ -279,7 +511,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         
         return user
 
-class LoginSerializer(serializers.Serializer):
+class LoginSerializer(SerializacaoMedida, serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
     
@@ -296,6 +528,8 @@ class LoginSerializer(serializers.Serializer):
                 else:
                     raise ValidationError('Conta desativada.')
             else:
+                # Mesma mensagem para senha errada, usuário inexistente ou conta importada
+                # ainda sem senha: não revela quais usernames existem
                 raise ValidationError('Credenciais inválidas.')
         else:
             raise ValidationError('Usuário e senha são obrigatórios.')
@@ -303,7 +537,7 @@ class LoginSerializer(serializers.Serializer):
         return data
 
 
-class ChangePasswordSerializer(serializers.Serializer):
+class ChangePasswordSerializer(SerializacaoMedida, serializers.Serializer):
     old_password = serializers.CharField(required=True, write_only=True)
     new_password = serializers.CharField(required=True, write_only=True, min_length=6)
     confirm_password = serializers.CharField(required=True, write_only=True, min_length=6)
@@ -329,7 +563,7 @@ class ChangePasswordSerializer(serializers.Serializer):
         return user
 
 
-class ResetPasswordSerializer(serializers.Serializer):
+class ResetPasswordSerializer(SerializacaoMedida, serializers.Serializer):
     email = serializers.EmailField(required=True)
     
     def validate_email(self, value):
@@ -338,7 +572,7 @@ class ResetPasswordSerializer(serializers.Serializer):
         return value
 
 
-class ResetPasswordConfirmSerializer(serializers.Serializer):
+class ResetPasswordConfirmSerializer(SerializacaoMedida, serializers.Serializer):
     new_password = serializers.CharField(required=True, write_only=True, min_length=6)
     confirm_password = serializers.CharField(required=True, write_only=True, min_length=6)
     token = serializers.CharField(required=True, write_only=True)
@@ -352,4 +586,37 @@ class ResetPasswordConfirmSerializer(serializers.Serializer):
         # Aqui você validaria o token (em produção, implementaria lógica de token)
         # Por enquanto, apenas aceitamos qualquer token
         
-        return data
\ No newline at end of file
+        return data
+
+
+class AtivarContaSerializer(SerializacaoMedida, serializers.Serializer):
+    """Primeiro acesso de usuários importados com senha inutilizável"""
+    uid = serializers.CharField(required=True)
+    token = serializers.CharField(required=True, write_only=True)
+    new_password = serializers.CharField(required=True, write_only=True, min_length=6)
+    confirm_password = serializers.CharField(required=True, write_only=True, min_length=6)
+
+    def validate(self, data):
+        if data['new_password'] != data['confirm_password']:
+            raise serializers.ValidationError({
+                'confirm_password': 'As senhas não coincidem.'
+            })
+
+        try:
+            user_id = force_str(urlsafe_base64_decode(data['uid']))
+            user = User.objects.select_related('professor', 'aluno').get(pk=user_id)
+        except (TypeError, ValueError, OverflowError, User.DoesNotExist):
+            user = None
+
+        if user is None or user.has_usable_password() or \
+                not default_token_generator.check_token(user, data['token']):
+            raise serializers.ValidationError({'token': 'Link de ativação inválido ou já utilizado.'})
+
+        data['user'] = user
+        return data
+
+    def save(self, **kwargs):
+        user = self.validated_data['user']
+        user.set_password(self.validated_data['new_password'])
+        user.save()
+        return user
@@ -1,16 +1,25 @@
 # src/backend/app/signals.py
-from django.db.models.signals import post_save, pre_save
+import logging
+
+from django.db.models.signals import m2m_changed, post_init, post_save, pre_save, post_delete, post_migrate
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
-from .models import Professor, Aluno
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+from django.utils import timezone
+from .models import Professor, Aluno, Turma, Matricula, Presenca, RegistroExclusao
+from .authentication import invalidar_token, invalidar_usuario, revogar_tokens_usuario
+from .instrumentacao import medir_receptor
+
+logger = logging.getLogger(__name__)
 
 # ============================================================================
 # 1. SIGNALS PARA USER (Quando usuário é criado/atualizado)
 # ============================================================================
 
 @receiver(post_save, sender=User)
+@medir_receptor
 def criar_perfil_usuario(sender, instance, created, **kwargs):
     """
     Signal para criar perfil automaticamente quando um usuário é criado.
@@ -115,6 +124,7 @@ def criar_perfil_aluno(usuario):
 # ============================================================================
 
 @receiver(post_save, sender=Professor)
+@medir_receptor
 def criar_usuario_para_professor(sender, instance, created, **kwargs):
     """
     Cria um usuário automaticamente quando um professor é criado sem usuário
@@ -159,14 +169,14 @@ def criar_usuario_para_professor(sender, instance, created, **kwargs):
             print(f"[SIGNAL-PROFESSOR] Erro ao criar usuário para professor: {e}")
 
 @receiver(post_save, sender=Professor)
+@medir_receptor
 def atualizar_usuario_professor(sender, instance, created, **kwargs):
     """
     Atualiza grupos do usuário quando um professor é atualizado
     """
-    if instance.usuario and not created:  # Apenas para updates, não criação
+    if instance.usuario_id and not created:  # Apenas para updates, não criação
         try:
-            sincronizar_grupos_professor(instance.usuario)
-            print(f"[SIGNAL-PROFESSOR] Usuário {instance.usuario.username} sincronizado como Professor")
+            sincronizar_grupos_professor(instance.usuario_id, email=instance.email)
         except Exception as e:
             print(f"[SIGNAL-PROFESSOR] Erro ao sincronizar grupos: {e}")
 
@@ -175,6 +185,7 @@ def atualizar_usuario_professor(sender, instance, created, **kwargs):
 # ============================================================================
 
 @receiver(post_save, sender=Aluno)
+@medir_receptor
 def criar_usuario_para_aluno(sender, instance, created, **kwargs):
     """
     Cria um usuário automaticamente quando um aluno é criado sem usuário
@@ -216,14 +227,14 @@ def criar_usuario_para_aluno(sender, instance, created, **kwargs):
             print(f"[SIGNAL-ALUNO] Erro ao criar usuário para aluno: {e}")
 
 @receiver(post_save, sender=Aluno)
+@medir_receptor
 def atualizar_usuario_aluno(sender, instance, created, **kwargs):
     """
     Atualiza grupos do usuário quando um aluno é atualizado
     """
-    if instance.usuario and not created:
+    if instance.usuario_id and not created:
         try:
-            sincronizar_grupos_aluno(instance.usuario)
-            print(f"[SIGNAL-ALUNO] Usuário {instance.usuario.username} sincronizado como Aluno")
+            sincronizar_grupos_aluno(instance.usuario_id, email=instance.email)
         except Exception as e:
             print(f"[SIGNAL-ALUNO] Erro ao sincronizar grupos: {e}")
 
@@ -231,43 +242,84 @@ def atualizar_usuario_aluno(sender, instance, created, **kwargs):
 # 5. FUNÇÕES DE SINCRONIZAÇÃO DE GRUPOS
 # ============================================================================
 
-def sincronizar_grupos_professor(usuario):
-    """Sincroniza grupos para um usuário professor"""
-    # Adiciona ao grupo Professor
-    grupo_professor, _ = Group.objects.get_or_create(name='Professor')
-    usuario.groups.add(grupo_professor)
-    
-    # Remove do grupo Aluno se estiver
-    grupo_aluno = Group.objects.filter(name='Aluno').first()
-    if grupo_aluno and grupo_aluno in usuario.groups.all():
-        usuario.groups.remove(grupo_aluno)
-    
-    # Atualiza email se necessário
-    if hasattr(usuario, 'professor') and usuario.professor.email != usuario.email:
-        usuario.email = usuario.professor.email
-        usuario.save()
-
-def sincronizar_grupos_aluno(usuario):
-    """Sincroniza grupos para um usuário aluno"""
-    # Adiciona ao grupo Aluno
-    grupo_aluno, _ = Group.objects.get_or_create(name='Aluno')
-    usuario.groups.add(grupo_aluno)
-    
-    # Remove do grupo Professor se estiver
-    grupo_professor = Group.objects.filter(name='Professor').first()
-    if grupo_professor and grupo_professor in usuario.groups.all():
-        usuario.groups.remove(grupo_professor)
-    
-    # Atualiza email se necessário
-    if hasattr(usuario, 'aluno') and usuario.aluno.email != usuario.email:
-        usuario.email = usuario.aluno.email
-        usuario.save()
+GRUPOS_PAPEIS = ('Professor', 'Aluno')
+
+# Ids dos grupos de papel, resolvidos uma vez por processo
+_ids_grupos = {}
+
+def ids_grupos():
+    """Retorna {nome: id} dos grupos Professor/Aluno, criando-os se preciso"""
+    if len(_ids_grupos) < len(GRUPOS_PAPEIS):
+        existentes = dict(Group.objects.filter(name__in=GRUPOS_PAPEIS).values_list('name', 'id'))
+        for nome in GRUPOS_PAPEIS:
+            if nome not in existentes:
+                existentes[nome] = Group.objects.get_or_create(name=nome)[0].id
+        # Só entra no cache depois do commit: um rollback desfaria grupos criados aqui
+        transaction.on_commit(lambda: _ids_grupos.update(existentes))
+        return existentes
+    return _ids_grupos
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@medir_receptor
+def limpar_cache_grupos(sender, **kwargs):
+    _ids_grupos.clear()
+
+def _aplicar_grupos(usuario_id, papel, email=None):
+    """
+    Deixa o usuário apenas no grupo do papel (diff contra os grupos atuais)
+    e alinha o email do usuário ao do perfil. Só escreve o que mudou.
+    """
+    Membro = User.groups.through
+    for tentativa in range(2):
+        ids = ids_grupos()
+        desejado = ids[papel]
+        outros = [id_ for nome, id_ in ids.items() if nome != papel]
+        try:
+            with transaction.atomic():
+                atuais = set(Membro.objects.filter(
+                    user_id=usuario_id, group_id__in=ids.values()
+                ).values_list('group_id', flat=True))
+                if atuais & set(outros):
+                    Membro.objects.filter(user_id=usuario_id, group_id__in=outros).delete()
+                if desejado not in atuais:
+                    Membro.objects.create(user_id=usuario_id, group_id=desejado)
+                if email is not None:
+                    # update() não dispara os signals de User (sem recursão)
+                    if User.objects.filter(pk=usuario_id).exclude(email=email).update(email=email):
+                        transaction.on_commit(lambda: invalidar_usuario(usuario_id))
+            return
+        except IntegrityError:
+            # Id de grupo em cache não existe mais (grupo recriado): resolve de novo
+            _ids_grupos.clear()
+            if tentativa:
+                raise
+
+def _aplicar_grupos_apos_commit(usuario_id, papel, email):
+    """A escrita do perfil já foi confirmada: uma falha aqui não pode virar erro da requisição"""
+    try:
+        _aplicar_grupos(usuario_id, papel, email)
+    except Exception:
+        logger.exception('Falha ao sincronizar grupos do usuário %s (papel %s)', usuario_id, papel)
+
+def _agendar_grupos(usuario, papel, email=None):
+    usuario_id = getattr(usuario, 'pk', usuario)
+    transaction.on_commit(lambda: _aplicar_grupos_apos_commit(usuario_id, papel, email))
+
+def sincronizar_grupos_professor(usuario, email=None):
+    """Sincroniza grupos para um usuário professor (após o commit)"""
+    _agendar_grupos(usuario, 'Professor', email)
+
+def sincronizar_grupos_aluno(usuario, email=None):
+    """Sincroniza grupos para um usuário aluno (após o commit)"""
+    _agendar_grupos(usuario, 'Aluno', email)
 
 # ============================================================================
 # 6. SIGNAL AUXILIAR (pre_save para capturar tipo_usuario)
 # ============================================================================
 
 @receiver(pre_save, sender=User)
+@medir_receptor
 def capturar_tipo_usuario(sender, instance, **kwargs):
     """
     Captura o tipo_usuario antes de salvar o usuário.
@@ -277,4 +329,135 @@ def capturar_tipo_usuario(sender, instance, **kwargs):
     if not instance.pk:
         # O tipo_usuario é armazenado como atributo temporário
         if hasattr(instance, '_tipo_usuario_registro'):
-            print(f"[PRE-SIGNAL] Tipo de usuário capturado: {instance._tipo_usuario_registro}")
\ No newline at end of file
+            print(f"[PRE-SIGNAL] Tipo de usuário capturado: {instance._tipo_usuario_registro}")
+
+# ============================================================================
+# 7. INVALIDAÇÃO DO CACHE DE AUTENTICAÇÃO
+# ============================================================================
+
+# Só depois do commit: antes dele outra requisição poderia recolocar no cache o
+# estado antigo, e um rollback não deve revogar nada
+
+@receiver(post_delete, sender=Token)
+@medir_receptor
+def invalidar_cache_token(sender, instance, **kwargs):
+    """Logout e troca de senha apagam o token: ele deixa de valer na hora"""
+    key = instance.key
+    transaction.on_commit(lambda: invalidar_token(key))
+
+# Campos do usuário que, ao mudar, invalidam os tokens assinados já emitidos
+CAMPOS_REVOGACAO = ('is_active', 'is_staff', 'is_superuser', 'password')
+ADIADO = object()
+
+def _campos_revogacao(usuario):
+    # Só o que já está carregado: campos adiados (only/defer) não disparam SELECT
+    return tuple(usuario.__dict__.get(campo, ADIADO) for campo in CAMPOS_REVOGACAO)
+
+@receiver(post_init, sender=User)
+def guardar_campos_revogacao(sender, instance, **kwargs):
+    """
+    Valores lidos do banco, para o post_save comparar sem consultar de novo
+    (como Turma.from_db). Roda a cada usuário instanciado: fica fora das métricas.
+    """
+    instance._campos_revogacao = _campos_revogacao(instance) if instance.pk is not None else None
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@medir_receptor
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    """Desativação, mudança de staff/senha ou exclusão do usuário"""
+    usuario_id = instance.pk
+    transaction.on_commit(lambda: invalidar_usuario(usuario_id))
+
+    anteriores = getattr(instance, '_campos_revogacao', None)
+    atuais = _campos_revogacao(instance)
+    instance._campos_revogacao = atuais
+    mudou = anteriores is not None and anteriores != atuais
+    if mudou or not instance.is_active or kwargs.get('signal') is post_delete:
+        # Tokens assinados não passam pelo banco: revoga pela lista em cache
+        transaction.on_commit(lambda: revogar_tokens_usuario(usuario_id))
+
+@receiver(m2m_changed, sender=User.groups.through)
+@medir_receptor
+def revogar_ao_mudar_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    """Papel em grupos mudou (admin, user.groups.add/remove/clear ou group.user_set)"""
+    if reverse and action == 'pre_clear':
+        # instance é o Group; o post_clear não informa quem saiu
+        instance._usuarios_removidos = list(instance.user_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        usuarios = [instance.pk]
+    elif action == 'post_clear':
+        usuarios = getattr(instance, '_usuarios_removidos', [])
+    else:
+        usuarios = pk_set
+    for usuario_id in usuarios:
+        transaction.on_commit(lambda usuario_id=usuario_id: invalidar_usuario(usuario_id))
+        transaction.on_commit(lambda usuario_id=usuario_id: revogar_tokens_usuario(usuario_id))
+
+@receiver(post_save, sender=Professor)
+@receiver(post_delete, sender=Professor)
+@receiver(post_save, sender=Aluno)
+@receiver(post_delete, sender=Aluno)
+@medir_receptor
+def invalidar_cache_perfil(sender, instance, created=False, **kwargs):
+    """O papel (professor/aluno) fica em cache junto com o usuário e nos tokens assinados"""
+    usuario_id = instance.usuario_id
+    if not usuario_id:
+        return
+    transaction.on_commit(lambda: invalidar_usuario(usuario_id))
+    if created or kwargs.get('signal') is post_delete:
+        transaction.on_commit(lambda: revogar_tokens_usuario(usuario_id))
+
+# ============================================================================
+# 8. MARCAS DE EXCLUSÃO PARA A SINCRONIZAÇÃO OFFLINE (app/sincronizacao.py)
+# ============================================================================
+
+@receiver(post_delete, sender=Turma)
+@medir_receptor
+def registrar_exclusao_turma(sender, instance, **kwargs):
+    RegistroExclusao.objects.create(modelo='turma', objeto_id=instance.pk, pai_id=instance.professor_id)
+
+@receiver(post_delete, sender=Matricula)
+@medir_receptor
+def registrar_exclusao_matricula(sender, instance, **kwargs):
+    RegistroExclusao.objects.create(modelo='matricula', objeto_id=instance.pk, pai_id=instance.turma_id)
+
+@receiver(post_delete, sender=Presenca)
+@medir_receptor
+def registrar_exclusao_presenca(sender, instance, **kwargs):
+    RegistroExclusao.objects.create(modelo='presenca', objeto_id=instance.pk, pai_id=instance.matricula_id)
+
+@receiver(post_save, sender=Turma)
+@medir_receptor
+def registrar_troca_professor(sender, instance, created, **kwargs):
+    """
+    Turma passada a outro professor: some para o antigo e chega completa ao
+    novo (matrículas e presenças marcadas como alteradas agora)
+    """
+    anterior = getattr(instance, '_professor_id_original', None)
+    instance._professor_id_original = instance.professor_id
+    if created or anterior is None or anterior == instance.professor_id:
+        return
+
+    agora = timezone.now()
+    RegistroExclusao.objects.create(modelo='turma', objeto_id=instance.pk, pai_id=anterior)
+    Matricula.objects.filter(turma=instance).update(atualizado_em=agora)
+    Presenca.objects.filter(matricula__turma=instance).update(atualizado_em=agora)
+
+# ============================================================================
+# 9. GATILHOS DE CAPTURA DE MUDANÇAS (app/captura.py)
+# ============================================================================
+
+@receiver(post_migrate)
+def reinstalar_gatilhos_captura(sender, app_config=None, using='default', apps=None, **kwargs):
+    """Alterações de schema no SQLite recriam tabelas e levam os gatilhos junto"""
+    from .captura import instalar_gatilhos
+    if app_config is None or app_config.label != 'app' or apps is None:
+        return
+    try:
+        apps.get_model('app', 'RegistroMudanca')
+    except LookupError:
+        return  # migrado para antes da outbox
+    instalar_gatilhos(apps, using=using)
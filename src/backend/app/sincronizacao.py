@@ -0,0 +1,207 @@
+# app/sincronizacao.py
+"""
+Sincronização offline dos aplicativos dos professores.
+
+- Leitura: turmas, matrículas e presenças do professor alteradas desde o
+  cursor (campos atualizado_em) e os ids removidos (RegistroExclusao). Sem
+  cursor, ou com cursor mais antigo que SYNC_RETENCAO_DIAS, a resposta é
+  completa e o aparelho substitui os dados locais.
+- Envio: presenças registradas offline, resolvidas por (matrícula, data).
+  Se a presença mudou no servidor depois do cursor em que o aparelho se
+  baseou, vale a versão do servidor (devolvida como conflito), a menos que
+  o item venha com "forcar".
+
+O cursor é opaco (assinado) e guarda o instante da leitura e o último id da
+outbox de captura (app/captura.py). Como os ids da outbox seguem a ordem de
+commit, escritas de transações que ainda estavam abertas na leitura aparecem
+com id maior e antecipam o instante de releitura, por mais longa que tenha
+sido a transação (captura.inicio_seguro). SYNC_MARGEM_SEGUNDOS cobre só a
+diferença entre o atualizado_em preenchido pelo Python e o gatilho. O
+aparelho aplica os removidos e depois as alterações, por id.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from .captura import inicio_seguro, ultimo_id
+from .eventos import publicar_presenca
+from .models import Turma, Matricula, Presenca, RegistroExclusao
+from .serializers import PresencaOfflineSerializer
+
+SALT = 'app.sincronizacao'
+
+CAMPOS_TURMA = [
+    'id', 'nome', 'descricao', 'data_inicio', 'data_fim', 'status', 'representante_id', 'atualizado_em',
+]
+CAMPOS_MATRICULA = ['id', 'turma_id', 'aluno_id', 'presenca_acumulada', 'atualizado_em']
+CAMPOS_PRESENCA = ['id', 'matricula_id', 'data', 'status', 'observacao', 'atualizado_em']
+CHAVES_REMOVIDOS = {'turma': 'turmas', 'matricula': 'matriculas', 'presenca': 'presencas'}
+
+
+class CursorInvalido(Exception):
+    pass
+
+
+# ========== CURSOR ==========
+
+def gerar_cursor(professor_id, marca, apos):
+    return signing.dumps({'p': professor_id, 'm': marca.isoformat(), 'u': apos}, salt=SALT)
+
+
+def ler_cursor(professor_id, cursor):
+    """Instante de referência do cursor; None quando é preciso sincronizar tudo"""
+    if not cursor:
+        return None
+    try:
+        dados = signing.loads(cursor, salt=SALT)
+    except signing.BadSignature:
+        raise CursorInvalido('Cursor inválido.')
+    if dados.get('p') != professor_id:
+        raise CursorInvalido('Cursor emitido para outro professor.')
+
+    marca = datetime.fromisoformat(dados['m'])
+    if marca < timezone.now() - timedelta(days=settings.SYNC_RETENCAO_DIAS):
+        return None  # as marcas de exclusão desse período já podem ter sido compactadas
+    if dados.get('u') is None:
+        return None  # cursor anterior ao id da outbox
+    return inicio_seguro(dados['u'], marca, [Turma, Matricula, Presenca])
+
+
+# ========== LEITURA DAS ALTERAÇÕES ==========
+
+def compactar_exclusoes():
+    """Remove marcas de exclusão mais antigas que a retenção (no máximo uma vez por hora)"""
+    if cache.add('sincronizacao:compactacao', True, 3600):
+        limite = timezone.now() - timedelta(days=settings.SYNC_RETENCAO_DIAS)
+        RegistroExclusao.objects.filter(excluido_em__lt=limite).delete()
+
+
+def alteracoes(professor_id, marca):
+    """Turmas, matrículas e presenças do professor alteradas desde `marca` (None = tudo)"""
+    agora, apos = timezone.now(), ultimo_id()
+    turma_ids = list(Turma.objects.filter(professor_id=professor_id).values_list('id', flat=True))
+
+    turmas = Turma.objects.filter(id__in=turma_ids)
+    matriculas = Matricula.objects.filter(turma_id__in=turma_ids)
+    presencas = Presenca.objects.filter(matricula__turma_id__in=turma_ids)
+    removidos = {chave: [] for chave in CHAVES_REMOVIDOS.values()}
+
+    if marca is not None:
+        desde = marca - timedelta(seconds=settings.SYNC_MARGEM_SEGUNDOS)
+        turmas = turmas.filter(atualizado_em__gt=desde)
+        matriculas = matriculas.filter(atualizado_em__gt=desde)
+        presencas = presencas.filter(atualizado_em__gt=desde)
+
+        registros = RegistroExclusao.objects.filter(excluido_em__gt=desde).filter(
+            Q(modelo='turma', pai_id=professor_id)
+            | Q(modelo='matricula', pai_id__in=turma_ids)
+            | Q(modelo='presenca', pai_id__in=Matricula.objects.filter(turma_id__in=turma_ids).values('id'))
+        )
+        for modelo, objeto_id in registros.values_list('modelo', 'objeto_id'):
+            removidos[CHAVES_REMOVIDOS[modelo]].append(objeto_id)
+
+    return {
+        'cursor': gerar_cursor(professor_id, agora, apos),
+        'completo': marca is None,
+        'turmas': list(turmas.order_by().values(*CAMPOS_TURMA)),
+        'matriculas': list(matriculas.order_by().values(
+            *CAMPOS_MATRICULA, aluno_nome=F('aluno__nome'), aluno_matricula=F('aluno__matricula')
+        )),
+        'presencas': list(presencas.order_by().values(*CAMPOS_PRESENCA)),
+        'removidos': removidos,
+    }
+
+
+# ========== ENVIO DA CHAMADA OFFLINE ==========
+
+def _versao_servidor(presenca):
+    return {
+        'id': presenca.id, 'status': presenca.status,
+        'observacao': presenca.observacao, 'atualizado_em': presenca.atualizado_em,
+    }
+
+
+def aplicar_presencas(professor_id, itens, marca):
+    """
+    Aplica as presenças enviadas (em bulk, uma transação) e retorna o
+    resultado de cada item na ordem recebida: aplicado, conflito,
+    substituido (outro item do lote para a mesma aula) ou rejeitado
+    """
+    resultados = [None] * len(itens)
+    validador = PresencaOfflineSerializer()
+    validos = []
+    for indice, item in enumerate(itens):
+        try:
+            validos.append((indice, validador.run_validation(item)))
+        except serializers.ValidationError as e:
+            resultados[indice] = {'indice': indice, 'resultado': 'rejeitado', 'erros': e.detail}
+
+    permitidas = set(Matricula.objects.filter(
+        id__in={dados['matricula'] for _, dados in validos}, turma__professor_id=professor_id
+    ).values_list('id', flat=True))
+
+    por_chave = {}
+    for indice, dados in validos:
+        if dados['matricula'] not in permitidas:
+            resultados[indice] = {
+                'indice': indice, 'resultado': 'rejeitado',
+                'erros': {'matricula': ['Matrícula não pertence às suas turmas.']}
+            }
+            continue
+        chave = (dados['matricula'], dados['data'])
+        if chave in por_chave:
+            anterior = por_chave[chave][0]
+            resultados[anterior] = {'indice': anterior, 'resultado': 'substituido'}
+        por_chave[chave] = (indice, dados)
+
+    if not por_chave:
+        return resultados
+
+    existentes = {
+        (p.matricula_id, p.data): p
+        for p in Presenca.objects.filter(
+            matricula_id__in={m for m, _ in por_chave}, data__in={d for _, d in por_chave}
+        )
+    }
+
+    agora = timezone.now()
+    novas, alteradas, destinos = [], [], []
+    for chave, (indice, dados) in por_chave.items():
+        presenca = existentes.get(chave)
+        if presenca is None:
+            presenca = Presenca(
+                matricula_id=dados['matricula'], data=dados['data'],
+                status=dados['status'], observacao=dados['observacao']
+            )
+            novas.append(presenca)
+        elif (presenca.status, presenca.observacao) != (dados['status'], dados['observacao']):
+            alterada_depois = marca is None or presenca.atualizado_em > marca
+            if alterada_depois and not dados['forcar']:
+                resultados[indice] = {
+                    'indice': indice, 'resultado': 'conflito', 'servidor': _versao_servidor(presenca)
+                }
+                continue
+            presenca.status = dados['status']
+            presenca.observacao = dados['observacao']
+            presenca.atualizado_em = agora  # bulk_update não preenche auto_now
+            alteradas.append(presenca)
+        destinos.append((indice, presenca))
+
+    Presenca.objects.bulk_create(novas, batch_size=500)
+    Presenca.objects.bulk_update(alteradas, ['status', 'observacao', 'atualizado_em'], batch_size=500)
+    for indice, presenca in destinos:
+        resultados[indice] = {'indice': indice, 'resultado': 'aplicado', 'id': presenca.id}
+
+    gravadas = novas + alteradas
+    if gravadas:
+        matricula_ids = {p.matricula_id for p in gravadas}
+        Matricula.objects.filter(id__in=matricula_ids).recalcular_presenca()
+        matriculas = Matricula.objects.in_bulk(matricula_ids)
+        transaction.on_commit(lambda: [publicar_presenca(p, matriculas[p.matricula_id]) for p in gravadas])
+    return resultados
@@ -1,3 +1,1135 @@
-from django.test import TestCase
+import asyncio
+import glob
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing
+from io import StringIO
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User, Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from . import (
+    banco_analitico, captura, checkin, consultas_lentas, dados_sinteticos, fila_presencas, metricas, perfilamento,
+    roteador, signals, sincronizacao,
+)
+from .analytics import expressao_idade, filtro_idade
+from .authentication import JWTStatelessAuthentication, emitir_tokens, revogar_tokens_usuario
+from .eventos import BrokerArquivo
+from .models import (
+    Professor, Aluno, Turma, Matricula, Presenca, FilaPresenca, PerfilRequisicao, RegistroMudanca,
+    ConsumidorMudancas,
+)
+from .transacoes import erro_de_bloqueio
+from .views_async import LeituraAsyncView
+from .views_exportacao import ler_mes
+
+logger = logging.getLogger(__name__)
+
+LOGGERS_JSON = ('app.instrumentacao', 'app.consultas_lentas')
+_handlers_json = {}
+
+
+def setUpModule():
+    # As linhas JSON não poluem a saída dos testes (assertLogs instala o próprio handler)
+    for nome in LOGGERS_JSON:
+        registro = logging.getLogger(nome)
+        _handlers_json[nome] = registro.handlers
+        registro.handlers = [logging.NullHandler()]
+
+
+def tearDownModule():
+    for nome, handlers in _handlers_json.items():
+        logging.getLogger(nome).handlers = handlers
+
+
+def criar_professor(nome='Professor Teste', **campos):
+    campos.setdefault('email', f"{nome.lower().replace(' ', '.')}@teste.com")
+    campos.setdefault('departamento', 'TI')
+    return Professor.objects.create(nome=nome, **campos)
+
+
+def criar_turma(professor, nome='Turma Teste', **campos):
+    campos.setdefault('data_inicio', date(2025, 2, 1))
+    campos.setdefault('data_fim', date(2025, 12, 15))
+    return Turma.objects.create(nome=nome, professor=professor, **campos)
+
+
+def criar_aluno(indice, **campos):
+    campos.setdefault('data_nascimento', date(2000, 1, 1))
+    campos.setdefault('curso', 'TI')
+    campos.setdefault('genero', 'N')
+    return Aluno.objects.create(
+        nome=f'Aluno {indice}', matricula=f'2025{indice:04d}', email=f'aluno{indice}@teste.com', **campos
+    )
+
+
+class PresencaConcorrenciaTest(TransactionTestCase):
+    """Várias threads registrando presenças ao mesmo tempo (início das aulas)"""
+    THREADS = 16
+    REGISTROS_POR_THREAD = 10
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@teste.com', 'admin123')
+        professor = Professor.objects.create(
+            nome='Professor Teste', email='professor@teste.com', departamento='TI'
+        )
+        turma = Turma.objects.create(
+            nome='Turma Teste', professor=professor,
+            data_inicio=date(2025, 2, 1), data_fim=date(2025, 12, 15)
+        )
+        self.matriculas = []
+        for i in range(self.THREADS):
+            aluno = Aluno.objects.create(
+                nome=f'Aluno {i}', matricula=f'2025{i:04d}', email=f'aluno{i}@teste.com',
+                curso='TI', data_nascimento=date(2000, 1, 1), genero='N'
+            )
+            self.matriculas.append(Matricula.objects.create(aluno=aluno, turma=turma))
+
+    def _registrar(self, matricula, resultados):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        try:
+            for dia in range(self.REGISTROS_POR_THREAD):
+                try:
+                    resposta = client.post('/api/presencas/', {
+                        'matricula': matricula.id,
+                        'data': (date(2025, 3, 1) + timedelta(days=dia)).isoformat(),
+                        'status': 'Presente' if dia % 4 else 'Ausente',
+                    })
+                    resultados.append(resposta.status_code)
+                except OperationalError as erro:
+                    resultados.append('bloqueio' if erro_de_bloqueio(erro) else 'erro')
+        finally:
+            connection.close()
+
+    def test_escritas_concorrentes_sem_bloqueio(self):
+        resultados = []
+        threads = [
+            threading.Thread(target=self._registrar, args=(matricula, resultados))
+            for matricula in self.matriculas
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+
+        total = self.THREADS * self.REGISTROS_POR_THREAD
+        bloqueios = resultados.count('bloqueio')
+        # Vazão só como informação (depende da máquina); o teste verifica a ausência de bloqueios
+        logger.info(
+            '%s escritas concorrentes em %.2fs (%.1f req/s), %s erros de bloqueio',
+            total, duracao, total / duracao, bloqueios
+        )
+
+        self.assertEqual(bloqueios, 0)
+        self.assertEqual(resultados.count(201), total)
+        self.assertEqual(Presenca.objects.count(), total)
+        matricula = Matricula.objects.get(pk=self.matriculas[0].pk)
+        self.assertEqual(float(matricula.presenca_acumulada), 70.0)
+
+
+class SincronizacaoGruposTest(TestCase):
+    """Editar um aluno não deve disparar a cascata de consultas de grupos"""
+
+    def setUp(self):
+        # Ids em cache podem ser de grupos criados (e desfeitos) por outro teste
+        signals._ids_grupos.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.aluno = Aluno.objects.create(
+                nome='Ana Souza', matricula='20250001', email='ana@teste.com',
+                curso='TI', data_nascimento=date(2000, 1, 1), genero='F'
+            )
+        self.aluno = Aluno.objects.get(pk=self.aluno.pk)
+
+    def test_atualizacao_de_aluno(self):
+        # UPDATE do aluno + (após o commit) SAVEPOINT, leitura dos grupos,
+        # UPDATE condicional do email e RELEASE; nenhuma escrita em grupos
+        with self.assertNumQueries(5):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.aluno.curso = 'ADS'
+                self.aluno.save()
+
+        grupos = list(User.objects.get(pk=self.aluno.usuario_id).groups.values_list('name', flat=True))
+        self.assertEqual(grupos, ['Aluno'])
+
+    def test_troca_de_papel_e_email(self):
+        usuario = self.aluno.usuario
+        usuario.groups.add(Group.objects.get_or_create(name='Professor')[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.aluno.email = 'ana.souza@teste.com'
+            self.aluno.save()
+
+        usuario.refresh_from_db()
+        self.assertEqual(usuario.email, 'ana.souza@teste.com')
+        self.assertEqual(list(usuario.groups.values_list('name', flat=True)), ['Aluno'])
+
+    def test_falha_apos_commit_so_registra_log(self):
+        with mock.patch('app.signals._aplicar_grupos', side_effect=RuntimeError('falha')):
+            with self.assertLogs('app.signals', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.aluno.email = 'outro@teste.com'
+                    self.aluno.save()
+        self.assertEqual(Aluno.objects.get(pk=self.aluno.pk).email, 'outro@teste.com')
+
+    def test_cache_de_grupos_so_apos_commit(self):
+        signals._ids_grupos.clear()
+        with self.captureOnCommitCallbacks() as callbacks:
+            ids = signals.ids_grupos()
+        self.assertEqual(signals._ids_grupos, {})  # um rollback aqui não deixa ids inválidos no cache
+        for callback in callbacks:
+            callback()
+        self.assertEqual(signals._ids_grupos, ids)
+
+
+class CargaDocenteTest(TestCase):
+    """Carga docente agregada por subconsultas e lista pública sem agregações"""
+
+    def setUp(self):
+        self.professor = criar_professor('Marta Lima')
+        criar_professor('Sem Turmas')
+        turma_a = criar_turma(self.professor, 'Turma A')
+        turma_b = criar_turma(self.professor, 'Turma B', status='Concluída')
+        for indice, turma in enumerate([turma_a, turma_a, turma_b]):
+            matricula = Matricula.objects.create(aluno=criar_aluno(indice), turma=turma)
+            for dia in (3, 4):
+                Presenca.objects.create(matricula=matricula, data=date(2025, 3, dia), status='Presente')
+
+    def test_totais_por_professor(self):
+        with self.assertNumQueries(1):
+            professores = {p.nome: p for p in Professor.objects.com_carga()}
+
+        marta = professores['Marta Lima']
+        self.assertEqual(marta.quantidade_turmas, 2)
+        self.assertEqual(marta.total_alunos, 3)
+        # 2 datas na turma A (dois alunos na mesma data contam uma aula) + 2 na turma B
+        self.assertEqual(marta.total_aulas, 4)
+        self.assertEqual((marta.turmas_ativa, marta.turmas_concluida, marta.turmas_cancelada), (1, 1, 0))
+
+        vazio = professores['Sem Turmas']
+        self.assertEqual((vazio.quantidade_turmas, vazio.total_alunos, vazio.total_aulas), (0, 0, 0))
+
+    def test_lista_publica_sem_carga(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = APIClient().get('/api/professores-publicos/')
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual({'id', 'nome', 'departamento', 'ativo'}, set(resposta.json()[0]))
+        self.assertFalse(any('app_presenca' in consulta['sql'] for consulta in consultas.captured_queries))
+
+
+class PerfilSobDemandaTest(TestCase):
+    """O cProfile só liga com o segredo PERFIL_TOKEN; o perfil só é gravado para staff"""
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.comum = User.objects.create_user('comum', password='x')
+
+    def _get(self, usuario, **cabecalhos):
+        client = APIClient()
+        client.force_authenticate(usuario)
+        return client.get('/api/turmas/', **cabecalhos)
+
+    def test_sem_segredo_nao_perfila(self):
+        with override_settings(PERFIL_TOKEN='segredo', PERFIL_DIRETORIO=self.diretorio.name):
+            request = RequestFactory().get('/api/turmas/', HTTP_X_PERFIL='1')
+            self.assertIsNone(perfilamento.solicitado(request))
+            resposta = self._get(self.staff, HTTP_X_PERFIL='1')
+        self.assertNotIn('X-Perfil-Id', resposta)
+        with override_settings(PERFIL_TOKEN=''):
+            request = RequestFactory().get('/api/turmas/', HTTP_X_PERFIL='')
+            self.assertIsNone(perfilamento.solicitado(request))
+        self.assertFalse(PerfilRequisicao.objects.exists())
+
+    def test_staff_com_segredo(self):
+        with override_settings(PERFIL_TOKEN='segredo', PERFIL_DIRETORIO=self.diretorio.name):
+            resposta = self._get(self.staff, HTTP_X_PERFIL='segredo')
+        self.assertEqual(resposta.status_code, 200)
+        perfil = PerfilRequisicao.objects.get(pk=resposta['X-Perfil-Id'])
+        self.assertEqual(perfil.usuario, self.staff)
+        self.assertTrue(os.path.exists(perfil.arquivo))
+
+    def test_segredo_sem_staff_descarta(self):
+        with override_settings(PERFIL_TOKEN='segredo', PERFIL_DIRETORIO=self.diretorio.name):
+            resposta = self._get(self.comum, HTTP_X_PERFIL='segredo')
+        self.assertNotIn('X-Perfil-Id', resposta)
+        self.assertFalse(PerfilRequisicao.objects.exists())
+
+
+class DadosSinteticosTest(TestCase):
+    """Carga sintética: gatilhos de captura ativos e workers importáveis sem Django"""
+
+    PARAMETROS = {'alunos': 12, 'professores': 2, 'turmas': 3, 'turmas_por_aluno': 2, 'semanas': 2}
+
+    def test_carga_no_outbox_sem_buracos(self):
+        criar_professor()  # escrita da aplicação, capturada
+        apos = captura.ultimo_id()
+        marca = timezone.now()
+
+        contagens = dados_sinteticos.gerar(**self.PARAMETROS, semente=7, progresso=lambda mensagem: None)
+        dados_sinteticos.gerar(**self.PARAMETROS, semente=8, progresso=lambda mensagem: None)
+        professor = criar_professor('Depois da Carga')
+
+        self.assertEqual(contagens['presencas'], 12 * 2 * 2)
+        ids = list(RegistroMudanca.objects.filter(id__gt=apos).order_by('id').values_list('id', flat=True))
+        self.assertEqual(ids, list(range(apos + 1, apos + 1 + len(ids))))
+        self.assertEqual(
+            RegistroMudanca.objects.filter(id__gt=apos, tabela='app_presenca', operacao='criado').count(),
+            Presenca.objects.count(),
+        )
+        self.assertTrue(RegistroMudanca.objects.filter(tabela='app_professor', objeto_id=professor.id).exists())
+        # Um cursor tomado antes da carga não é confundido com compactação
+        self.assertIsNotNone(captura.inicio_seguro(apos, marca, [Presenca, Professor]))
+
+    def test_workers_sem_django(self):
+        codigo = 'import sys, app.geracao_presencas; sys.exit("django" in sys.modules)'
+        resultado = subprocess.run([sys.executable, '-c', codigo], cwd=settings.BASE_DIR)
+        self.assertEqual(resultado.returncode, 0)
+
+
+class RosterTest(TestCase):
+    """Importação em massa, ativação no primeiro acesso e login sem enumeração de usuários"""
+
+    def setUp(self):
+        signals._ids_grupos.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+
+    def _importar(self):
+        return self.client.post('/api/roster/importar/', {
+            'tipo': 'aluno',
+            'linhas': [
+                {'nome': 'Bia Rocha', 'matricula': '20259001', 'email': 'bia@teste.com', 'curso': 'TI',
+                 'data_nascimento': '2001-05-10', 'genero': 'F'},
+                {'nome': 'Sem Email', 'matricula': '20259002', 'curso': 'TI'},
+            ],
+        }, format='json')
+
+    def test_importacao_e_ativacao(self):
+        resposta = self._importar()
+        self.assertEqual(resposta.status_code, 201)
+        relatorio = resposta.json()
+        self.assertEqual((relatorio['criados'], relatorio['ignoradas']), (1, 1))
+        self.assertEqual(relatorio['erros'][0]['linha'], 2)
+        criado = relatorio['usuarios'][0]
+        usuario = User.objects.get(pk=criado['usuario_id'])
+        self.assertFalse(usuario.has_usable_password())
+        self.assertEqual(list(usuario.groups.values_list('name', flat=True)), ['Aluno'])
+
+        anonimo = APIClient()
+        resposta = anonimo.post('/api/auth/ativar-conta/', {
+            'uid': criado['uid'], 'token': criado['token_ativacao'],
+            'new_password': 'nova123', 'confirm_password': 'nova123',
+        }, format='json')
+        self.assertEqual(resposta.status_code, 200)
+        resposta = anonimo.post('/api/auth/login/', {'username': criado['username'], 'password': 'nova123'})
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_login_nao_revela_conta_importada(self):
+        username = self._importar().json()['usuarios'][0]['username']
+        anonimo = APIClient()
+        importada = anonimo.post('/api/auth/login/', {'username': username, 'password': 'qualquer'})
+        inexistente = anonimo.post('/api/auth/login/', {'username': 'ninguem', 'password': 'qualquer'})
+        self.assertEqual(importada.status_code, 400)
+        self.assertEqual(importada.json(), inexistente.json())
+
+
+class CacheTokenTest(TestCase):
+    """Token em cache deixa de valer assim que o logout é confirmado"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('rita', 'rita@teste.com', 'senha123')
+        self.token = Token.objects.create(user=self.usuario)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_logout_invalida_token_em_cache(self):
+        self.assertEqual(self.client.get('/api/turmas/').status_code, 200)
+        self.assertEqual(self.client.get('/api/turmas/').status_code, 200)  # já do cache
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+
+        self.assertEqual(self.client.get('/api/turmas/').status_code, 401)
+
+    def test_invalidacao_so_apos_commit(self):
+        self.client.get('/api/turmas/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.usuario.is_active = False
+            self.usuario.save()
+        # Transação ainda aberta: o cache continua com o estado confirmado
+        self.assertEqual(self.client.get('/api/turmas/').status_code, 200)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get('/api/turmas/').status_code, 401)
+
+
+class RevogacaoJWTTest(TestCase):
+    """Tokens assinados: revogação por mudança de permissões/papel, rotação do refresh e corte por emissão"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('joao', 'joao@teste.com', 'senha123')
+
+    def _autenticar(self, access):
+        request = RequestFactory().get('/api/turmas/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return JWTStatelessAuthentication().authenticate(request)
+
+    def _revogado(self, access):
+        with self.assertRaises(AuthenticationFailed):
+            self._autenticar(access)
+
+    def test_mudanca_de_staff_revoga(self):
+        access = emitir_tokens(self.usuario)['access']
+        self.assertEqual(self._autenticar(access)[0].id, self.usuario.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.first_name = 'João'
+            self.usuario.save()
+        self._autenticar(access)  # nada que o token carregue mudou
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.is_staff = True
+            self.usuario.save()
+        self._revogado(access)
+        self.assertEqual(self._autenticar(emitir_tokens(self.usuario)['access'])[0].papel, 'staff')
+
+    def test_save_sem_select_extra(self):
+        access = emitir_tokens(self.usuario)['access']
+        usuario = User.objects.get(pk=self.usuario.pk)
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            usuario.first_name = 'João'
+            usuario.save()
+        self.assertFalse([c for c in consultas if c['sql'].startswith('SELECT') and 'auth_user' in c['sql']])
+        self._autenticar(access)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.set_password('outra123')
+            usuario.save()
+        self._revogado(access)
+
+    def test_mudanca_de_grupo_revoga(self):
+        access = emitir_tokens(self.usuario)['access']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.groups.add(Group.objects.get_or_create(name='Professor')[0])
+        self._revogado(access)
+
+    def test_corte_pela_emissao(self):
+        anterior = emitir_tokens(self.usuario)['access']
+        revogar_tokens_usuario(self.usuario.id)
+        posterior = emitir_tokens(self.usuario)['access']  # mesmo segundo do corte
+        self._revogado(anterior)
+        self._autenticar(posterior)
+
+    def test_rotacao_do_refresh(self):
+        client = APIClient()
+        refresh = emitir_tokens(self.usuario)['refresh']
+
+        resposta = client.post('/api/auth/token/refresh/', {'refresh': refresh})
+        self.assertEqual(resposta.status_code, 200)
+        self._autenticar(resposta.json()['access'])
+
+        # O refresh já usado foi revogado; o novo continua valendo
+        self.assertEqual(client.post('/api/auth/token/refresh/', {'refresh': refresh}).status_code, 401)
+        novo = client.post('/api/auth/token/refresh/', {'refresh': resposta.json()['refresh']})
+        self.assertEqual(novo.status_code, 200)
+
+
+class InstrumentacaoTest(TestCase):
+    """Medição por requisição: amostragem, Server-Timing e linha JSON no log"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=1)
+    def test_requisicao_amostrada(self):
+        with self.assertLogs('app.instrumentacao', 'INFO') as logs:
+            resposta = self.client.get('/api/turmas/')
+        self.assertIn('db;dur=', resposta['Server-Timing'])
+        linha = json.loads(logs.records[0].getMessage())
+        self.assertEqual((linha['view'], linha['status']), ('TurmaViewSet.list', 200))
+        self.assertGreaterEqual(linha['consultas'], 1)
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=1)
+    def test_serializacao_medida_pelo_mixin(self):
+        criar_turma(criar_professor())
+        with self.assertLogs('app.instrumentacao', 'INFO') as logs:
+            self.client.get('/api/turmas/')
+        self.assertGreater(json.loads(logs.records[0].getMessage())['serializacao_ms'], 0)
+        # Nada de DRF ou do Django é substituído em tempo de execução
+        from rest_framework.serializers import BaseSerializer
+        from django.db.models.signals import post_save
+        self.assertEqual(BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+        self.assertNotIn('send', vars(post_save))
+
+    @override_settings(METRICAS_DIRETORIO_MULTIPROCESSO='')
+    def test_tempo_por_receptor(self):
+        criar_turma(criar_professor())
+        texto = metricas.texto_prometheus()
+        self.assertIn('receptor="', texto)
+        self.assertIn('modelo="Turma"', texto)
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=0)
+    def test_sem_amostragem(self):
+        with self.assertNoLogs('app.instrumentacao', 'INFO'):
+            resposta = self.client.get('/api/turmas/')
+        self.assertNotIn('Server-Timing', resposta)
+
+
+@override_settings(CONSULTA_LENTA_MS=1e-9, METRICAS_DIRETORIO_MULTIPROCESSO='')
+class ConsultasLentasTest(TestCase):
+    """Registro de consultas lentas por impressão digital, sem comandos de transação"""
+
+    def setUp(self):
+        consultas_lentas._agregado.clear()
+        self.addCleanup(consultas_lentas._agregado.clear)
+
+    def test_impressao_digital_normaliza_valores(self):
+        a = consultas_lentas.impressao_digital("SELECT * FROM t WHERE id IN (1, 2, 3) AND nome = 'Ana'")
+        b = consultas_lentas.impressao_digital("SELECT * FROM t WHERE id IN (7) AND nome = 'Bia'")
+        self.assertEqual(a, b)
+
+    def test_ignora_controle_de_transacao(self):
+        with self.assertLogs('app.consultas_lentas', 'WARNING') as logs:
+            with transaction.atomic():  # SAVEPOINT / RELEASE dentro do TestCase
+                list(Turma.objects.filter(nome__in=['A', 'B']))
+
+        comandos = [item['sql'].split()[0] for item in consultas_lentas._agregado.values()]
+        self.assertEqual(comandos, ['SELECT'])
+        linha = json.loads(logs.records[0].getMessage())
+        self.assertTrue(linha['plano'])
+        self.assertNotIn("'A'", linha['sql'])
+
+    def test_relatorio_so_para_staff(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('comum', password='x'))
+        self.assertEqual(client.get('/api/consultas-lentas/').status_code, 403)
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+        resposta = client.get('/api/consultas-lentas/?ordenar=max')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('consultas', resposta.json())
+        self.assertEqual(client.get('/api/consultas-lentas/?ordenar=x').status_code, 400)
+
+
+class EquidadeIdadeTest(TestCase):
+    """Relatório de equidade, filtros de idade e validação de parâmetros"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+        turma = criar_turma(criar_professor())
+        for indice, status_presenca in enumerate(['Presente', 'Ausente']):
+            matricula = Matricula.objects.create(aluno=criar_aluno(indice, genero='F'), turma=turma)
+            Presenca.objects.create(matricula=matricula, data=date(2025, 3, 3), status=status_presenca)
+        self.turma = turma
+
+    def test_relatorio_por_genero(self):
+        resposta = self.client.get('/api/relatorios/equidade/', {'agrupar_por': 'genero', 'turma': self.turma.id})
+        self.assertEqual(resposta.status_code, 200)
+        [grupo] = resposta.json()['grupos']
+        self.assertEqual((grupo['genero'], grupo['total_registros'], grupo['taxa_presenca']), ('F', 2, 50.0))
+
+    def test_parametros_invalidos_sao_400(self):
+        for params in ({'turma': 'abc'}, {'data_inicio': '2025-02-30'}, {'data_fim': '03/03/2025'},
+                       {'agrupar_por': 'signo'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/relatorios/equidade/', params).status_code, 400)
+        self.assertEqual(self.client.get('/api/relatorios/equidade/', {'data_inicio': '2024-02-29'}).status_code, 200)
+
+    def test_limites_de_idade(self):
+        for valor in ('-1', '151', '1e9'):
+            with self.subTest(idade_min=valor):
+                self.assertEqual(self.client.get('/api/alunos/', {'idade_min': valor}).status_code, 400)
+        self.assertEqual(self.client.get('/api/alunos/', {'idade_max': '150'}).status_code, 200)
+
+    def test_aniversario_em_29_de_fevereiro(self):
+        aluno = criar_aluno(9, data_nascimento=date(2000, 2, 29))
+        casos = [(date(2025, 2, 28), 24), (date(2025, 3, 1), 25), (date(2024, 2, 28), 23), (date(2024, 2, 29), 24)]
+        for hoje, idade in casos:
+            with self.subTest(hoje=hoje):
+                alunos = Aluno.objects.filter(pk=aluno.pk)
+                self.assertEqual(alunos.annotate(i=expressao_idade(hoje=hoje)).get().i, idade)
+                self.assertTrue(alunos.filter(filtro_idade(idade_min=idade, idade_max=idade, hoje=hoje)).exists())
+                self.assertFalse(alunos.filter(filtro_idade(idade_min=idade + 1, hoje=hoje)).exists())
+
+
+class ExportacaoMesTest(TestCase):
+    """Parâmetros de mês da exportação colunar"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+
+    def test_ler_mes(self):
+        self.assertEqual(ler_mes('2025-09'), date(2025, 9, 1))
+        for valor in ('2025-13', '2025-00', '2025-9', '2025-09-01', '2025-09\n', '', None, 202509):
+            with self.subTest(valor=valor):
+                self.assertIsNone(ler_mes(valor))
+
+    def test_mes_invalido_e_400(self):
+        resposta = self.client.get('/api/exportacao/fato_presenca/', {'formato': 'arrow', 'mes': '2025-13'})
+        self.assertEqual(resposta.status_code, 400)
+        resposta = self.client.post('/api/exportacao/', {'meses': ['2025-09', '2025-13']}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+        resposta = self.client.post('/api/exportacao/', {'meses': '2025-09'}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+
+
+class CapturaMudancasTest(TestCase):
+    """Outbox de captura de mudanças: gatilhos, leitura por cursor e confirmação dos consumidores"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+        RegistroMudanca.objects.all().delete()
+        self.professor = criar_professor()
+
+    def test_gatilhos_registram_escritas(self):
+        self.professor.departamento = 'Matemática'
+        self.professor.save()
+        Professor.objects.filter(pk=self.professor.pk).delete()
+        mudancas = list(RegistroMudanca.objects.filter(tabela='app_professor', objeto_id=self.professor.pk))
+        # O signal de Professor vincula o usuário criado (uma atualização a mais)
+        self.assertEqual(mudancas[0].operacao, 'criado')
+        self.assertEqual((mudancas[-2].operacao, mudancas[-2].dados['departamento']), ('atualizado', 'Matemática'))
+        self.assertEqual(mudancas[-1].operacao, 'excluido')
+
+    def test_limite_minimo_e_confirmacao_limitada(self):
+        criar_professor('Outro Professor')
+        resposta = self.client.get('/api/mudancas/', {'apos': 0, 'limite': 0})
+        self.assertEqual(len(resposta.json()['mudancas']), 1)
+        self.assertEqual(self.client.get('/api/mudancas/', {'limite': -5}).status_code, 200)
+
+        ultimo = RegistroMudanca.objects.order_by('-id').values_list('id', flat=True).first()
+        self.client.get('/api/mudancas/', {'apos': 10 ** 12, 'consumidor': 'bi'})
+        self.assertEqual(ConsumidorMudancas.objects.get(nome='bi').posicao, ultimo)
+
+        # Mudanças depois da confirmação continuam chegando ao consumidor
+        terceiro = criar_professor('Terceiro Professor')
+        mudancas = self.client.get('/api/mudancas/', {'consumidor': 'bi'}).json()['mudancas']
+        self.assertIn(('app_professor', terceiro.pk, 'criado'),
+                      [(m['tabela'], m['objeto_id'], m['operacao']) for m in mudancas])
+
+    def test_compactacao_respeita_o_consumidor_mais_atrasado(self):
+        criar_professor('Outro Professor')
+        ids = list(RegistroMudanca.objects.order_by('id').values_list('id', flat=True))
+        self.client.get('/api/mudancas/', {'apos': ids[0], 'consumidor': 'lento'})
+        self.client.get('/api/mudancas/', {'apos': ids[-1], 'consumidor': 'rapido'})
+        self.assertEqual(list(RegistroMudanca.objects.values_list('id', flat=True)), ids[1:])
+
+
+class SincronizacaoOfflineTest(TestCase):
+    """Cursor da sincronização offline e aplicação das presenças enviadas pelo aparelho"""
+    DIA = date(2025, 3, 10)
+
+    def setUp(self):
+        self.professor = criar_professor()
+        self.matricula = Matricula.objects.create(aluno=criar_aluno(1), turma=criar_turma(self.professor))
+        self.presenca = Presenca.objects.create(matricula=self.matricula, data=self.DIA, status='Presente')
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor.usuario)
+
+    def _cursor(self):
+        return self.client.get('/api/sync/').json()['cursor']
+
+    def _enviar(self, cursor, *itens):
+        resposta = self.client.post('/api/sync/', {'cursor': cursor, 'presencas': list(itens)}, format='json')
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def _item(self, status_presenca, **campos):
+        return {'matricula': self.matricula.pk, 'data': self.DIA.isoformat(), 'status': status_presenca, **campos}
+
+    def test_transacao_longa_nao_perde_alteracao(self):
+        cursor = self._cursor()
+        apos = RegistroMudanca.objects.order_by('-id').values_list('id', flat=True).first()
+        nova = Presenca.objects.create(matricula=self.matricula, data=self.DIA + timedelta(days=1), status='Ausente')
+        # Gravada num instante anterior ao cursor, mas só visível (commit) depois dele
+        antes = timezone.now() - timedelta(minutes=10)
+        Presenca.objects.filter(pk=nova.pk).update(atualizado_em=antes)
+        RegistroMudanca.objects.filter(id__gt=apos).update(registrado_em=antes)
+
+        resposta = self.client.get('/api/sync/', {'cursor': cursor}).json()
+        self.assertFalse(resposta['completo'])
+        self.assertIn(nova.pk, [p['id'] for p in resposta['presencas']])
+
+    def test_outbox_compactada_reenvia_tudo(self):
+        cursor = self._cursor()
+        apos = RegistroMudanca.objects.order_by('-id').values_list('id', flat=True).first()
+        Presenca.objects.create(matricula=self.matricula, data=self.DIA + timedelta(days=1), status='Ausente')
+        RegistroMudanca.objects.filter(id__gt=apos).delete()
+        ConsumidorMudancas.objects.create(nome='bi', posicao=apos + 1000)
+        self.assertTrue(self.client.get('/api/sync/', {'cursor': cursor}).json()['completo'])
+
+    def test_conflito_e_forcar(self):
+        cursor = self._cursor()
+        self.presenca.status = 'Ausente'
+        self.presenca.save()
+
+        resultado = self._enviar(cursor, self._item('Justificado'))['resultados'][0]
+        self.assertEqual(resultado['resultado'], 'conflito')
+        self.assertEqual(resultado['servidor']['status'], 'Ausente')
+
+        resultado = self._enviar(cursor, self._item('Justificado', forcar=True))['resultados'][0]
+        self.assertEqual(resultado, {'indice': 0, 'resultado': 'aplicado', 'id': self.presenca.pk})
+        self.presenca.refresh_from_db()
+        self.assertEqual(self.presenca.status, 'Justificado')
+
+    def test_item_repetido_substituido_e_rejeitados(self):
+        outra = Matricula.objects.create(aluno=criar_aluno(2), turma=criar_turma(criar_professor('Outro Professor')))
+        resultados = self._enviar(
+            self._cursor(),
+            self._item('Ausente'),
+            self._item('Justificado'),
+            {'matricula': outra.pk, 'data': self.DIA.isoformat(), 'status': 'Presente'},
+            self._item('Talvez'),
+        )['resultados']
+        self.assertEqual([r['resultado'] for r in resultados], ['substituido', 'aplicado', 'rejeitado', 'rejeitado'])
+        self.assertIn('matricula', resultados[2]['erros'])
+        self.assertIn('status', resultados[3]['erros'])
+        self.presenca.refresh_from_db()
+        self.assertEqual(self.presenca.status, 'Justificado')
+        self.assertFalse(Presenca.objects.filter(matricula=outra).exists())
+
+    def test_cursor_expirado_sincroniza_tudo(self):
+        expirado = sincronizacao.gerar_cursor(
+            self.professor.pk, timezone.now() - timedelta(days=settings.SYNC_RETENCAO_DIAS + 1), 0
+        )
+        resposta = self._enviar(expirado, self._item('Ausente'))
+        self.assertTrue(resposta['completo'])
+        self.assertEqual(resposta['resultados'][0]['resultado'], 'conflito')
+        self.assertIn(self.presenca.pk, [p['id'] for p in resposta['presencas']])
+
+    def test_cursor_de_outro_professor(self):
+        outro = sincronizacao.gerar_cursor(self.professor.pk + 1000, timezone.now(), 0)
+        self.assertEqual(self.client.get('/api/sync/', {'cursor': outro}).status_code, 400)
+
+
+class BancoAnaliticoTest(TestCase):
+    """Atualização incremental do banco analítico"""
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.arquivo = os.path.join(diretorio.name, 'analitico.sqlite3')
+        self.matricula = Matricula.objects.create(aluno=criar_aluno(1), turma=criar_turma(criar_professor()))
+
+    def _presencas(self):
+        with closing(banco_analitico.conectar(self.arquivo)) as conexao:
+            return dict(conexao.execute('SELECT presenca_id, status FROM presenca').fetchall())
+
+    def test_transacao_longa_entra_na_atualizacao_seguinte(self):
+        self.assertTrue(banco_analitico.atualizar(self.arquivo)['completo'])
+        apos = RegistroMudanca.objects.order_by('-id').values_list('id', flat=True).first()
+        presenca = Presenca.objects.create(matricula=self.matricula, data=date(2025, 3, 10), status='Ausente')
+        antes = timezone.now() - timedelta(minutes=10)
+        Presenca.objects.filter(pk=presenca.pk).update(atualizado_em=antes)
+        RegistroMudanca.objects.filter(id__gt=apos).update(registrado_em=antes)
+
+        relatorio = banco_analitico.atualizar(self.arquivo)
+        self.assertFalse(relatorio['completo'])
+        self.assertEqual(self._presencas(), {presenca.pk: 'Ausente'})
+
+
+class LeituraAsyncTest(TestCase):
+    """Leituras assíncronas com as mesmas regras das views síncronas"""
+
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@teste.com', 'admin123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin).key}')
+        self.turma = criar_turma(criar_professor())
+        for indice, status_presenca in enumerate(['Presente', 'Ausente', 'Ausente']):
+            matricula = Matricula.objects.create(aluno=criar_aluno(indice), turma=self.turma)
+            Presenca.objects.create(matricula=matricula, data=date(2025, 3, 10), status=status_presenca)
+
+    def test_responder_e_obrigatorio(self):
+        class Incompleta(LeituraAsyncView):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incompleta()
+
+    def test_presencas_usam_os_filtros_da_view_sincrona(self):
+        for params in ({'status': 'Ausente'}, {'matricula__turma': self.turma.pk, 'search': 'Aluno 1'}):
+            sincrona = self.client.get('/api/presencas/', params).json()
+            assincrona = self.client.get('/api/async/presencas/', params).json()
+            self.assertEqual([p['id'] for p in assincrona], [p['id'] for p in sincrona])
+        self.assertEqual(len(sincrona), 1)
+
+        for params in ({'matricula__turma': 999999}, {'data': '2025-13-01'}):
+            sincrona = self.client.get('/api/presencas/', params)
+            assincrona = self.client.get('/api/async/presencas/', params)
+            self.assertEqual((assincrona.status_code, assincrona.json()), (400, sincrona.json()))
+
+
+@override_settings(PRESENCA_ESCRITA_ADIADA=True)
+class FilaPresencasTest(TestCase):
+    """Escrita adiada de presenças: cabeçalho de consistência e limpeza da fila"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+        self.matricula = Matricula.objects.create(aluno=criar_aluno(1), turma=criar_turma(criar_professor()))
+
+    def test_cabecalho_em_cache_invalidado_pelo_lote(self):
+        resposta = self.client.post(
+            '/api/presencas/', {'matricula': self.matricula.pk, 'data': '2025-03-10', 'status': 'Presente'}
+        )
+        self.assertEqual(resposta.status_code, 202)
+        ticket = resposta.json()['ticket']
+        self.assertLess(int(self.client.get('/api/presencas/')['X-Fila-Presencas-Processada']), ticket)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fila_presencas.processar_lote()
+        self.assertEqual(int(self.client.get('/api/presencas/')['X-Fila-Presencas-Processada']), ticket)
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/api/presencas/')
+        self.assertFalse([c for c in consultas.captured_queries if 'app_filapresenca' in c['sql']])
+
+    def test_limpar_apaga_processados_antigos(self):
+        antigo = timezone.now() - timedelta(hours=settings.FILA_PRESENCAS_RETENCAO_HORAS + 1)
+        itens = [
+            FilaPresenca.objects.create(operacao='criar', dados={}, estado=estado, processado_em=processado_em)
+            for estado, processado_em in [
+                ('gravado', antigo), ('rejeitado', antigo), ('gravado', timezone.now()), ('pendente', None),
+                ('gravado', antigo),
+            ]
+        ]
+        self.assertEqual(fila_presencas.limpar(), 2)
+        self.assertEqual(list(FilaPresenca.objects.values_list('id', flat=True)), [i.id for i in itens[2:]])
+        self.assertEqual(fila_presencas.limpar(), 0)  # no máximo uma vez por hora
+
+
+class CheckinTest(TestCase):
+    """Check-in pelo código da aula: a resposta distingue aceito em memória de gravado"""
+
+    def setUp(self):
+        turma = criar_turma(criar_professor())
+        aluno = criar_aluno(1)
+        aluno.refresh_from_db()
+        self.matricula = Matricula.objects.create(aluno=aluno, turma=turma)
+        self.codigo, self.data = checkin.gerar_codigo(turma.id)
+        self.coletor = checkin.ColetorCheckin(intervalo=3600)
+        patcher = mock.patch.object(checkin, '_coletor', self.coletor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(aluno.usuario)
+
+    def _checkin(self):
+        resposta = self.client.post('/api/checkin/', {'codigo': self.codigo})
+        self.assertEqual(resposta.status_code, 202)
+        return resposta.json()['status']
+
+    def test_status_reflete_a_gravacao(self):
+        self.assertEqual(self._checkin(), 'recebido')
+        self.assertEqual(self._checkin(), 'ja_recebido')
+        self.assertFalse(Presenca.objects.filter(matricula=self.matricula).exists())
+
+        self.assertEqual(self.coletor.descarregar(), 1)
+        self.assertEqual(self._checkin(), 'ja_registrado')
+        self.assertEqual(Presenca.objects.get(matricula=self.matricula).data, self.data)
+
+
+class BrokerArquivoTest(TestCase):
+    """Feed entre processos: segmentos do arquivo de eventos rotacionados por tamanho"""
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.caminho = os.path.join(diretorio.name, 'eventos.ndjson')
+
+    async def test_rotacao_limita_o_disco_sem_perder_eventos(self):
+        broker = BrokerArquivo(self.caminho, intervalo=0.01, tamanho_maximo=100, espera_rotacao=0.05)
+        assinatura = broker.assinar('turma:1')
+        await asyncio.sleep(0.05)
+
+        recebidos = []
+        for indice in range(12):
+            broker.publicar('turma:1', {'indice': indice})
+            recebidos.append((await assinatura.proximo(timeout=2))['indice'])
+        assinatura.cancelar()
+
+        self.assertEqual(recebidos, list(range(12)))
+        self.assertGreater(broker._escrita, 2)
+        self.assertLessEqual(len(glob.glob(f'{self.caminho}.*')), 2)
+
+
+class RoteamentoReplicaTest(TestCase):
+    """Leituras elegíveis vão para a réplica; depois de escrever, o cliente lê do primário"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@teste.com', 'admin123')
+        self.matricula = Matricula.objects.create(aluno=criar_aluno(1), turma=criar_turma(criar_professor()))
+
+    @mock.patch.object(roteador, 'alias_leitura', return_value='replica')
+    def test_requisicao_le_da_replica_ate_escrever(self, _alias):
+        rotas = roteador.RoteadorLeituraEscrita()
+        self.assertEqual(rotas.db_for_read(Aluno), 'default')  # fora de uma requisição
+
+        token = roteador.iniciar_requisicao()
+        try:
+            self.assertEqual(rotas.db_for_read(Aluno), 'default')  # a view não pediu a réplica
+            roteador.usar_replica()
+            self.assertEqual(rotas.db_for_read(Aluno), 'replica')
+            self.assertEqual(rotas.db_for_write(Aluno), 'default')
+            self.assertEqual(rotas.db_for_read(Aluno), 'default')
+        finally:
+            self.assertTrue(roteador.finalizar_requisicao(token)['escreveu'])
+
+    def test_escrita_fixa_o_cliente_no_primario(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with mock.patch.object(roteador, 'usar_replica') as usar_replica:
+            client.get('/api/presencas/')
+        usar_replica.assert_called_once()
+
+        resposta = client.post(
+            '/api/presencas/', {'matricula': self.matricula.pk, 'data': '2025-03-10', 'status': 'Presente'}
+        )
+        self.assertEqual(resposta.status_code, 201)
+        self.assertIn(roteador.COOKIE_PRIMARIO, resposta.cookies)
+
+        # Mesmo sem o cookie (outro aparelho), o usuário continua fixado pelo cache
+        outro_aparelho = APIClient()
+        outro_aparelho.force_authenticate(self.admin)
+        with mock.patch.object(roteador, 'usar_replica') as usar_replica:
+            client.get('/api/presencas/')
+            outro_aparelho.get('/api/presencas/')
+            client.get(f'/api/presencas/{resposta.json()["id"]}/')  # retrieve nunca usa a réplica
+        usar_replica.assert_not_called()
+
+
+class MatriculaEmMassaTest(TestCase):
+    """POST /api/turmas/{id}/matricular_alunos/: resultado por item, sem duplicar matrículas"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+        self.turma = criar_turma(criar_professor())
+        self.alunos = [criar_aluno(indice) for indice in range(4)]
+        Matricula.objects.create(aluno=self.alunos[3], turma=self.turma)
+
+    def test_resultado_por_item(self):
+        a0, a1, a2, a3 = self.alunos
+        resposta = self.client.post(f'/api/turmas/{self.turma.pk}/matricular_alunos/', {
+            'alunos': [a0.pk, a0.pk, 'abc', 999999],
+            'matriculas': [a1.matricula, a3.matricula, 'inexistente'],
+        }, format='json')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(
+            [r['status'] for r in resposta.json()['resultados']],
+            ['matriculado', 'repetido', 'invalido', 'nao_encontrado', 'matriculado', 'ja_matriculado',
+             'nao_encontrado']
+        )
+        self.assertEqual(resposta.json()['resumo']['matriculado'], 2)
+        self.assertEqual(
+            set(Matricula.objects.filter(turma=self.turma).values_list('aluno_id', flat=True)), {a0.pk, a1.pk, a3.pk}
+        )
+
+    def test_csv_e_lista_vazia(self):
+        arquivo = SimpleUploadedFile('alunos.csv', f'matricula\n{self.alunos[2].matricula}\n'.encode())
+        resposta = self.client.post(f'/api/turmas/{self.turma.pk}/matricular_alunos/', {'arquivo': arquivo})
+        self.assertEqual(resposta.json()['resumo'], {'matriculado': 1})
+
+        resposta = self.client.post(f'/api/turmas/{self.turma.pk}/matricular_alunos/', {}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+
+
+class VirarSemestreTest(TestCase):
+    """POST /api/turmas/virar_semestre/: clones, matrículas copiadas e turmas concluídas"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+        professor = criar_professor()
+        self.turma = criar_turma(professor, 'Cálculo 2025.1', data_fim=date(2025, 6, 30))
+        criar_turma(professor, 'Física 2025.1', data_fim=date(2025, 6, 30))
+        criar_turma(professor, 'Anual 2025', data_fim=date(2025, 12, 15))
+        for indice in range(3):
+            Matricula.objects.create(aluno=criar_aluno(indice), turma=self.turma)
+        self.dados = {
+            'data_inicio': '2025-08-01', 'data_fim': '2025-12-15', 'carregar_matriculas': True,
+            'renomear_de': '2025.1', 'renomear_para': '2025.2',
+        }
+
+    def _virar(self, **campos):
+        return self.client.post('/api/turmas/virar_semestre/', {**self.dados, **campos}, format='json')
+
+    def test_dry_run_nao_grava(self):
+        resposta = self._virar(dry_run=True)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['turmas_criadas'], 2)
+        self.assertEqual(Turma.objects.count(), 3)
+        self.assertEqual(Turma.objects.filter(status='Concluída').count(), 0)
+
+    def test_vira_o_semestre_uma_vez(self):
+        resposta = self._virar()
+        self.assertEqual(resposta.status_code, 201)
+        relatorio = resposta.json()
+        self.assertEqual(
+            (relatorio['turmas_criadas'], relatorio['matriculas_copiadas'], relatorio['turmas_concluidas']), (2, 3, 2)
+        )
+        clone = Turma.objects.get(nome='Cálculo 2025.2')
+        self.assertEqual((clone.status, clone.data_inicio), ('Ativa', date(2025, 8, 1)))
+        self.assertEqual(clone.matriculas.count(), 3)
+        self.turma.refresh_from_db()
+        self.assertEqual(self.turma.status, 'Concluída')
+        self.assertEqual(Turma.objects.get(nome='Anual 2025').status, 'Ativa')
+
+        # Repetir não duplica: as origens já concluídas são indicadas explicitamente
+        repetida = self._virar(turmas=[self.turma.pk]).json()
+        self.assertEqual((repetida['turmas_criadas'], len(repetida['ignoradas'])), (0, 1))
+
+    def test_periodo_invalido(self):
+        self.assertEqual(self._virar(data_fim='2025-07-01').status_code, 400)
+
+    def test_renomear_sem_texto_de_origem(self):
+        self.assertEqual(self._virar(renomear_de='', renomear_para='2025.2').status_code, 400)
+        with self.assertRaisesMessage(CommandError, 'não pode ser vazio'):
+            call_command('virar_semestre', '2025-08-01', '2025-12-15', '--renomear', '', '2025.2', stdout=StringIO())
+        self.assertFalse(Turma.objects.filter(nome__contains='2025.2').exists())
+
+
+class CadastroEmLoteTest(TestCase):
+    """POST com lista e PATCH .../lote/ em alunos e professores"""
+
+    def setUp(self):
+        signals._ids_grupos.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+
+    def _aluno(self, indice, **campos):
+        return {
+            'nome': f'Aluno Lote {indice}', 'matricula': f'L{indice:04d}', 'email': f'lote{indice}@teste.com',
+            'curso': 'TI', 'data_nascimento': '2000-01-01', 'genero': 'N', **campos
+        }
+
+    def test_criacao_em_lote_cria_usuarios_no_grupo(self):
+        resposta = self.client.post('/api/alunos/', [self._aluno(1), self._aluno(2)], format='json')
+        self.assertEqual(resposta.status_code, 201)
+        self.assertTrue(all(item['ativacao']['username'] for item in resposta.json()))
+        alunos = Aluno.objects.filter(matricula__startswith='L').select_related('usuario')
+        self.assertEqual(len(alunos), 2)
+        for aluno in alunos:
+            self.assertEqual(list(aluno.usuario.groups.values_list('name', flat=True)), ['Aluno'])
+            self.assertFalse(aluno.usuario.has_usable_password())
+
+        resposta = self.client.post('/api/professores/', [
+            {'nome': 'Professora Lote', 'email': 'professora.lote@teste.com', 'departamento': 'TI'}
+        ], format='json')
+        self.assertEqual(resposta.status_code, 201)
+        usuario = Professor.objects.get(email='professora.lote@teste.com').usuario
+        self.assertEqual(list(usuario.groups.values_list('name', flat=True)), ['Professor'])
+
+    def test_criacao_em_lote_valida_unicidade_do_lote(self):
+        existente = criar_aluno(1)
+        resposta = self.client.post('/api/alunos/', [
+            self._aluno(1), self._aluno(2, matricula='L0001'), self._aluno(3, email=existente.email),
+        ], format='json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(resposta.json(), [
+            {}, {'matricula': ['Repetido no lote.']}, {'email': ['Já cadastrado.']}
+        ])
+        self.assertFalse(Aluno.objects.filter(matricula__startswith='L').exists())
+
+    def test_atualizacao_parcial_em_lote(self):
+        a1, a2 = criar_aluno(1), criar_aluno(2)
+        resposta = self.client.patch('/api/alunos/lote/', [
+            {'id': a1.pk, 'curso': 'Matemática'}, {'id': a2.pk, 'email': 'novo2@teste.com'}
+        ], format='json')
+        self.assertEqual(resposta.status_code, 200)
+        a1.refresh_from_db()
+        a2.refresh_from_db()
+        self.assertEqual((a1.curso, a2.email), ('Matemática', 'novo2@teste.com'))
+        self.assertEqual(User.objects.get(pk=a2.usuario_id).email, 'novo2@teste.com')
+
+        for lote in ([{'id': a1.pk, 'curso': 'X'}, {'id': a1.pk, 'curso': 'Y'}], [{'id': 999999, 'curso': 'X'}], {}):
+            self.assertEqual(self.client.patch('/api/alunos/lote/', lote, format='json').status_code, 400)
+        a1.refresh_from_db()
+        self.assertEqual(a1.curso, 'Matemática')
+
+
+@override_settings(METRICAS_TOKEN='segredo-metricas')
+class MetricasTest(TestCase):
+    """GET /api/metricas/: acesso, histogramas por view e soma entre processos"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _valores(self, texto, prefixo):
+        return {
+            linha.rsplit(' ', 1)[0]: float(linha.rsplit(' ', 1)[1])
+            for linha in texto.splitlines() if linha.startswith(prefixo)
+        }
+
+    def _metricas(self):
+        resposta = self.client.get('/api/metricas/', HTTP_X_METRICAS_TOKEN='segredo-metricas')
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.content.decode()
+
+    def test_acesso_por_token_ou_staff(self):
+        self.assertIn(self.client.get('/api/metricas/').status_code, (401, 403))
+        self.assertIn(self.client.get('/api/metricas/', HTTP_X_METRICAS_TOKEN='errado').status_code, (401, 403))
+        with override_settings(METRICAS_TOKEN=''):
+            self.assertIn(self.client.get('/api/metricas/', HTTP_X_METRICAS_TOKEN='').status_code, (401, 403))
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@teste.com', 'admin123'))
+        self.assertEqual(self.client.get('/api/metricas/').status_code, 200)
+
+    def test_histograma_por_view(self):
+        self.client.get('/api/turmas-ativas/')
+        texto = self._metricas()
+        self.assertIn('# TYPE chamada_requisicao_segundos histogram', texto)
+
+        requisicoes = self._valores(texto, 'chamada_requisicoes_total{')
+        self.assertTrue(any('TurmasAtivas' in rotulos and 'status="200"' in rotulos for rotulos in requisicoes))
+        buckets = self._valores(texto, 'chamada_requisicao_segundos_bucket')
+        contagens = self._valores(texto, 'chamada_requisicao_segundos_count')
+        for rotulos, total in contagens.items():
+            view = rotulos[rotulos.index('{'):].rstrip('}')
+            prefixo = f'chamada_requisicao_segundos_bucket{view},'
+            acumulados = [valor for chave, valor in buckets.items() if chave.startswith(prefixo)]
+            self.assertEqual(acumulados, sorted(acumulados))  # cumulativos
+            self.assertEqual(acumulados[-1], total)  # le="+Inf" = _count
+
+    def test_soma_os_processos(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        outro = metricas.Registro()
+        outro.contar('chamada_presencas_gravadas_total', 5)
+
+        with override_settings(METRICAS_DIRETORIO_MULTIPROCESSO=diretorio.name):
+            antes = self._valores(self._metricas(), 'chamada_presencas_gravadas_total ')
+            with open(os.path.join(diretorio.name, 'metricas-999999.json'), 'w') as arquivo:
+                json.dump(outro.estado(), arquivo)
+            depois = self._valores(self._metricas(), 'chamada_presencas_gravadas_total ')
+        nome = 'chamada_presencas_gravadas_total'
+        self.assertEqual(depois[nome], antes.get(nome, 0) + 5)
@@ -0,0 +1,65 @@
+# app/transacoes.py
+"""
+Utilitários de transação para escritas concorrentes no SQLite.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+MENSAGENS_BLOQUEIO = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def erro_de_bloqueio(erro):
+    """Indica se o OperationalError é um bloqueio transitório do SQLite"""
+    mensagem = str(erro).lower()
+    return any(trecho in mensagem for trecho in MENSAGENS_BLOQUEIO)
+
+
+def com_retentativa(func=None, *, tentativas=None, espera_inicial=None, espera_maxima=None):
+    """
+    Executa `func` em uma transação e repete com backoff exponencial (com jitter)
+    quando o banco responde "database is locked".
+
+    Só repete quando não há transação externa aberta: dentro de um atomic()
+    o erro é propagado para que o bloco mais externo decida.
+    """
+    if func is None:
+        return functools.partial(
+            com_retentativa,
+            tentativas=tentativas,
+            espera_inicial=espera_inicial,
+            espera_maxima=espera_maxima,
+        )
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        max_tentativas = tentativas or settings.DB_RETRY_TENTATIVAS
+        espera = espera_inicial or settings.DB_RETRY_ESPERA_INICIAL
+        limite = espera_maxima or settings.DB_RETRY_ESPERA_MAXIMA
+
+        for tentativa in range(1, max_tentativas + 1):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as erro:
+                if (
+                    not erro_de_bloqueio(erro)
+                    or connection.in_atomic_block
+                    or tentativa == max_tentativas
+                ):
+                    raise
+                atraso = min(limite, espera * (2 ** (tentativa - 1)))
+                atraso = random.uniform(atraso / 2, atraso)
+                logger.warning(
+                    "Banco bloqueado em %s (tentativa %s/%s); nova tentativa em %.3fs",
+                    func.__qualname__, tentativa, max_tentativas, atraso
+                )
+                time.sleep(atraso)
+
+    return wrapper
@@ -1,7 +1,11 @@
 # app/urls.py - VERSÃO SIMPLIFICADA
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views, views_auth
+from . import (
+    views, views_async, views_auth, views_relatorios, views_roster, views_sincronizacao, views_captura,
+    views_exportacao, views_metricas
+)
 
 router = DefaultRouter()
 router.register(r'professores', views.ProfessorViewSet, basename='professor')
@@ -15,10 +19,26 @@ auth_urlpatterns = [
     path('registro/', views_auth.RegisterView.as_view(), name='registro'),
     path('login/', views_auth.LoginView.as_view(), name='login'),
     path('logout/', views_auth.LogoutView.as_view(), name='logout'),
+    path('token/refresh/', views_auth.RefreshTokenView.as_view(), name='token-refresh'),
     path('meu-perfil/', views_auth.UserProfileView.as_view(), name='meu-perfil'),
     path('alterar-senha/', views_auth.ChangePasswordView.as_view(), name='alterar-senha'),
     path('recuperar-senha/', views_auth.ResetPasswordView.as_view(), name='recuperar-senha'),
     path('recuperar-senha/confirmar/', views_auth.ResetPasswordConfirmView.as_view(), name='recuperar-senha-confirmar'),
+    path('ativar-conta/', views_auth.AtivarContaView.as_view(), name='ativar-conta'),
+]
+
+# URLs de relatórios analíticos
+relatorios_urlpatterns = [
+    path('equidade/', views_relatorios.EquidadeView.as_view(), name='relatorio-equidade'),
+    path('carga-docente/', views_relatorios.CargaDocenteView.as_view(), name='relatorio-carga-docente'),
+]
+
+# URLs de leitura assíncronas (ASGI)
+async_urlpatterns = [
+    path('turmas-ativas/', views_async.TurmasAtivasAsyncView.as_view(), name='turmas-ativas-async'),
+    path('minhas-turmas/', views_async.MinhasTurmasAsyncView.as_view(), name='minhas-turmas-async'),
+    path('turmas/<int:pk>/dashboard/', views_async.DashboardTurmaAsyncView.as_view(), name='turma-dashboard-async'),
+    path('presencas/', views_async.PresencasAsyncView.as_view(), name='presencas-async'),
 ]
 
 # URLs principais
@@ -28,9 +48,40 @@ urlpatterns = [
     
     # Autenticação
     path('auth/', include(auth_urlpatterns)),
+
+    # Relatórios
+    path('relatorios/', include(relatorios_urlpatterns)),
+
+    # Importação em massa
+    path('roster/importar/', views_roster.ImportarRosterView.as_view(), name='roster-importar'),
+
+    # Leituras assíncronas
+    path('async/', include(async_urlpatterns)),
+
+    # Feed ao vivo da turma (SSE, via ASGI)
+    path('turmas/<int:pk>/ao-vivo/', views_async.FeedTurmaAoVivoView.as_view(), name='turma-ao-vivo'),
     
     # Views específicas
     path('minhas-turmas/', views.MinhasTurmasView.as_view(), name='minhas-turmas'),
+    path('checkin/', views.CheckinView.as_view(), name='checkin'),
+    path('sync/', views_sincronizacao.SincronizacaoView.as_view(), name='sync'),
+    path('mudancas/', views_captura.MudancasView.as_view(), name='mudancas'),
+    path('exportacao/', views_exportacao.ExportacaoView.as_view(), name='exportacao'),
+    path('exportacao/<str:tabela>/', views_exportacao.ExportacaoTabelaView.as_view(), name='exportacao-tabela'),
+    path('metricas/', views_metricas.MetricasView.as_view(), name='metricas'),
+    path('consultas-lentas/', views_metricas.ConsultasLentasView.as_view(), name='consultas-lentas'),
     path('turmas-ativas/', views.TurmasAtivasView.as_view(), name='turmas-ativas'),
     path('professores-publicos/', views.ProfessoresPublicosView.as_view(), name='professores-publicos'),
-]
\ No newline at end of file
+]
+
+# Com LEITURAS_ASYNC as rotas originais de leitura usam as views assíncronas
+if settings.LEITURAS_ASYNC:
+    urlpatterns = [
+        path('turmas-ativas/', views_async.TurmasAtivasAsyncView.as_view()),
+        path('minhas-turmas/', views_async.MinhasTurmasAsyncView.as_view()),
+        path('turmas/<int:pk>/dashboard/', views_async.DashboardTurmaAsyncView.as_view()),
+        path('presencas/', views_async.leitura_async_ou_sync(
+            views_async.PresencasAsyncView.as_view(),
+            views.PresencaViewSet.as_view({'get': 'list', 'post': 'create'}),
+        )),
+    ] + urlpatterns
@@ -1,54 +1,115 @@
 # app/views.py - VERSÃO LIMPA E FUNCIONAL
+import csv
+
 from rest_framework import viewsets, generics, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Avg
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 
-from .models import Professor, Aluno, Turma, Matricula, Presenca
+from .models import Professor, Aluno, Turma, Matricula, Presenca, FilaPresenca
 from .serializers import (
     ProfessorSerializer, AlunoSerializer, TurmaSerializer,
     MatriculaSerializer, PresencaSerializer, DashboardTurmaSerializer,
-    ProfessorTurmasSerializer, TurmaAlunosSerializer, RepresentanteSerializer
+    ProfessorTurmasSerializer, TurmaAlunosSerializer, RepresentanteSerializer,
+    VirarSemestreSerializer
 )
+from .filters import AlunoFilter, PresencaFilter, BUSCA_PRESENCA
+from .provisionamento import ler_csv, matricular_em_massa, virar_semestre
+from .roteador import LeituraReplicaMixin
+from .transacoes import com_retentativa
+from .authentication import AUTENTICACAO_PADRAO
 from .permissions import (
     IsAdminOrReadOnly, IsProfessorOrAdmin, IsProfessorDaTurma,
-    IsAlunoOrReadOnly, PublicReadOnly
+    IsAlunoOrReadOnly, PublicReadOnly, IsAluno
 )
+from . import checkin, fila_presencas
 
 
 # ========== VIEWSETS PRINCIPAIS ==========
 
-class ProfessorViewSet(viewsets.ModelViewSet):
+class EmLoteMixin:
+    """
+    POST com uma lista cria os registros em lote; PATCH em .../lote/ com uma
+    lista de objetos (cada um com "id") faz a atualização parcial em lote.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        objetos = serializer.save()
+
+        ids = [obj.pk for obj in objetos]
+        dados = self.get_serializer(self.get_queryset().filter(pk__in=ids), many=True).data
+        for item in dados:
+            item['ativacao'] = serializer.ativacao.get(item['id'])
+        return Response(dados, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'])
+    def lote(self, request):
+        """Atualização parcial em lote"""
+        if not isinstance(request.data, list) or not request.data:
+            return Response(
+                {"error": "Envie uma lista de objetos com 'id'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ids = [item.get('id') for item in request.data if isinstance(item, dict)]
+        modelo = self.get_queryset().model
+        instancias = modelo.objects.filter(pk__in=[i for i in ids if isinstance(i, int)])
+        serializer = self.get_serializer(instancias, data=request.data, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        return Response(self.get_serializer(self.get_queryset().filter(pk__in=ids), many=True).data)
+
+
+class ProfessorViewSet(EmLoteMixin, LeituraReplicaMixin, viewsets.ModelViewSet):
     """ViewSet para gerenciar professores"""
+    acoes_replica = {'list'}
     queryset = Professor.objects.all().order_by('nome')
     serializer_class = ProfessorSerializer
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = AUTENTICACAO_PADRAO
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['ativo', 'departamento']
     search_fields = ['nome', 'email', 'departamento']
 
+    def get_queryset(self):
+        """Carga docente (turmas, alunos, aulas) agregada em uma única consulta"""
+        return super().get_queryset().com_carga()
+
 
-class AlunoViewSet(viewsets.ModelViewSet):
+class AlunoViewSet(EmLoteMixin, LeituraReplicaMixin, viewsets.ModelViewSet):
     """ViewSet para gerenciar alunos"""
+    acoes_replica = {'list'}
     queryset = Aluno.objects.all().order_by('nome')
     serializer_class = AlunoSerializer
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = AUTENTICACAO_PADRAO
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['curso', 'genero']
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = AlunoFilter
     search_fields = ['nome', 'matricula', 'email', 'curso']
+    ordering_fields = ['nome', 'matricula', 'curso', 'idade', 'data_cadastro']
+
+    def get_queryset(self):
+        """Anota a idade por requisição (a data de referência muda a cada dia)"""
+        return super().get_queryset().com_idade()
 
 
-class TurmaViewSet(viewsets.ModelViewSet):
+class TurmaViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
     """ViewSet para gerenciar turmas"""
-    queryset = Turma.objects.all().order_by('-data_inicio', 'nome')
+    acoes_replica = {'list', 'dashboard'}
+    queryset = Turma.objects.com_total_alunos().order_by('-data_inicio', 'nome')
     serializer_class = TurmaSerializer
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = AUTENTICACAO_PADRAO
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['status', 'professor']
@@ -122,6 +183,80 @@ class TurmaViewSet(viewsets.ModelViewSet):
         serializer = MatriculaSerializer(matricula)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(
+        detail=True, methods=['post'], permission_classes=[IsAdminUser],
+        parser_classes=[JSONParser, MultiPartParser, FormParser]
+    )
+    def matricular_alunos(self, request, pk=None):
+        """
+        Matricula vários alunos de uma vez.
+        Aceita {"alunos": [ids]} e/ou {"matriculas": [códigos]}, ou um CSV
+        ("arquivo") com colunas aluno_id e/ou matricula.
+        """
+        turma = self.get_object()
+        aluno_ids = request.data.get('alunos') or []
+        codigos = request.data.get('matriculas') or []
+
+        arquivo = request.FILES.get('arquivo')
+        if arquivo:
+            try:
+                linhas = ler_csv(arquivo)
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response({"error": f"CSV inválido: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+            aluno_ids = [linha['aluno_id'] for linha in linhas if linha.get('aluno_id')]
+            codigos = [linha['matricula'] for linha in linhas if linha.get('matricula')]
+
+        if not isinstance(aluno_ids, list) or not isinstance(codigos, list) or not (aluno_ids or codigos):
+            return Response(
+                {"error": "Informe uma lista em 'alunos' ou 'matriculas', ou um 'arquivo' CSV"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(matricular_em_massa(turma, aluno_ids, codigos))
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def virar_semestre(self, request):
+        """
+        Abre o novo período: clona turmas, copia matrículas (opcional) e
+        conclui as turmas encerradas. Use "dry_run": true para só ver o relatório.
+        """
+        serializer = VirarSemestreSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
+
+        renomear = None
+        if 'renomear_de' in dados:
+            renomear = (dados['renomear_de'], dados['renomear_para'])
+
+        relatorio = virar_semestre(
+            dados['data_inicio'], dados['data_fim'], turma_ids=dados.get('turmas'),
+            carregar_matriculas=dados['carregar_matriculas'], renomear=renomear,
+            dry_run=dados['dry_run'],
+        )
+        criou = relatorio['turmas_criadas'] and not dados['dry_run']
+        return Response(relatorio, status=status.HTTP_201_CREATED if criou else status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsProfessorOrAdmin])
+    def codigo_checkin(self, request, pk=None):
+        """
+        Gera o código de check-in da aula de hoje, para exibir em sala.
+        O código expira em CHECKIN_VALIDADE_SEGUNDOS; gere outro para renovar.
+        """
+        turma = self.get_object()
+        if turma.status != 'Ativa':
+            return Response(
+                {"error": "Check-in disponível apenas para turmas ativas"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        codigo, data = checkin.gerar_codigo(turma.id)
+        return Response({
+            'turma': turma.id,
+            'data': data,
+            'codigo': codigo,
+            'validade_segundos': settings.CHECKIN_VALIDADE_SEGUNDOS,
+        })
+
     @action(detail=True, methods=['put'], permission_classes=[IsAdminUser])
     def definir_representante(self, request, pk=None):
         """Define aluno como representante da turma"""
@@ -199,11 +334,12 @@ class TurmaViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class MatriculaViewSet(viewsets.ModelViewSet):
+class MatriculaViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
     """ViewSet para gerenciar matrículas"""
+    acoes_replica = {'list'}
     queryset = Matricula.objects.all().order_by('-data_matricula')
     serializer_class = MatriculaSerializer
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = AUTENTICACAO_PADRAO
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['turma']
@@ -213,19 +349,18 @@ class MatriculaViewSet(viewsets.ModelViewSet):
     ]
 
 
-class PresencaViewSet(viewsets.ModelViewSet):
+class PresencaViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
     """ViewSet para gerenciar presenças"""
-    queryset = Presenca.objects.all().order_by('-data', '-data_registro')
+    acoes_replica = {'list'}
+    queryset = Presenca.objects.select_related(
+        'matricula__aluno', 'matricula__turma'
+    ).order_by('-data', '-data_registro')
     serializer_class = PresencaSerializer
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = AUTENTICACAO_PADRAO
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['status', 'data', 'matricula__turma']
-    search_fields = [
-        'matricula__aluno__nome',
-        'matricula__aluno__matricula',
-        'observacao'
-    ]
+    filterset_class = PresencaFilter
+    search_fields = BUSCA_PRESENCA
     
     def get_queryset(self):
         """Filtra o queryset baseado no tipo de usuário"""
@@ -245,6 +380,23 @@ class PresencaViewSet(viewsets.ModelViewSet):
         
         return queryset.none()
     
+    # Escritas de presença em transação IMMEDIATE com retentativa se o banco estiver bloqueado
+    @com_retentativa
+    def create(self, request, *args, **kwargs):
+        if fila_presencas.escrita_adiada_ativa():
+            return self.enfileirar(request, 'criar')
+        return super().create(request, *args, **kwargs)
+    
+    @com_retentativa
+    def update(self, request, *args, **kwargs):
+        if fila_presencas.escrita_adiada_ativa():
+            return self.enfileirar(request, 'atualizar', partial=kwargs.pop('partial', False))
+        return super().update(request, *args, **kwargs)
+    
+    @com_retentativa
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         """Verifica se o professor pode marcar presença nesta matrícula"""
         matricula = serializer.validated_data['matricula']
@@ -260,15 +412,60 @@ class PresencaViewSet(viewsets.ModelViewSet):
                 from rest_framework.exceptions import PermissionDenied
                 raise PermissionDenied("Você não pode marcar presença nesta turma")
 
+    def enfileirar(self, request, operacao, partial=False):
+        """Escrita adiada: valida, grava na fila e responde 202 com o ticket"""
+        instance = self.get_object() if operacao == 'atualizar' else None
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+
+        if instance is None and not request.user.is_staff:
+            matricula = serializer.validated_data['matricula']
+            if not (hasattr(request.user, 'professor')
+                    and matricula.turma.professor_id == request.user.professor.pk):
+                from rest_framework.exceptions import PermissionDenied
+                raise PermissionDenied("Você não pode marcar presença nesta turma")
+
+        item = fila_presencas.enfileirar(operacao, serializer.validated_data, instance, request.user)
+        url = request.build_absolute_uri(f'/api/presencas/fila/{item.id}/')
+        return Response(
+            self.dados_ticket(item), status=status.HTTP_202_ACCEPTED, headers={'Location': url}
+        )
+
+    def dados_ticket(self, item):
+        return {
+            'ticket': item.id,
+            'operacao': item.operacao,
+            'estado': item.estado,
+            'presenca': item.presenca_id,
+            'erro': item.erro,
+            'recebido_em': item.criado_em,
+            'processado_em': item.processado_em,
+        }
+
+    @action(detail=False, methods=['get'], url_path=r'fila/(?P<ticket>\d+)')
+    def fila(self, request, ticket=None):
+        """GET /api/presencas/fila/{ticket}/ - situação de uma escrita adiada"""
+        filtro = {} if request.user.is_staff else {'usuario_id': request.user.pk}
+        item = get_object_or_404(FilaPresenca, pk=ticket, **filtro)
+        return Response(self.dados_ticket(item))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Permite ao cliente saber se o ticket da sua escrita já está nesta leitura
+        if (fila_presencas.escrita_adiada_ativa() and response.status_code < 400
+                and getattr(self, 'action', None) in ('list', 'retrieve')):
+            response['X-Fila-Presencas-Processada'] = fila_presencas.ultimo_processado()
+        return response
+
 
 # ========== VIEWS PÚBLICAS ==========
 
-class TurmasAtivasView(generics.ListAPIView):
+class TurmasAtivasView(LeituraReplicaMixin, generics.ListAPIView):
     """
     GET /api/turmas-ativas/
     Lista pública de turmas ativas (sem dados pessoais)
     """
-    queryset = Turma.objects.filter(status='Ativa').order_by('-data_inicio')
+    queryset = Turma.objects.filter(status='Ativa').com_total_alunos().order_by('-data_inicio')
     serializer_class = TurmaSerializer
     permission_classes = [AllowAny]
     
@@ -278,7 +475,7 @@ class TurmasAtivasView(generics.ListAPIView):
         return context
 
 
-class ProfessoresPublicosView(generics.ListAPIView):
+class ProfessoresPublicosView(LeituraReplicaMixin, generics.ListAPIView):
     """
     GET /api/professores-publicos/
     Lista pública de professores (apenas nomes e departamentos)
@@ -295,16 +492,47 @@ class ProfessoresPublicosView(generics.ListAPIView):
 
 # ========== VIEWS DO SISTEMA ==========
 
-class MinhasTurmasView(generics.ListAPIView):
+class MinhasTurmasView(LeituraReplicaMixin, generics.ListAPIView):
     """
     GET /api/minhas-turmas/
     Retorna as turmas do professor logado
     """
     serializer_class = TurmaSerializer
     permission_classes = [IsProfessorOrAdmin]
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = AUTENTICACAO_PADRAO
     
     def get_queryset(self):
         if hasattr(self.request.user, 'professor'):
-            return Turma.objects.filter(professor=self.request.user.professor)
-        return Turma.objects.none()
\ No newline at end of file
+            return Turma.objects.filter(professor=self.request.user.professor).com_total_alunos()
+        return Turma.objects.none()
+
+
+class CheckinView(generics.GenericAPIView):
+    """
+    POST /api/checkin/
+    O aluno registra a própria presença com o código exibido pelo professor.
+    A presença é gravada em lote logo em seguida (resposta 202): "recebido"
+    e "ja_recebido" ainda não estão no banco, "ja_registrado" já está.
+    """
+    permission_classes = [IsAluno]
+    authentication_classes = AUTENTICACAO_PADRAO
+
+    def post(self, request, *args, **kwargs):
+        try:
+            turma_id, data = checkin.ler_codigo(str(request.data.get('codigo', '')))
+        except checkin.CodigoInvalido as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        matricula_id = checkin.matricula_do_aluno(turma_id, request.user.aluno.pk)
+        if matricula_id is None:
+            return Response(
+                {"error": "Você não está matriculado nesta turma"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        return Response({
+            'status': checkin.get_coletor().registrar(matricula_id, data),
+            'turma': turma_id,
+            'matricula': matricula_id,
+            'data': data,
+        }, status=status.HTTP_202_ACCEPTED)
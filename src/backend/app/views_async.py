@@ -0,0 +1,265 @@
+# app/views_async.py
+"""
+Versões assíncronas (ASGI) das rotas de leitura mais consultadas.
+
+Sob o servidor ASGI estas views não ocupam uma thread enquanto aguardam o
+banco ou o cache. As respostas têm o mesmo formato das views síncronas.
+"""
+import asyncio
+import json
+from abc import ABCMeta, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django_filters.utils import translate_validation
+from rest_framework.filters import SearchFilter
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import fila_presencas, metricas, roteador
+from .authentication import aautenticar_token, jwt_ativo, usuario_do_jwt
+from .eventos import canal_turma, get_broker
+from .filters import PresencaFilter, BUSCA_PRESENCA
+from .models import Turma, Matricula, Presenca
+from .serializers import TurmaSerializer, PresencaSerializer, DashboardTurmaSerializer
+
+CACHE_PREFIXO = 'leituras-async'
+
+
+def resposta_json(data, status=200):
+    """Renderiza com o JSONRenderer do DRF para manter o formato das views síncronas"""
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def autenticar(request):
+    """
+    Resolve o usuário sem bloquear o event loop: token no cabeçalho
+    Authorization ou sessão. Retorna None quando o token é inválido.
+    """
+    partes = request.headers.get('Authorization', '').split()
+    if len(partes) == 2 and partes[0].lower() == 'token':
+        return await aautenticar_token(partes[1])
+    if len(partes) == 2 and partes[0].lower() == 'bearer' and jwt_ativo():
+        return await sync_to_async(usuario_do_jwt)(partes[1])
+
+    user = await request.auser()
+    if user.is_authenticated:
+        # Carrega os perfis junto para que hasattr(user, 'professor') não consulte o banco
+        user = await User.objects.select_related('professor', 'aluno').aget(pk=user.pk)
+    return user
+
+
+class LeituraAsyncView(View, metaclass=ABCMeta):
+    """
+    Base das leituras assíncronas: autenticação, roteamento para réplica e
+    cache. As subclasses implementam responder().
+    """
+    http_method_names = ['get', 'options']
+    exige_autenticacao = True
+    apenas_professor_ou_admin = False
+
+    async def get(self, request, *args, **kwargs):
+        user = await autenticar(request)
+        if user is None:
+            return resposta_json({'detail': 'Token inválido.'}, status=401)
+        if self.exige_autenticacao and not user.is_authenticated:
+            return resposta_json(
+                {'detail': 'As credenciais de autenticação não foram fornecidas.'}, status=401
+            )
+        if self.apenas_professor_ou_admin and not (user.is_staff or hasattr(user, 'professor')):
+            return resposta_json(
+                {'detail': 'Você não tem permissão para executar essa ação.'}, status=403
+            )
+
+        request.user = user
+        if not roteador.primario_fixado(request):
+            roteador.usar_replica()
+        return await self.responder(request, user, *args, **kwargs)
+
+    @abstractmethod
+    async def responder(self, request, user, *args, **kwargs):
+        """Resposta para o usuário já autenticado e autorizado"""
+
+    async def em_cache(self, chave, gerar):
+        """Busca `chave` no cache; em caso de falta, aguarda `gerar()` e armazena"""
+        chave = f'{CACHE_PREFIXO}:{chave}'
+        dados = await cache.aget(chave)
+        metricas.contar_cache('leituras_async', dados is not None)
+        if dados is None:
+            dados = await gerar()
+            await cache.aset(chave, dados, settings.CACHE_LEITURAS_ASYNC_SEGUNDOS)
+        return dados
+
+
+async def serializar_turmas(queryset, public_view=False):
+    turmas = [turma async for turma in queryset.com_total_alunos()]
+    return TurmaSerializer(turmas, many=True, context={'public_view': public_view}).data
+
+
+class TurmasAtivasAsyncView(LeituraAsyncView):
+    """
+    GET /api/async/turmas-ativas/
+    Lista pública de turmas ativas (sem dados pessoais)
+    """
+    exige_autenticacao = False
+
+    async def responder(self, request, user, *args, **kwargs):
+        queryset = Turma.objects.filter(status='Ativa').order_by('-data_inicio')
+        dados = await self.em_cache('turmas-ativas', lambda: serializar_turmas(queryset, public_view=True))
+        return resposta_json(dados)
+
+
+class MinhasTurmasAsyncView(LeituraAsyncView):
+    """
+    GET /api/async/minhas-turmas/
+    Retorna as turmas do professor logado
+    """
+    apenas_professor_ou_admin = True
+
+    async def responder(self, request, user, *args, **kwargs):
+        if not hasattr(user, 'professor'):
+            return resposta_json([])
+        professor_id = user.professor.id
+        queryset = Turma.objects.filter(professor_id=professor_id)
+        dados = await self.em_cache(
+            f'minhas-turmas:{professor_id}', lambda: serializar_turmas(queryset)
+        )
+        return resposta_json(dados)
+
+
+class DashboardTurmaAsyncView(LeituraAsyncView):
+    """
+    GET /api/async/turmas/{id}/dashboard/
+    Dashboard da turma (mesma regra de acesso do TurmaViewSet)
+    """
+    exige_autenticacao = False
+
+    async def responder(self, request, user, pk, *args, **kwargs):
+        async def gerar():
+            try:
+                turma = await Turma.objects.com_total_alunos().aget(pk=pk)
+            except Turma.DoesNotExist:
+                return {}
+            matriculas = [
+                matricula async for matricula in
+                Matricula.objects.filter(turma=turma).select_related('aluno')
+            ]
+            total_presencas = await Presenca.objects.filter(matricula__turma=turma).acount()
+            media_presenca = (
+                sum(m.presenca_acumulada for m in matriculas) / len(matriculas)
+                if matriculas else 0
+            )
+            return DashboardTurmaSerializer({
+                'turma': turma,
+                'matriculas': matriculas,
+                'total_presencas': total_presencas,
+                'media_presenca': round(media_presenca, 2) if media_presenca else 0,
+            }).data
+
+        dados = await self.em_cache(f'dashboard:{pk}', gerar)
+
+        # Professor (não admin) só enxerga as próprias turmas, como no TurmaViewSet
+        restrito = user.is_authenticated and not user.is_staff and hasattr(user, 'professor')
+        if not dados or (restrito and dados['professor']['id'] != user.professor.id):
+            return resposta_json({'detail': 'Não encontrado.'}, status=404)
+        return resposta_json(dados)
+
+
+class PresencasAsyncView(LeituraAsyncView):
+    """
+    GET /api/async/presencas/
+    Lista de presenças com os filtros (PresencaFilter) e a busca do PresencaViewSet.
+    Não usa cache: o professor precisa ver a chamada que acabou de registrar.
+    """
+    search_fields = BUSCA_PRESENCA
+
+    def filtrar(self, request, queryset):
+        """Aplica o PresencaFilter e a busca; retorna (queryset, erros)"""
+        filterset = PresencaFilter(request.GET, queryset=queryset, request=request)
+        if not filterset.is_valid():  # valida matricula__turma no banco: chamar via sync_to_async
+            return None, translate_validation(filterset.errors).detail
+        return SearchFilter().filter_queryset(Request(request), filterset.qs, self), None
+
+    async def responder(self, request, user, *args, **kwargs):
+        queryset = Presenca.objects.select_related(
+            'matricula__aluno', 'matricula__turma'
+        ).order_by('-data', '-data_registro')
+
+        if user.is_staff:
+            pass  # Admin vê tudo
+        elif hasattr(user, 'professor'):
+            queryset = queryset.filter(matricula__turma__professor=user.professor)
+        elif hasattr(user, 'aluno'):
+            queryset = queryset.filter(matricula__aluno=user.aluno)
+        else:
+            queryset = queryset.none()
+
+        queryset, erros = await sync_to_async(self.filtrar)(request, queryset)
+        if erros:
+            return resposta_json(erros, status=400)
+        presencas = [p async for p in queryset]
+        response = resposta_json(PresencaSerializer(presencas, many=True).data)
+        if fila_presencas.escrita_adiada_ativa():
+            response['X-Fila-Presencas-Processada'] = await fila_presencas.aultimo_processado()
+        return response
+
+
+class FeedTurmaAoVivoView(LeituraAsyncView):
+    """
+    GET /api/turmas/{id}/ao-vivo/
+    Server-Sent Events com cada presença registrada na turma
+    (matrícula, status e nova presença acumulada). Requer servidor ASGI.
+    """
+    apenas_professor_ou_admin = True
+
+    async def responder(self, request, user, pk, *args, **kwargs):
+        try:
+            turma = await Turma.objects.only('id', 'professor_id').aget(pk=pk)
+        except Turma.DoesNotExist:
+            return resposta_json({'detail': 'Não encontrado.'}, status=404)
+        if not user.is_staff and turma.professor_id != user.professor.id:
+            return resposta_json({'detail': 'Não encontrado.'}, status=404)
+
+        assinatura = get_broker().assinar(canal_turma(turma.id))
+        response = StreamingHttpResponse(
+            self.transmitir(turma.id, assinatura), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # proxies não devem bufferizar o stream
+        return response
+
+    async def transmitir(self, turma_id, assinatura):
+        try:
+            yield f'retry: 3000\nevent: conectado\ndata: {json.dumps({"turma": turma_id})}\n\n'
+            sequencia = 0
+            while True:
+                try:
+                    evento = await assinatura.proximo(timeout=settings.EVENTOS_HEARTBEAT_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    # Comentário SSE mantém a conexão aberta em proxies
+                    yield ': heartbeat\n\n'
+                    continue
+                sequencia += 1
+                yield f'id: {sequencia}\nevent: presenca\ndata: {json.dumps(evento, default=str)}\n\n'
+        finally:
+            assinatura.cancelar()
+
+
+def leitura_async_ou_sync(view_async, view_sync):
+    """
+    Atende GET com a view assíncrona e os demais métodos com a view síncrona,
+    para rotas que também recebem escritas (ex.: POST /api/presencas/).
+    """
+    view_sync = sync_to_async(view_sync)
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await view_async(request, *args, **kwargs)
+        return await view_sync(request, *args, **kwargs)
+    return view
@@ -5,13 +5,33 @@ from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from django.contrib.auth.models import User
 from django.contrib.auth import logout
+from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 
+from .authentication import (
+    AUTENTICACAO_CONTA, jwt_ativo, emitir_tokens,
+    revogar_jwt, revogar_tokens_usuario, verificar_revogacao
+)
 from .serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer,
     ChangePasswordSerializer, ResetPasswordSerializer,
-    ResetPasswordConfirmSerializer
+    ResetPasswordConfirmSerializer, AtivarContaSerializer
 )
 
+def credenciais(user):
+    """Token do DRF ou par access/refresh assinado, conforme AUTH_TOKEN_MODO"""
+    if jwt_ativo():
+        return emitir_tokens(user)
+    token, created = Token.objects.get_or_create(user=user)
+    return {'token': token.key}
+
+def revogar_sessao(request):
+    """Invalida o token apresentado e todos os tokens assinados do usuário"""
+    revogar_tokens_usuario(request.user.pk)
+    if isinstance(request.auth, AccessToken):
+        revogar_jwt(request.auth)
+    Token.objects.filter(user=request.user).delete()
+
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
@@ -26,12 +46,11 @@ class RegisterView(generics.CreateAPIView):
         user._tipo_usuario_registro = tipo_usuario
         user.save()
         
-        token, created = Token.objects.get_or_create(user=user)
         user_data = UserSerializer(user, context=self.get_serializer_context()).data
         
         return Response({
             'user': user_data,
-            'token': token.key,
+            **credenciais(user),
             'message': 'Usuário registrado com sucesso.'
         }, status=status.HTTP_201_CREATED)
 
@@ -43,20 +62,20 @@ class LoginView(ObtainAuthToken):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
         
-        token, created = Token.objects.get_or_create(user=user)
         user_data = UserSerializer(user, context={'request': request}).data
         
         return Response({
             'user': user_data,
-            'token': token.key,
+            **credenciais(user),
             'message': 'Login realizado com sucesso.'
         })
 
 class LogoutView(generics.GenericAPIView):
+    authentication_classes = AUTENTICACAO_CONTA
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
-        Token.objects.filter(user=request.user).delete()
+        revogar_sessao(request)
         logout(request)
         return Response({
             'message': 'Logout realizado com sucesso.'
@@ -64,6 +83,7 @@ class LogoutView(generics.GenericAPIView):
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
+    authentication_classes = AUTENTICACAO_CONTA
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
@@ -71,6 +91,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 class ChangePasswordView(generics.UpdateAPIView):
     serializer_class = ChangePasswordSerializer
+    authentication_classes = AUTENTICACAO_CONTA
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
@@ -81,14 +102,41 @@ class ChangePasswordView(generics.UpdateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         
-        Token.objects.filter(user=user).delete()
-        new_token = Token.objects.create(user=user)
+        revogar_sessao(request)
         
         return Response({
             'message': 'Senha alterada com sucesso.',
-            'token': new_token.key
+            **credenciais(user)
         }, status=status.HTTP_200_OK)
 
+class RefreshTokenView(generics.GenericAPIView):
+    """
+    Troca um refresh token válido por um novo par access/refresh (modo JWT).
+    O refresh usado é revogado (rotação) e o papel é relido do banco.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    
+    def post(self, request, *args, **kwargs):
+        try:
+            refresh = RefreshToken(request.data.get('refresh', ''))
+            verificar_revogacao(refresh)
+        except (TokenError, InvalidToken):
+            return Response({
+                'detail': 'Refresh token inválido ou expirado.'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        
+        user = User.objects.select_related('professor', 'aluno').filter(
+            pk=refresh['user_id'], is_active=True
+        ).first()
+        if user is None:
+            return Response({
+                'detail': 'Usuário inativo ou removido.'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        
+        revogar_jwt(refresh)
+        return Response(emitir_tokens(user), status=status.HTTP_200_OK)
+
 class ResetPasswordView(generics.GenericAPIView):
     serializer_class = ResetPasswordSerializer
     permission_classes = [permissions.AllowAny]
@@ -114,4 +162,20 @@ class ResetPasswordConfirmView(generics.GenericAPIView):
         
         return Response({
             'message': 'Senha redefinida com sucesso. Faça login com a nova senha.'
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+class AtivarContaView(generics.GenericAPIView):
+    """Primeiro acesso: define a senha de um usuário importado em massa"""
+    serializer_class = AtivarContaSerializer
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.save()
+        
+        return Response({
+            'message': 'Conta ativada com sucesso.',
+            **credenciais(user)
+        }, status=status.HTTP_200_OK)
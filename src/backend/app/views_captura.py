@@ -0,0 +1,39 @@
+# app/views_captura.py
+from django.conf import settings
+from rest_framework import generics, status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .authentication import AUTENTICACAO_PADRAO
+from .captura import ler_mudancas, posicao, confirmar, compactar
+
+
+class MudancasView(generics.GenericAPIView):
+    """
+    GET /api/mudancas/?apos=<id>&limite=<n>&consumidor=<nome>
+    Mudanças de presenças, matrículas, turmas, alunos e professores depois do
+    cursor `apos`, em ordem. Com `consumidor`, `apos` confirma tudo até ele
+    (permitindo a compactação) e, se omitido, retoma da última confirmação.
+    """
+    authentication_classes = AUTENTICACAO_PADRAO
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        consumidor = request.query_params.get('consumidor')
+        try:
+            apos = request.query_params.get('apos')
+            apos = int(apos) if apos is not None else (posicao(consumidor) if consumidor else 0)
+            limite = min(max(int(request.query_params.get('limite', 1000)), 1), settings.CAPTURA_LIMITE_LEITURA)
+        except ValueError:
+            return Response({'error': 'apos e limite devem ser inteiros'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if consumidor:
+            confirmar(consumidor, apos)
+            compactar()
+
+        mudancas, cursor = ler_mudancas(apos, limite)
+        return Response({
+            'mudancas': mudancas,
+            'cursor': cursor,
+            'fim': len(mudancas) < limite,
+        })
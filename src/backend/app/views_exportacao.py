@@ -0,0 +1,99 @@
+# app/views_exportacao.py
+import re
+import tempfile
+from datetime import date
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework import generics, status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .authentication import AUTENTICACAO_PADRAO
+from .exportacao import TABELAS, ExportacaoIndisponivel, exportar, gravar_parquet, stream_arrow
+
+
+FORMATO_MES = re.compile(r'\d{4}-\d{2}')
+
+
+def ler_mes(valor):
+    """'AAAA-MM' → date do primeiro dia (None se inválido, ex.: 2025-13 ou 2025-9)"""
+    if not isinstance(valor, str) or not FORMATO_MES.fullmatch(valor):
+        return None
+    try:
+        return date(int(valor[:4]), int(valor[5:]), 1)
+    except ValueError:
+        return None
+
+
+class ExportacaoView(generics.GenericAPIView):
+    """
+    POST /api/exportacao/  {"incremental": true, "meses": ["2025-09"]}
+    Gera o esquema estrela em Parquet no diretório do servidor (EXPORTACAO_DIRETORIO)
+    """
+    authentication_classes = AUTENTICACAO_PADRAO
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        meses = request.data.get('meses') or None
+        if meses is not None and (
+            not isinstance(meses, list) or not all(ler_mes(m) for m in meses)
+        ):
+            return Response({'meses': ['Informe uma lista no formato AAAA-MM.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            relatorio = exportar(
+                settings.EXPORTACAO_DIRETORIO, incremental=bool(request.data.get('incremental')), meses=meses
+            )
+        except ExportacaoIndisponivel as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(relatorio)
+
+
+class ExportacaoTabelaView(generics.GenericAPIView):
+    """
+    GET /api/exportacao/{tabela}/?formato=parquet|arrow&mes=AAAA-MM
+    Baixa uma tabela do esquema estrela (fato_presenca, dim_aluno, dim_turma,
+    dim_professor, dim_data). 'arrow' é enviado em stream, lote a lote;
+    'parquet' é montado num arquivo temporário (o rodapé vem no fim).
+    """
+    authentication_classes = AUTENTICACAO_PADRAO
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, tabela, *args, **kwargs):
+        formato = request.query_params.get('formato', 'parquet')
+        if tabela not in TABELAS:
+            return Response({'error': f"Tabelas: {', '.join(TABELAS)}"}, status=status.HTTP_404_NOT_FOUND)
+        if formato not in ('parquet', 'arrow'):
+            return Response({'error': 'formato deve ser parquet ou arrow'}, status=status.HTTP_400_BAD_REQUEST)
+        mes = None
+        if request.query_params.get('mes'):
+            mes = ler_mes(request.query_params['mes'])
+            if mes is None or tabela != 'fato_presenca':
+                return Response(
+                    {'error': 'mes (AAAA-MM) só se aplica a fato_presenca'}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+        nome = f"{tabela}{mes and f'-{mes:%Y-%m}' or ''}"
+        try:
+            if formato == 'arrow':
+                stream = stream_arrow(tabela, mes)
+                primeiro = next(stream)  # falha cedo (ex.: sem pyarrow) antes de iniciar a resposta
+                response = StreamingHttpResponse(
+                    _encadear(primeiro, stream), content_type='application/vnd.apache.arrow.stream'
+                )
+                response['Content-Disposition'] = f'attachment; filename="{nome}.arrows"'
+                return response
+
+            arquivo = tempfile.TemporaryFile()
+            gravar_parquet(tabela, arquivo, mes)
+        except ExportacaoIndisponivel as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        arquivo.seek(0)
+        return FileResponse(
+            arquivo, as_attachment=True, filename=f'{nome}.parquet', content_type='application/vnd.apache.parquet'
+        )
+
+
+def _encadear(primeiro, restante):
+    yield primeiro
+    yield from restante
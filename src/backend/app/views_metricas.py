@@ -0,0 +1,49 @@
+# app/views_metricas.py
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import generics, status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .authentication import AUTENTICACAO_PADRAO
+from .consultas_lentas import ORDENACOES, relatorio
+from .metricas import texto_prometheus
+from .permissions import TokenMetricas
+
+
+class MetricasView(generics.GenericAPIView):
+    """
+    GET /api/metricas/
+    Métricas no formato de texto do Prometheus (staff ou X-Metricas-Token).
+    Com METRICAS_DIRETORIO_MULTIPROCESSO, soma todos os workers.
+    """
+    authentication_classes = AUTENTICACAO_PADRAO
+    permission_classes = [IsAdminUser | TokenMetricas]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ConsultasLentasView(generics.GenericAPIView):
+    """
+    GET /api/consultas-lentas/?ordenar=total|max|ocorrencias&limite=50
+    Consultas acima de CONSULTA_LENTA_MS agrupadas por impressão digital,
+    com as views de origem e o plano de execução
+    """
+    authentication_classes = AUTENTICACAO_PADRAO
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        ordenar = request.query_params.get('ordenar', 'total')
+        if ordenar not in ORDENACOES:
+            return Response(
+                {'error': f"ordenar deve ser {', '.join(ORDENACOES)}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limite = int(request.query_params.get('limite', 50))
+        except ValueError:
+            return Response({'error': 'limite deve ser inteiro'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'limite_ms': settings.CONSULTA_LENTA_MS,
+            'consultas': relatorio(ordenar, limite),
+        })
@@ -0,0 +1,102 @@
+# app/views_relatorios.py
+from rest_framework import generics, status
+from rest_framework.response import Response
+from django.utils.dateparse import parse_date
+
+from .analytics import AGRUPAMENTOS_EQUIDADE, relatorio_equidade, relatorio_carga_docente
+from .models import Presenca, Professor
+from .authentication import AUTENTICACAO_PADRAO
+from .permissions import IsProfessorOrAdmin
+from .roteador import LeituraReplicaMixin
+
+
+class EquidadeView(LeituraReplicaMixin, generics.GenericAPIView):
+    """
+    GET /api/relatorios/equidade/
+    Presença agrupada por faixa etária, gênero e curso, calculada no banco.
+
+    Parâmetros: agrupar_por (ex.: faixa_etaria,genero), turma, curso,
+    data_inicio, data_fim (AAAA-MM-DD).
+    """
+    permission_classes = [IsProfessorOrAdmin]
+    authentication_classes = AUTENTICACAO_PADRAO
+
+    def get_queryset(self):
+        queryset = Presenca.objects.all()
+        user = self.request.user
+        if not user.is_staff:
+            # Professor analisa apenas as próprias turmas
+            queryset = queryset.filter(matricula__turma__professor=user.professor)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        agrupar_por = [
+            nome.strip() for nome in params.get('agrupar_por', ','.join(AGRUPAMENTOS_EQUIDADE)).split(',')
+            if nome.strip()
+        ]
+        invalidos = [nome for nome in agrupar_por if nome not in AGRUPAMENTOS_EQUIDADE]
+        if invalidos or not agrupar_por:
+            return Response(
+                {"error": f"agrupar_por aceita: {', '.join(AGRUPAMENTOS_EQUIDADE)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        presencas = self.get_queryset()
+        if params.get('turma'):
+            try:
+                turma_id = int(params['turma'])
+            except ValueError:
+                return Response({"error": "turma deve ser um id numérico"}, status=status.HTTP_400_BAD_REQUEST)
+            presencas = presencas.filter(matricula__turma_id=turma_id)
+        if params.get('curso'):
+            presencas = presencas.filter(matricula__aluno__curso=params['curso'])
+
+        for parametro, lookup in (('data_inicio', 'data__gte'), ('data_fim', 'data__lte')):
+            if params.get(parametro):
+                try:
+                    data = parse_date(params[parametro])
+                except ValueError:
+                    # Formato certo, data inexistente (ex.: 2025-02-30)
+                    data = None
+                if data is None:
+                    return Response(
+                        {"error": f"{parametro} deve ser uma data válida no formato AAAA-MM-DD"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                presencas = presencas.filter(**{lookup: data})
+
+        return Response({
+            'agrupar_por': agrupar_por,
+            'grupos': relatorio_equidade(presencas, agrupar_por),
+        })
+
+
+class CargaDocenteView(LeituraReplicaMixin, generics.GenericAPIView):
+    """
+    GET /api/relatorios/carga-docente/
+    Turmas (total e por status), alunos matriculados e aulas registradas
+    por professor e por departamento, obtidos em uma única consulta (subconsultas por professor).
+
+    Parâmetros: departamento, ativo (true/false).
+    """
+    permission_classes = [IsProfessorOrAdmin]
+    authentication_classes = AUTENTICACAO_PADRAO
+
+    def get_queryset(self):
+        queryset = Professor.objects.com_carga().order_by('departamento', 'nome')
+        user = self.request.user
+        if not user.is_staff:
+            # Professor vê apenas a própria carga
+            queryset = queryset.filter(pk=user.professor.pk)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        professores = self.get_queryset()
+        if params.get('departamento'):
+            professores = professores.filter(departamento=params['departamento'])
+        if params.get('ativo') in ('true', 'false'):
+            professores = professores.filter(ativo=params['ativo'] == 'true')
+
+        return Response(relatorio_carga_docente(professores))
@@ -0,0 +1,45 @@
+# app/views_roster.py
+import csv
+
+from django.conf import settings
+from rest_framework import generics, status
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .authentication import AUTENTICACAO_PADRAO
+from .provisionamento import importar_roster, ler_csv
+from .serializers import ImportarRosterSerializer
+
+
+class ImportarRosterView(generics.GenericAPIView):
+    """
+    POST /api/roster/importar/
+    Cria alunos ou professores em massa (com usuários e grupos).
+    Aceita JSON {"tipo", "senhas", "linhas": [...]} ou multipart com "arquivo" CSV.
+    No modo 'inutilizavel' a resposta traz uid/token de ativação de cada usuário.
+    """
+    serializer_class = ImportarRosterSerializer
+    authentication_classes = AUTENTICACAO_PADRAO
+    permission_classes = [IsAdminUser]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
+
+        if dados.get('arquivo'):
+            try:
+                linhas = ler_csv(dados['arquivo'])
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response({'arquivo': [f'CSV inválido: {e}']}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            linhas = dados['linhas']
+
+        relatorio = importar_roster(
+            linhas, dados['tipo'], dados['senhas'], dados.get('senha'),
+            processos=settings.ROSTER_PROCESSOS_HASH,
+        )
+        codigo = status.HTTP_201_CREATED if relatorio['criados'] else status.HTTP_400_BAD_REQUEST
+        return Response(relatorio, status=codigo)
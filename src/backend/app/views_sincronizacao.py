@@ -0,0 +1,50 @@
+# app/views_sincronizacao.py
+from rest_framework import generics, status
+from rest_framework.response import Response
+
+from .authentication import AUTENTICACAO_PADRAO
+from .permissions import IsProfessor
+from .serializers import SincronizacaoSerializer
+from .sincronizacao import (
+    CursorInvalido, ler_cursor, alteracoes, aplicar_presencas, compactar_exclusoes
+)
+from .transacoes import com_retentativa
+
+
+class SincronizacaoView(generics.GenericAPIView):
+    """
+    GET  /api/sync/?cursor=...
+    Alterações nas turmas, matrículas e presenças do professor desde o cursor
+    (sem cursor: tudo) e o novo cursor.
+
+    POST /api/sync/  {"cursor": "...", "presencas": [{matricula, data, status, ...}]}
+    Registra a chamada feita offline, devolve o resultado de cada item e as
+    alterações desde o cursor.
+    """
+    serializer_class = SincronizacaoSerializer
+    authentication_classes = AUTENTICACAO_PADRAO
+    permission_classes = [IsProfessor]
+
+    def get(self, request, *args, **kwargs):
+        professor_id = request.user.professor.pk
+        try:
+            marca = ler_cursor(professor_id, request.query_params.get('cursor'))
+        except CursorInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        compactar_exclusoes()
+        return Response(alteracoes(professor_id, marca))
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        professor_id = request.user.professor.pk
+        try:
+            marca = ler_cursor(professor_id, serializer.validated_data.get('cursor'))
+        except CursorInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultados = com_retentativa(aplicar_presencas)(
+            professor_id, serializer.validated_data['presencas'], marca
+        )
+        return Response({'resultados': resultados, **alteracoes(professor_id, marca)})
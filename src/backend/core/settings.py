@@ -1,4 +1,5 @@
 # core/settings.py - VERSÃO LIMPA (BACKEND APENAS)
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.InstrumentacaoMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -34,6 +36,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app.middleware.RoteamentoBancoMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -56,13 +59,136 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# SQLite ajustado para muitas escritas simultâneas (chamada no início das aulas).
+# Os PRAGMAs são aplicados em cada nova conexão; todos aceitam override por variável de ambiente.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -20000)),  # negativo = KiB
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_NAME', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Transações de escrita pegam o lock de escrita já no BEGIN
+            'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000,
+            'init_command': ';'.join(
+                f'PRAGMA {pragma}={valor}' for pragma, valor in SQLITE_PRAGMAS.items()
+            ),
+        },
+        'TEST': {
+            # Banco de teste em arquivo para que testes com várias threads usem WAL
+            'NAME': os.environ.get('SQLITE_TEST_NAME', BASE_DIR / 'test_db.sqlite3'),
+        },
+    }
+}
+
+# Réplica de leitura opcional (dashboards, relatórios, exportações e listagens).
+# Localmente é um segundo arquivo SQLite mantido pelo comando `replicar_banco`.
+if os.environ.get('SQLITE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['SQLITE_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['app.roteador.RoteadorLeituraEscrita']
+DB_ALIAS_LEITURA = os.environ.get('DB_ALIAS_LEITURA', 'replica')
+# Janela de read-your-writes: após escrever, o cliente lê do primário por N segundos
+DB_FIXAR_PRIMARIO_SEGUNDOS = int(os.environ.get('DB_FIXAR_PRIMARIO_SEGUNDOS', 10))
+
+# Leituras assíncronas (app/views_async.py): TTL do cache e, se ativado,
+# as rotas originais passam a apontar para as versões assíncronas (servidor ASGI)
+CACHE_LEITURAS_ASYNC_SEGUNDOS = int(os.environ.get('CACHE_LEITURAS_ASYNC_SEGUNDOS', 5))
+LEITURAS_ASYNC = os.environ.get('LEITURAS_ASYNC', '').lower() in ('1', 'true', 'sim')
+
+# Feed ao vivo de presenças (SSE): 'memoria' (um processo) ou 'arquivo' (vários workers locais)
+EVENTOS_BACKEND = os.environ.get('EVENTOS_BACKEND', 'memoria')
+EVENTOS_ARQUIVO = os.environ.get('EVENTOS_ARQUIVO', BASE_DIR / 'eventos_presenca.ndjson')
+EVENTOS_INTERVALO_LEITURA = float(os.environ.get('EVENTOS_INTERVALO_LEITURA', 0.2))
+EVENTOS_ARQUIVO_MAX_BYTES = int(os.environ.get('EVENTOS_ARQUIVO_MAX_BYTES', 10 * 1024 * 1024))
+EVENTOS_TAMANHO_FILA = int(os.environ.get('EVENTOS_TAMANHO_FILA', 1000))
+EVENTOS_HEARTBEAT_SEGUNDOS = int(os.environ.get('EVENTOS_HEARTBEAT_SEGUNDOS', 15))
+
+# Cache (padrão: memória local por processo). Com vários workers use um backend
+# compartilhado para que revogações de token e invalidações valham em todos eles.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'chamada-alunos'),
     }
 }
 
+# Token → usuário em cache (app/authentication.py)
+AUTH_TOKEN_CACHE_SEGUNDOS = int(os.environ.get('AUTH_TOKEN_CACHE_SEGUNDOS', 300))
+
+# Modo de autenticação do login: 'token' (DRF Token) ou 'jwt' (access/refresh assinados)
+AUTH_TOKEN_MODO = os.environ.get('AUTH_TOKEN_MODO', 'token')
+
+# Check-in dos alunos por código (app/checkin.py)
+CHECKIN_VALIDADE_SEGUNDOS = int(os.environ.get('CHECKIN_VALIDADE_SEGUNDOS', 90))
+CHECKIN_INTERVALO_FLUSH = float(os.environ.get('CHECKIN_INTERVALO_FLUSH', 1.0))
+CHECKIN_TAMANHO_LOTE = int(os.environ.get('CHECKIN_TAMANHO_LOTE', 500))
+
+# Escrita adiada de presenças (app/fila_presencas.py): POST/PUT/PATCH em
+# /api/presencas/ são validados, enfileirados e gravados em lotes (resposta 202)
+PRESENCA_ESCRITA_ADIADA = os.environ.get('PRESENCA_ESCRITA_ADIADA', '').lower() in ('1', 'true', 'sim')
+FILA_PRESENCAS_INTERVALO = float(os.environ.get('FILA_PRESENCAS_INTERVALO', 0.5))
+FILA_PRESENCAS_TAMANHO_LOTE = int(os.environ.get('FILA_PRESENCAS_TAMANHO_LOTE', 2000))
+FILA_PRESENCAS_RETENCAO_HORAS = int(os.environ.get('FILA_PRESENCAS_RETENCAO_HORAS', 24))
+
+# Sincronização offline dos professores (app/sincronizacao.py)
+SYNC_MARGEM_SEGUNDOS = int(os.environ.get('SYNC_MARGEM_SEGUNDOS', 5))
+SYNC_RETENCAO_DIAS = int(os.environ.get('SYNC_RETENCAO_DIAS', 30))
+SYNC_MAX_PRESENCAS = int(os.environ.get('SYNC_MAX_PRESENCAS', 5000))
+
+# Captura de mudanças para o BI (app/captura.py)
+CAPTURA_LIMITE_LEITURA = int(os.environ.get('CAPTURA_LIMITE_LEITURA', 5000))
+CAPTURA_DIRETORIO = os.environ.get('CAPTURA_DIRETORIO', BASE_DIR / 'mudancas')
+
+# Exportação colunar em esquema estrela (app/exportacao.py, requer pyarrow)
+EXPORTACAO_DIRETORIO = os.environ.get('EXPORTACAO_DIRETORIO', BASE_DIR / 'exportacao')
+EXPORTACAO_TAMANHO_LOTE = int(os.environ.get('EXPORTACAO_TAMANHO_LOTE', 50000))
+
+# Banco analítico do BI (app/banco_analitico.py): arquivo SQLite separado,
+# atualizado pelo comando atualizar_banco_analitico
+BANCO_ANALITICO_NAME = os.environ.get('SQLITE_ANALITICO_NAME', BASE_DIR / 'analitico.sqlite3')
+BANCO_ANALITICO_MARGEM_SEGUNDOS = int(os.environ.get('BANCO_ANALITICO_MARGEM_SEGUNDOS', 5))
+
+# Instrumentação por requisição (app/instrumentacao.py): fração das requisições
+# detalhadas (0 desliga, 1 mede todas) — Server-Timing + log JSON em 'app.instrumentacao'
+INSTRUMENTACAO_AMOSTRAGEM = float(os.environ.get('INSTRUMENTACAO_AMOSTRAGEM', 0.01))
+
+# Métricas Prometheus (app/metricas.py) em /api/metricas/: staff ou o cabeçalho
+# X-Metricas-Token. Com vários workers, defina um diretório compartilhado
+# para que a coleta some os processos
+METRICAS_ATIVAS = os.environ.get('METRICAS_ATIVAS', '1').lower() in ('1', 'true', 'sim')
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+METRICAS_DIRETORIO_MULTIPROCESSO = os.environ.get('METRICAS_DIRETORIO_MULTIPROCESSO', '')
+METRICAS_INTERVALO_GRAVACAO = float(os.environ.get('METRICAS_INTERVALO_GRAVACAO', 5))
+
+# Consultas acima deste tempo (ms) são registradas com o plano de execução
+# (app/consultas_lentas.py, relatório em /api/consultas-lentas/); 0 desliga
+CONSULTA_LENTA_MS = float(os.environ.get('CONSULTA_LENTA_MS', 200))
+
+# Perfil sob demanda (app/perfilamento.py): staff envia X-Perfil: <PERFIL_TOKEN>; vazio desliga
+PERFIL_TOKEN = os.environ.get('PERFIL_TOKEN', '')
+PERFIL_DIRETORIO = os.environ.get('PERFIL_DIRETORIO', BASE_DIR / 'perfis')
+PERFIL_MAXIMO = int(os.environ.get('PERFIL_MAXIMO', 100))
+
+# Processos para hashear senhas na importação de roster pela API (0/1 = sem pool)
+ROSTER_PROCESSOS_HASH = int(os.environ.get('ROSTER_PROCESSOS_HASH', 0))
+
+# Retentativa com backoff para escritas de presença (app/transacoes.py)
+DB_RETRY_TENTATIVAS = int(os.environ.get('DB_RETRY_TENTATIVAS', 5))
+DB_RETRY_ESPERA_INICIAL = float(os.environ.get('DB_RETRY_ESPERA_INICIAL', 0.05))
+DB_RETRY_ESPERA_MAXIMA = float(os.environ.get('DB_RETRY_ESPERA_MAXIMA', 1.0))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -90,7 +216,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'app.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -109,14 +235,51 @@ CORS_ALLOW_CREDENTIALS = True
 
 # JWT (opcional)
 SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.environ.get('JWT_ACCESS_MINUTOS', 15))),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_USER_CLASS': 'app.authentication.UsuarioToken',
 }
 
+if AUTH_TOKEN_MODO == 'jwt':
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].insert(
+        0, 'app.authentication.JWTStatelessAuthentication'
+    )
+
 # Spectacular
 SPECTACULAR_SETTINGS = {
     'TITLE': 'API Sistema de Chamada de Alunos',
     'DESCRIPTION': 'API para gerenciamento de chamada de alunos com estatísticas educacionais',
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
-}
\ No newline at end of file
+}
+
+# Logs
+# LOG_LINHAS_JSON=0 descarta as linhas JSON de instrumentação e consultas lentas
+LOG_LINHAS_JSON = os.environ.get('LOG_LINHAS_JSON', '1').lower() in ('1', 'true', 'sim')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # As mensagens de app.instrumentacao e app.consultas_lentas já são linhas JSON
+        'mensagem': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'linhas_json': {
+            'class': 'logging.StreamHandler' if LOG_LINHAS_JSON else 'logging.NullHandler',
+            'formatter': 'mensagem',
+        },
+    },
+    'loggers': {
+        'app.instrumentacao': {
+            'handlers': ['linhas_json'],
+            'level': os.environ.get('INSTRUMENTACAO_LOG_NIVEL', 'INFO'),
+            'propagate': False,
+        },
+        'app.consultas_lentas': {
+            'handlers': ['linhas_json'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
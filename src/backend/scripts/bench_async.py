@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Benchmark das rotas de leitura sob ASGI: views síncronas x assíncronas.
+
+Cria um banco SQLite temporário, popula com dados sintéticos e dispara
+requisições concorrentes contra o handler ASGI do Django (em processo).
+USO: python scripts/bench_async.py [--concorrencia 50] [--requisicoes 500]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ['SQLITE_NAME'] = os.path.join(tempfile.mkdtemp(prefix='bench_async_'), 'bench.sqlite3')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import AsyncClient
+from django.test.utils import setup_test_environment
+from rest_framework.authtoken.models import Token
+from app.models import Professor, Aluno, Turma, Matricula, Presenca
+
+
+def popular(turmas=20, alunos_por_turma=40, aulas=16):
+    """Dados sintéticos com bulk_create (sem signals)"""
+    print(f"Populando: {turmas} turmas x {alunos_por_turma} alunos x {aulas} aulas...")
+    admin = User.objects.create_superuser('bench', 'bench@exemplo.com', 'bench123')
+    token = Token.objects.create(user=admin)
+
+    professor = Professor.objects.create(nome='Prof. Bench', email='prof@bench.com', departamento='TI')
+    turma_objs = Turma.objects.bulk_create([
+        Turma(
+            nome=f'Turma {i:03d}', professor=professor, status='Ativa',
+            data_inicio=date(2025, 2, 1), data_fim=date(2025, 12, 15)
+        )
+        for i in range(turmas)
+    ])
+    aluno_objs = Aluno.objects.bulk_create([
+        Aluno(
+            nome=f'Aluno {i:05d}', matricula=f'B{i:07d}', email=f'aluno{i}@bench.com',
+            curso='TI', data_nascimento=date(2000, 1, 1), genero='N'
+        )
+        for i in range(turmas * alunos_por_turma)
+    ])
+    matricula_objs = Matricula.objects.bulk_create([
+        Matricula(turma=turma, aluno=aluno_objs[t * alunos_por_turma + a], presenca_acumulada=90)
+        for t, turma in enumerate(turma_objs)
+        for a in range(alunos_por_turma)
+    ])
+    Presenca.objects.bulk_create([
+        Presenca(matricula=matricula, data=date(2025, 2, 10) + timedelta(weeks=semana))
+        for matricula in matricula_objs
+        for semana in range(aulas)
+    ], batch_size=2000)
+    return token.key, turma_objs[0].id
+
+
+async def disparar(client, url, headers, concorrencia, total):
+    """Executa `total` GETs com no máximo `concorrencia` simultâneos"""
+    semaforo = asyncio.Semaphore(concorrencia)
+    latencias = []
+    erros = 0
+
+    async def uma():
+        nonlocal erros
+        async with semaforo:
+            inicio = time.perf_counter()
+            resposta = await client.get(url, headers=headers)
+            latencias.append(time.perf_counter() - inicio)
+            if resposta.status_code != 200:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma() for _ in range(total)))
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        'req_s': total / duracao,
+        'p50_ms': statistics.median(latencias) * 1000,
+        'p95_ms': latencias[int(len(latencias) * 0.95) - 1] * 1000,
+        'erros': erros,
+    }
+
+
+async def comparar(token, turma_id, concorrencia, total):
+    client = AsyncClient()
+    headers = {'Authorization': f'Token {token}'}
+    rotas = [
+        ('turmas-ativas', '/api/turmas-ativas/', '/api/async/turmas-ativas/'),
+        ('dashboard', f'/api/turmas/{turma_id}/dashboard/', f'/api/async/turmas/{turma_id}/dashboard/'),
+        ('presencas', f'/api/presencas/?matricula__turma={turma_id}',
+         f'/api/async/presencas/?matricula__turma={turma_id}'),
+    ]
+
+    print(f"\nConcorrência: {concorrencia} | Requisições por rota: {total}")
+    print(f"{'rota':<15}{'modo':<7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'erros':>7}")
+    for nome, url_sync, url_async in rotas:
+        for modo, url in (('sync', url_sync), ('async', url_async)):
+            r = await disparar(client, url, headers, concorrencia, total)
+            print(f"{nome:<15}{modo:<7}{r['req_s']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['erros']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concorrencia', type=int, default=50)
+    parser.add_argument('--requisicoes', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_test_environment()  # libera o host 'testserver' usado pelo AsyncClient
+    call_command('migrate', verbosity=0)
+    token, turma_id = popular()
+    asyncio.run(comparar(token, turma_id, args.concorrencia, args.requisicoes))
+    print(f"\nBanco temporário: {os.environ['SQLITE_NAME']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""
+Benchmark do check-in dos alunos no início da aula (rajada de escritas).
+
+Cria um banco SQLite temporário com várias turmas cheias, gera o código de
+cada turma e dispara os check-ins de todos os alunos ao mesmo tempo (com
+uma fração de repetições), medindo a latência das respostas e o tempo até
+a presença estar gravada. Com --comparar, a mesma rajada é enviada como
+POST /api/presencas/ (uma escrita por requisição) para comparação.
+USO: python scripts/bench_checkin.py [--turmas 20] [--alunos 100] [--threads 32]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ['SQLITE_NAME'] = os.path.join(tempfile.mkdtemp(prefix='bench_checkin_'), 'bench.sqlite3')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from app.checkin import get_coletor
+from app.models import Professor, Aluno, Turma, Matricula, Presenca
+from app.provisionamento import criar_usuarios, gerar_senhas
+
+
+def popular(turmas, alunos_por_turma):
+    print(f"Populando: {turmas} turmas x {alunos_por_turma} alunos...")
+    admin = User.objects.create_superuser('bench', 'bench@exemplo.com', 'bench123')
+    professor = Professor.objects.create(nome='Prof. Bench', email='prof@bench.com', departamento='TI')
+    hoje = timezone.localdate()
+    turma_objs = Turma.objects.bulk_create([
+        Turma(
+            nome=f'Turma {i:03d}', professor=professor, status='Ativa',
+            data_inicio=date(hoje.year, 1, 1), data_fim=date(hoje.year, 12, 31)
+        )
+        for i in range(turmas)
+    ])
+
+    total = turmas * alunos_por_turma
+    dados = [
+        {'nome': f'Aluno {i:05d}', 'matricula': f'B{i:07d}', 'email': f'aluno{i}@bench.com',
+         'curso': 'TI', 'data_nascimento': date(2004, 1, 1), 'genero': 'N'}
+        for i in range(total)
+    ]
+    usuarios = criar_usuarios(dados, 'Aluno', gerar_senhas('inutilizavel', total))
+    aluno_objs = Aluno.objects.bulk_create(
+        [Aluno(usuario=usuario, **item) for item, usuario in zip(dados, usuarios)], batch_size=500
+    )
+    tokens = Token.objects.bulk_create([Token(user=usuario, key=Token.generate_key()) for usuario in usuarios])
+    matriculas = Matricula.objects.bulk_create([
+        Matricula(turma=turma, aluno=aluno_objs[t * alunos_por_turma + a])
+        for t, turma in enumerate(turma_objs)
+        for a in range(alunos_por_turma)
+    ], batch_size=500)
+    alunos = [
+        (tokens[t * alunos_por_turma + a].key, turma.id, matriculas[t * alunos_por_turma + a].id)
+        for t, turma in enumerate(turma_objs)
+        for a in range(alunos_por_turma)
+    ]
+    return admin, turma_objs, alunos
+
+
+def percentis(valores):
+    valores = sorted(valores)
+    if not valores:
+        return {'p50_ms': 0, 'p95_ms': 0, 'p99_ms': 0}
+
+    def p(q):
+        return valores[min(len(valores) - 1, int(len(valores) * q))] * 1000
+    return {'p50_ms': statistics.median(valores) * 1000, 'p95_ms': p(0.95), 'p99_ms': p(0.99)}
+
+
+def rajada(requisicoes, threads):
+    """Executa (url, dados, headers) em paralelo; retorna latências e códigos de status"""
+    local = threading.local()
+    latencias, codigos = [], {}
+    lock = threading.Lock()
+
+    def uma(requisicao):
+        url, dados, headers = requisicao
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        inicio = time.perf_counter()
+        resposta = local.client.post(url, dados, content_type='application/json', headers=headers)
+        duracao = time.perf_counter() - inicio
+        with lock:
+            latencias.append(duracao)
+            codigos[resposta.status_code] = codigos.get(resposta.status_code, 0) + 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(uma, requisicoes))
+    return latencias, codigos, time.perf_counter() - inicio
+
+
+def imprimir(nome, latencias, codigos, duracao):
+    r = percentis(latencias)
+    print(f"{nome:<22}{len(latencias) / duracao:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+          f"{r['p99_ms']:>9.1f}   {codigos}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--turmas', type=int, default=20)
+    parser.add_argument('--alunos', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--repeticoes', type=float, default=0.2, help='Fração de check-ins enviados em dobro')
+    parser.add_argument('--comparar', action='store_true', help='Também mede POST /api/presencas/ por aluno')
+    args = parser.parse_args()
+
+    setup_test_environment()  # libera o host 'testserver' usado pelo Client
+    call_command('migrate', verbosity=0)
+    admin, turmas, alunos = popular(args.turmas, args.alunos)
+    admin_token = Token.objects.create(user=admin).key
+
+    professor = Client()
+    codigos = {}
+    for turma in turmas:
+        resposta = professor.post(
+            f'/api/turmas/{turma.id}/codigo_checkin/', headers={'Authorization': f'Token {admin_token}'}
+        )
+        codigos[turma.id] = resposta.json()['codigo']
+
+    requisicoes = [
+        ('/api/checkin/', {'codigo': codigos[turma_id]}, {'Authorization': f'Token {token}'})
+        for token, turma_id, _ in alunos
+    ]
+    requisicoes += requisicoes[:int(len(requisicoes) * args.repeticoes)]
+
+    print(f"\nRajada: {len(requisicoes)} check-ins | threads: {args.threads}")
+    print(f"{'rota':<22}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}   status")
+    latencias, status_codes, duracao = rajada(requisicoes, args.threads)
+    imprimir('checkin (lote)', latencias, status_codes, duracao)
+
+    coletor = get_coletor()
+    inicio = time.perf_counter()
+    while coletor.pendentes():
+        time.sleep(0.01)
+    drenagem = time.perf_counter() - inicio
+    esperas = percentis(coletor.esperas)
+    print(f"{'  aceite → gravado':<22}{'':>9}{esperas['p50_ms']:>9.1f}{esperas['p95_ms']:>9.1f}{esperas['p99_ms']:>9.1f}"
+          f"   lotes={coletor.lotes} gravados={coletor.gravados} drenagem={drenagem:.2f}s")
+    print(f"Presenças no banco: {Presenca.objects.count()}")
+
+    if args.comparar:
+        hoje = timezone.localdate().isoformat()
+        Presenca.objects.all().delete()
+        requisicoes = [
+            ('/api/presencas/', {'matricula': matricula_id, 'data': hoje, 'status': 'Presente'},
+             {'Authorization': f'Token {admin_token}'})
+            for _, _, matricula_id in alunos
+        ]
+        latencias, status_codes, duracao = rajada(requisicoes, args.threads)
+        imprimir('presencas (por linha)', latencias, status_codes, duracao)
+
+    print(f"\nBanco temporário: {os.environ['SQLITE_NAME']}")
+
+
+if __name__ == '__main__':
+    main()
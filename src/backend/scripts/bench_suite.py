@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+"""
+Suíte de benchmarks das rotas principais sobre dados sintéticos.
+
+Gera um banco SQLite com app/dados_sinteticos.py na escala pedida (mesma
+semente → mesmos dados) e mede cada rota com o Client do Django, passando
+por todo o middleware: latência (p50/p95/p99) e consultas SQL por
+requisição. As escritas (chamada) usam datas posteriores às aulas geradas
+e são apagadas no fim, então o banco pode ser reaproveitado com --banco.
+
+Os resultados vão para um JSON (--saida). Com --baseline a execução é
+comparada com um JSON anterior: é regressão o p50 acima da tolerância ou
+qualquer consulta SQL a mais por requisição; o script sai com código 1.
+USO: python scripts/bench_suite.py [--escala pequena] [--semente 42] [--repeticoes 30]
+     [--banco bench.sqlite3] [--saida resultado.json] [--baseline anterior.json] [--tolerancia 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Sem linhas de log por requisição ou por consulta lenta (as cargas em lote sempre passariam do limite)
+os.environ.setdefault('INSTRUMENTACAO_AMOSTRAGEM', '0')
+os.environ.setdefault('CONSULTA_LENTA_MS', '0')
+
+ESCALAS = ('minima', 'pequena', 'media', 'grande')  # ver app/dados_sinteticos.ESCALAS
+SENHA = 'bench123'
+MAXIMO_LOGIN = 10  # o hash da senha domina; poucas repetições bastam
+FOLGA_MS = 1.0  # variações do p50 abaixo disso são ruído, mesmo acima da tolerância
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', choices=ESCALAS, default='pequena')
+    parser.add_argument('--alunos', type=int, help='Sobrescreve o número de alunos da escala')
+    parser.add_argument('--turmas', type=int, help='Sobrescreve o número de turmas da escala')
+    parser.add_argument('--semanas', type=int, help='Sobrescreve o número de semanas de aula da escala')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=30, help='Requisições medidas por benchmark')
+    parser.add_argument('--orcamento', type=float, default=60, help='Segundos máximos por benchmark')
+    parser.add_argument('--banco', help='Arquivo SQLite a gerar ou reaproveitar (padrão: temporário)')
+    parser.add_argument('--apenas', nargs='+', metavar='NOME', help='Roda só estes benchmarks')
+    parser.add_argument('--saida', help='Grava os resultados neste JSON')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Aumento aceito no p50 (0.2 = 20%%)')
+    return parser.parse_args()
+
+
+args = argumentos()
+os.environ['SQLITE_NAME'] = args.banco or os.path.join(tempfile.mkdtemp(prefix='bench_suite_'), 'bench.sqlite3')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from app import dados_sinteticos
+from app.models import Turma, Matricula, Presenca
+
+
+# ========== DADOS ==========
+
+def parametros():
+    escala = dict(dados_sinteticos.ESCALAS[args.escala])
+    for campo in ('alunos', 'turmas', 'semanas'):
+        if getattr(args, campo):
+            escala[campo] = getattr(args, campo)
+    escala['turmas_por_aluno'] = min(escala['turmas_por_aluno'], escala['turmas'])
+    escala['professores'] = min(escala['professores'], escala['turmas'])
+    return {**escala, 'semente': args.semente}
+
+
+def preparar_banco():
+    """Gera os dados (ou reaproveita o --banco com o mesmo manifesto) e os usuários do benchmark"""
+    manifesto = Path(os.environ['SQLITE_NAME'] + '.json')
+    desejado = parametros()
+    if manifesto.exists():
+        dados = json.loads(manifesto.read_text())
+        if dados['parametros'] != desejado:
+            sys.exit(f"{os.environ['SQLITE_NAME']} foi gerado com {dados['parametros']}; use outro --banco")
+        print(f"Reaproveitando {os.environ['SQLITE_NAME']}")
+        return dados
+
+    call_command('migrate', verbosity=0)
+    print(f"Gerando dados sintéticos: {desejado}")
+    # Banco dedicado ao benchmark: ninguém mais escreve durante a carga
+    contagens = dados_sinteticos.gerar(**desejado, sem_captura=True)
+
+    # Senhas reais só para quem faz login ou autentica no benchmark
+    User.objects.create_superuser('bench', 'bench@exemplo.com', SENHA)
+    turma = Turma.objects.order_by('id').first()
+    aluno = Matricula.objects.filter(turma=turma).order_by('id').first().aluno
+    for usuario in (turma.professor.usuario, aluno.usuario):
+        usuario.set_password(SENHA)
+        usuario.save(update_fields=['password'])
+
+    dados = {
+        'parametros': desejado,
+        'contagens': contagens,
+        'usuarios': {'admin': 'bench', 'professor': turma.professor.usuario.username, 'aluno': aluno.usuario.username},
+    }
+    manifesto.write_text(json.dumps(dados, indent=2))
+    return dados
+
+
+# ========== BENCHMARKS ==========
+
+def cabecalho(username):
+    token, _ = Token.objects.get_or_create(user=User.objects.get(username=username))
+    return {'Authorization': f'Token {token.key}'}
+
+
+def ciclo(itens, total):
+    """`total` elementos repetindo `itens` em ordem (determinístico)"""
+    return [itens[i % len(itens)] for i in range(total)]
+
+
+def benchmarks(dados, total):
+    """{nome: (descrição da rota, [(método, url, corpo, headers)])}; total = aquecimento + repetições"""
+    usuarios = dados['usuarios']
+    admin, professor, aluno = (cabecalho(usuarios[papel]) for papel in ('admin', 'professor', 'aluno'))
+    turmas = list(
+        Turma.objects.filter(professor__usuario__username=usuarios['professor']).order_by('id').values_list('id', flat=True)
+    )
+    datas = sorted(Presenca.objects.filter(matricula__turma_id=turmas[0]).values_list('data', flat=True).distinct())
+    sobrenomes = dados_sinteticos.SOBRENOMES
+    primeiro_dia = date.fromisoformat(dados['contagens']['primeira_aula'])
+
+    # Chamada: uma presença nova por requisição, em dias depois das aulas geradas
+    matriculas = list(Matricula.objects.filter(turma_id__in=turmas).order_by('turma_id', 'id').values_list('id', flat=True))
+    depois = date.fromisoformat(dados['contagens']['ultima_aula']) + timedelta(days=1)
+    chamada = [
+        ('post', '/api/presencas/', {
+            'matricula': matriculas[i % len(matriculas)],
+            'data': (depois + timedelta(days=i // len(matriculas))).isoformat(),
+            'status': 'Presente' if i % 10 else 'Ausente',
+        }, professor)
+        for i in range(total)
+    ]
+
+    def gets(urls, headers=None):
+        return [('get', url, None, headers or {}) for url in ciclo(urls, total)]
+
+    return {
+        'presencas_turma_dia': (
+            'GET /api/presencas/?matricula__turma=&data= (professor)',
+            gets([f'/api/presencas/?matricula__turma={turmas[0]}&data={d}' for d in datas], professor),
+        ),
+        'presencas_turma': (
+            'GET /api/presencas/?matricula__turma= (professor)',
+            gets([f'/api/presencas/?matricula__turma={t}' for t in turmas], professor),
+        ),
+        'presencas_busca': (
+            'GET /api/presencas/?matricula__turma=&search= (professor)',
+            gets([f'/api/presencas/?matricula__turma={turmas[0]}&search={s}' for s in sobrenomes], professor),
+        ),
+        'presencas_aluno': ('GET /api/presencas/ (aluno)', gets(['/api/presencas/'], aluno)),
+        'presencas_status_dia': (
+            'GET /api/presencas/?status=Justificado&data= (admin, todas as turmas)',
+            gets([f'/api/presencas/?status=Justificado&data={primeiro_dia + timedelta(days=d)}' for d in range(5)], admin),
+        ),
+        'turma_dashboard': (
+            'GET /api/turmas/{id}/dashboard/ (professor)',
+            gets([f'/api/turmas/{t}/dashboard/' for t in turmas], professor),
+        ),
+        'matriculas_turma': (
+            'GET /api/matriculas/?turma= (professor)',
+            gets([f'/api/matriculas/?turma={t}' for t in turmas], professor),
+        ),
+        'turmas_ativas': ('GET /api/turmas-ativas/ (público)', gets(['/api/turmas-ativas/'])),
+        'professores_publicos': ('GET /api/professores-publicos/ (público)', gets(['/api/professores-publicos/'])),
+        'login': (
+            'POST /api/auth/login/',
+            [('post', '/api/auth/login/', {'username': usuarios['aluno'], 'password': SENHA}, {})]
+            * min(total, MAXIMO_LOGIN + 1),
+        ),
+        'chamada': ('POST /api/presencas/ (professor, uma presença por requisição)', chamada),
+    }
+
+
+def enviar(client, requisicao):
+    metodo, url, corpo, headers = requisicao
+    if metodo == 'get':
+        return client.get(url, headers=headers)
+    return getattr(client, metodo)(url, corpo, content_type='application/json', headers=headers)
+
+
+def medir(requisicoes):
+    """
+    A primeira requisição aquece caches e conta as consultas; as demais são
+    cronometradas até acabarem ou estourarem --orcamento. Se nem o
+    aquecimento coube no orçamento, ele vira a única amostra.
+    """
+    client = Client()
+    inicio = time.perf_counter()
+    with CaptureQueriesContext(connection) as capturadas:
+        resposta = enviar(client, requisicoes[0])
+    consultas = len(capturadas)  # o log é zerado a cada nova requisição
+    aquecimento = time.perf_counter() - inicio
+    if aquecimento > args.orcamento:
+        return [aquecimento], consultas, {resposta.status_code: 1}
+
+    codigos, latencias = {}, []
+    limite = time.perf_counter() + args.orcamento
+    for requisicao in requisicoes[1:]:
+        inicio = time.perf_counter()
+        resposta = enviar(client, requisicao)
+        latencias.append(time.perf_counter() - inicio)
+        codigos[resposta.status_code] = codigos.get(resposta.status_code, 0) + 1
+        if time.perf_counter() > limite:
+            break
+    return latencias, consultas, codigos
+
+
+def resumo(latencias):
+    ordenadas = sorted(latencias)
+
+    def p(q):
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * q))] * 1000
+    return {
+        'p50_ms': round(statistics.median(ordenadas) * 1000, 3),
+        'p95_ms': round(p(0.95), 3),
+        'p99_ms': round(p(0.99), 3),
+        'media_ms': round(statistics.fmean(ordenadas) * 1000, 3),
+        'min_ms': round(ordenadas[0] * 1000, 3),
+    }
+
+
+def limpar_escritas(dados):
+    """Remove as presenças da chamada e recalcula as matrículas afetadas"""
+    depois = dados['contagens']['ultima_aula']
+    escritas = Presenca.objects.filter(data__gt=depois)
+    afetadas = list(escritas.values_list('matricula_id', flat=True).distinct())
+    escritas.delete()
+    Matricula.objects.filter(pk__in=afetadas).recalcular_presenca()
+
+
+# ========== COMPARAÇÃO ==========
+
+def comparar(resultados, baseline, tolerancia):
+    """Anota em cada resultado a variação do p50 e se houve regressão; devolve os nomes com regressão"""
+    if baseline['dados']['parametros'] != resultados['dados']['parametros']:
+        print("AVISO: a baseline foi medida com outros parâmetros de dados; a comparação é só indicativa")
+    regressoes = []
+    for nome, atual in resultados['resultados'].items():
+        anterior = baseline['resultados'].get(nome)
+        if anterior is None:
+            continue
+        atual['variacao_p50'] = round(atual['p50_ms'] / anterior['p50_ms'] - 1, 3) if anterior['p50_ms'] else None
+        motivos = []
+        if (atual['variacao_p50'] is not None and atual['variacao_p50'] > tolerancia
+                and atual['p50_ms'] - anterior['p50_ms'] > FOLGA_MS):
+            motivos.append(f"p50 {anterior['p50_ms']:.1f} → {atual['p50_ms']:.1f} ms")
+        if atual['consultas'] > anterior['consultas']:
+            motivos.append(f"consultas {anterior['consultas']} → {atual['consultas']}")
+        if motivos:
+            atual['regressao'] = motivos
+            regressoes.append(nome)
+    return regressoes
+
+
+def imprimir(resultados):
+    print(f"\n{'benchmark':<24}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'SQL':>6}{'Δp50':>9}   status")
+    for nome, r in resultados['resultados'].items():
+        variacao = f"{r['variacao_p50']:+.0%}" if r.get('variacao_p50') is not None else ''
+        marca = '  REGRESSÃO: ' + '; '.join(r['regressao']) if r.get('regressao') else ''
+        print(f"{nome:<24}{r['n']:>5}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+              f"{r['consultas']:>6}{variacao:>9}   {r['status']}{marca}")
+
+
+def main():
+    setup_test_environment()  # libera o host 'testserver' usado pelo Client
+    dados = preparar_banco()
+
+    resultados = {
+        'executado_em': timezone.now().isoformat(),
+        'ambiente': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+        },
+        'dados': {'parametros': dados['parametros'], 'contagens': dados['contagens']},
+        'repeticoes': args.repeticoes,
+        'resultados': {},
+    }
+
+    todos = benchmarks(dados, args.repeticoes + 1)
+    for nome in args.apenas or []:
+        if nome not in todos:
+            sys.exit(f"Benchmark desconhecido: {nome} (disponíveis: {', '.join(todos)})")
+    try:
+        for nome, (rota, requisicoes) in todos.items():
+            if args.apenas and nome not in args.apenas:
+                continue
+            print(f"  {nome}...", flush=True)
+            latencias, consultas, codigos = medir(requisicoes)
+            resultados['resultados'][nome] = {
+                'rota': rota, 'n': len(latencias), 'consultas': consultas, 'status': codigos, **resumo(latencias)
+            }
+    finally:
+        limpar_escritas(dados)
+
+    regressoes = []
+    if args.baseline:
+        regressoes = comparar(resultados, json.loads(Path(args.baseline).read_text()), args.tolerancia)
+    imprimir(resultados)
+
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f"\nResultados gravados em {args.saida}")
+    print(f"Banco: {os.environ['SQLITE_NAME']}")
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) em relação a {args.baseline}: {', '.join(regressoes)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()